@@ -1,42 +1,95 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-import pandas as pd
-import numpy as np
-import json
 import os
+from datetime import datetime
 from crawler.crawler import WebsiteCrawler
-from crawler.analyzer import DataAnalyzer
-
-os.environ['NLTK_DATA'] = os.path.join(os.path.expanduser('~'), 'nltk_data')
-
-try:
-    import nltk
-    nltk_data_dir = os.path.expanduser("~/nltk_data")
-    os.makedirs(nltk_data_dir, exist_ok=True)
-    
-    nltk.download('punkt', quiet=True, download_dir=nltk_data_dir)
-    nltk.download('stopwords', quiet=True, download_dir=nltk_data_dir)
-    nltk.download('wordnet', quiet=True, download_dir=nltk_data_dir)
-    print("NLTK resources downloaded successfully")
-except Exception as e:
-    print(f"Warning: Failed to download NLTK resources: {e}")
-    print("The application will use a fallback keyword extraction method")
-
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, (np.integer, np.floating, np.bool_)):
-            return obj.item()
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        if pd.isna(obj):
-            return None
-        return super(CustomJSONEncoder, self).default(obj)
+from crawler.analyzer import DataAnalyzer, SpillAnalyzer
+from crawler.batch import BatchAnalysis
+from crawler.blobs import get_blob_store
+from crawler.checkpoint import get_checkpoint_store
+from crawler.history import PAGE_METRICS, get_history_store
+from crawler.jobs import JobConflict, JobManager, JobQueueFull
+from crawler.keywords import get_keyword_engine
+from crawler.cache import get_http_cache, get_result_cache
+from crawler.sitemap import get_sitemap_cache
+from crawler.spill import SpillFile, should_spill
+from crawler.store import PageStore
+from crawler.session import configure_client
+from crawler.registry import crawl_record, domain_of, get_crawl_registry
+from crawler.serialize import ChunkedList, compress, compress_stream, dumps, has_chunks, iter_dumps
+
+os.environ.setdefault('NLTK_DATA', os.path.join(os.path.expanduser('~'), 'nltk_data'))
+
+keyword_engine = get_keyword_engine()
 
 app = Flask(__name__)
-app.json_encoder = CustomJSONEncoder
 CORS(app)
 
-crawler_instance = None
+configure_client(
+    pool_maxsize=int(os.environ.get('SEO_HTTP_POOL_SIZE', 32)),
+    retries=int(os.environ.get('SEO_HTTP_RETRIES', 2)),
+    connect_timeout=float(os.environ.get('SEO_HTTP_CONNECT_TIMEOUT', 5)),
+    read_timeout=float(os.environ.get('SEO_HTTP_READ_TIMEOUT', 10)),
+    max_body_bytes=int(os.environ.get('SEO_HTTP_MAX_BODY_BYTES', 10 * 1024 * 1024)),
+    max_retry_after=float(os.environ.get('SEO_HTTP_MAX_RETRY_AFTER', 10)),
+)
+
+crawl_registry = get_crawl_registry()
+history_store = get_history_store()
+
+job_manager = JobManager(
+    max_workers=int(os.environ.get('SEO_JOB_WORKERS', 2)),
+    max_queue=int(os.environ.get('SEO_JOB_QUEUE', 16)),
+    registry=crawl_registry,
+    checkpoint=get_checkpoint_store(),
+    history=history_store,
+)
+
+MAX_PAGES = int(os.environ.get('SEO_MAX_PAGES', 10000))
+
+def parse_max_pages(value):
+    # max_pages from a request, or None unless it is an integer from 1 to
+    # MAX_PAGES.
+    try:
+        max_pages = int(value)
+    except (TypeError, ValueError):
+        return None
+    return max_pages if 1 <= max_pages <= MAX_PAGES else None
+
+def max_pages_error():
+    return jsonify({'error': f'max_pages must be an integer from 1 to {MAX_PAGES}'}), 400
+
+def json_response(payload, status=200):
+    # Analysis payloads skip jsonify: they are serialized with
+    # crawler.serialize (NumPy values and NaN handled) and compressed when
+    # the client accepts it. Payloads holding ChunkedLists (the pages and
+    # per-page stats of a spilled crawl) are streamed a chunk at a time.
+    if has_chunks(payload):
+        body, encoding = compress_stream(iter_dumps(payload), request.headers.get('Accept-Encoding'))
+    else:
+        body, encoding = compress(dumps(payload), request.headers.get('Accept-Encoding'))
+    response = Response(body, status=status, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+def format_pages(pages):
+    return format_page_records(pages.records())
+
+def format_spilled_pages(pages):
+    return ChunkedList(lambda: (format_page_records(chunk) for chunk in pages.iter_chunks(500)))
+
+def format_page_records(page_data):
+    for page in page_data:
+        if isinstance(page.get('keywords'), list):
+            formatted_keywords = []
+            for item in page['keywords']:
+                if isinstance(item, tuple) and len(item) == 2:
+                    formatted_keywords.append({"name": item[0], "value": item[1]})
+            page['keywords'] = formatted_keywords
+    
+    return page_data
 
 @app.route('/api/analyze', methods=['POST'])
 def analyze_website():
@@ -48,39 +101,34 @@ def analyze_website():
         return jsonify({'error': 'URL is required'}), 400
     
     try:
-        global crawler_instance
-        crawler_instance = WebsiteCrawler(url, max_pages=1 if single_page else 20)
+        crawler = WebsiteCrawler(url, max_pages=1 if single_page else 20)
         
-        df = crawler_instance.crawl_single_page()
+        pages = crawler.crawl_single_page()
         
-        if df.empty:
+        if pages.empty:
             return jsonify({'error': 'Failed to collect data from website'}), 400
         
-        analyzer = DataAnalyzer(df)
+        analyzer = DataAnalyzer(pages)
         stats = analyzer.get_descriptive_stats()
         recommendations = analyzer.create_recommendations()
         
-        page_data = df.to_dict('records')
-        
-        for page in page_data:
-            if isinstance(page.get('keywords'), list):
-                formatted_keywords = []
-                for item in page['keywords']:
-                    if isinstance(item, tuple) and len(item) == 2:
-                        formatted_keywords.append({"name": item[0], "value": item[1]})
-                page['keywords'] = formatted_keywords
+        page_data = format_pages(pages)
         
-        sitemap_urls = crawler_instance.sitemap_urls
+        record = crawl_registry.put(crawl_record(crawler, url, len(pages)))
+        sitemap_urls = record['sitemap_urls']
+        if history_store is not None:
+            history_store.record(record['crawl_id'], url, crawler.domain, analyzer, stats, recommendations)
         
-        return jsonify({
+        return json_response({
             'status': 'success',
+            'crawl_id': record['crawl_id'],
             'analyzed_url': url,
             'single_page_analysis': True,
             'pages': page_data,
             'stats': stats,
             'recommendations': recommendations,
-            'page_count': len(df),
-            'crawl_domain': crawler_instance.domain,
+            'page_count': len(pages),
+            'crawl_domain': crawler.domain,
             'sitemap_urls': sitemap_urls
         })
         
@@ -89,17 +137,188 @@ def analyze_website():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+def stream_event(event, payload, ndjson=False):
+    # Pieces of one event; a spilled crawl's summary is written a chunk at
+    # a time.
+    if ndjson:
+        yield from iter_dumps(dict(payload, type=event))
+        yield b"\n"
+    else:
+        yield b"event: " + event.encode('utf-8') + b"\ndata: "
+        yield from iter_dumps(payload)
+        yield b"\n\n"
+
+@app.route('/api/analyze/stream', methods=['GET', 'POST'])
+def analyze_website_stream():
+    data = request.get_json(silent=True) or {}
+    url = data.get('url') or request.args.get('url')
+    ndjson = (data.get('format') or request.args.get('format')) == 'ndjson'
+    
+    if not url:
+        return jsonify({'error': 'URL is required'}), 400
+    
+    max_pages = parse_max_pages(data.get('max_pages') or request.args.get('max_pages', 20))
+    if max_pages is None:
+        return max_pages_error()
+    
+    # Incremental crawls are checkpointed: the previous crawl's stored pages
+    # are what unchanged pages are served from.
+    incremental = str(data.get('incremental') or request.args.get('incremental', '')).lower() in ('1', 'true')
+    spill = data.get('spill', request.args.get('spill'))
+    spill = should_spill(max_pages) if spill is None else str(spill).lower() in ('1', 'true')
+    checkpoint = get_checkpoint_store() if incremental else None
+    crawler = WebsiteCrawler(url, max_pages=max_pages, checkpoint=checkpoint, incremental=incremental)
+    crawler.keep_pages = False
+    
+    def generate():
+        # The copy kept for the final DataAnalyzer pass leaves out
+        # structured_content; it is sent to the client but not needed for
+        # the stats. Large crawls keep it on disk instead.
+        slim_pages = SpillFile() if spill else PageStore(keep_structured=False)
+        try:
+            for metrics in crawler.iter_crawl():
+                slim_pages.append(metrics)
+                page = format_page_records([dict(metrics)])[0]
+                yield from stream_event('page', {'index': len(slim_pages) - 1, 'page': page}, ndjson)
+            
+            if slim_pages.empty:
+                yield from stream_event('error', {'error': 'Failed to collect data from website'}, ndjson)
+                return
+            
+            analyzer = SpillAnalyzer(slim_pages) if spill else DataAnalyzer(slim_pages)
+            stats = analyzer.get_descriptive_stats()
+            recommendations = analyzer.create_recommendations()
+            record = crawl_registry.put(crawl_record(crawler, url, len(slim_pages)))
+            if history_store is not None:
+                history_store.record(record['crawl_id'], url, crawler.domain, analyzer, stats, recommendations)
+            yield from stream_event('summary', {
+                'status': 'success',
+                'crawl_id': record['crawl_id'],
+                'analyzed_url': url,
+                'stats': stats,
+                'recommendations': recommendations,
+                'page_count': len(slim_pages),
+                'pages_skipped': crawler.pages_skipped,
+                'failed_urls': crawler.failed_urls,
+                'crawl_domain': crawler.domain,
+                'sitemap_urls': crawler.sitemap_urls
+            }, ndjson)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield from stream_event('error', {'error': str(e)}, ndjson)
+        finally:
+            # Also reached when the client disconnects and the generator is closed.
+            crawler.cancel()
+            if spill:
+                slim_pages.delete()
+    
+    response = Response(stream_with_context(generate()),
+                        mimetype='application/x-ndjson' if ndjson else 'text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+BATCH_MAX_URLS = int(os.environ.get('SEO_BATCH_MAX_URLS', 500))
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    data = request.get_json(silent=True) or {}
+    urls = data.get('urls')
+    ndjson = (data.get('format') or request.args.get('format')) == 'ndjson'
+    
+    if not isinstance(urls, list) or not urls or not all(isinstance(url, str) and url for url in urls):
+        return jsonify({'error': 'urls must be a non-empty list of URLs'}), 400
+    if len(urls) > BATCH_MAX_URLS:
+        return jsonify({'error': f'At most {BATCH_MAX_URLS} URLs per batch'}), 400
+    
+    max_pages = parse_max_pages(data.get('max_pages', 1))
+    if max_pages is None:
+        return max_pages_error()
+    
+    batch = BatchAnalysis(
+        urls,
+        max_pages=max_pages,
+        max_sites=int(os.environ.get('SEO_BATCH_SITES', 8)),
+        per_host_limit=int(os.environ.get('SEO_BATCH_PER_HOST', 2)),
+        registry=crawl_registry,
+    )
+    
+    def generate():
+        # Every site's pages go into one store so the summary is a single
+        # DataAnalyzer pass over the whole batch.
+        pages = PageStore(keep_structured=False)
+        sites = []
+        site_pages = {}
+        try:
+            for kind, url, payload in batch.run():
+                if kind == 'page':
+                    site_pages.setdefault(url, []).append(len(pages))
+                    pages.append(payload)
+                    page = format_page_records([dict(payload)])[0]
+                    yield from stream_event('page', {'site': url, 'index': len(pages) - 1, 'page': page}, ndjson)
+                else:
+                    sites.append(payload)
+                    yield from stream_event('site', payload, ndjson)
+            
+            if pages.empty:
+                yield from stream_event('error', {'error': 'Failed to collect data from any website'}, ndjson)
+                return
+            
+            analyzer = DataAnalyzer(pages)
+            if history_store is not None:
+                # Each site is kept as its own crawl; the batch-wide stats
+                # are not theirs, so only the page metrics are saved.
+                for site in sites:
+                    if site.get('crawl_id'):
+                        history_store.record(site['crawl_id'], site['url'], site['crawl_domain'], analyzer,
+                                             pages=site_pages.get(site['url'], []))
+            yield from stream_event('summary', {
+                'status': 'success',
+                'site_count': len(sites),
+                'sites_failed': sum(1 for site in sites if site['status'] != 'completed'),
+                'page_count': len(pages),
+                'sites': sites,
+                'comparison': analyzer.site_comparison(),
+                'stats': analyzer.get_descriptive_stats(),
+                'recommendations': analyzer.create_recommendations()
+            }, ndjson)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield from stream_event('error', {'error': str(e)}, ndjson)
+        finally:
+            batch.cancel()
+    
+    response = Response(stream_with_context(generate()),
+                        mimetype='application/x-ndjson' if ndjson else 'text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def find_crawl(crawl_id=None, domain=None):
+    # An explicit crawl id wins; otherwise the newest crawl of the domain,
+    # or the newest crawl overall when neither is given.
+    if crawl_id:
+        return crawl_registry.get(crawl_id)
+    return crawl_registry.latest(domain or None)
+
 @app.route('/api/sitemap', methods=['GET'])
 def get_sitemap():
-    global crawler_instance
+    domain = request.args.get('domain')
+    if not domain and request.args.get('url'):
+        domain = domain_of(request.args['url'])
+    record = find_crawl(request.args.get('crawl_id'), domain)
     
-    if not crawler_instance:
+    if not record:
         return jsonify({'error': 'No website has been analyzed yet'}), 400
     
-    sitemap_urls = crawler_instance.sitemap_urls
+    sitemap_urls = record['sitemap_urls']
     
-    return jsonify({
+    return json_response({
         'status': 'success',
+        'crawl_id': record['crawl_id'],
+        'crawl_domain': record['domain'],
         'sitemap_urls': sitemap_urls,
         'count': len(sitemap_urls)
     })
@@ -113,31 +332,26 @@ def analyze_specific_url():
         return jsonify({'error': 'URL is required'}), 400
     
     try:
-        global crawler_instance
-        if not crawler_instance:
+        if data.get('crawl_id') or data.get('domain'):
+            record = find_crawl(data.get('crawl_id'), data.get('domain'))
+        else:
+            record = crawl_registry.latest(domain_of(url)) or crawl_registry.latest()
+        if not record:
             return jsonify({'error': 'No crawler instance available. Analyze a website first.'}), 400
         
         crawler = WebsiteCrawler(url, max_pages=1)
-        df = crawler.crawl_single_page()
+        pages = crawler.crawl_single_page()
         
-        if df.empty:
+        if pages.empty:
             return jsonify({'error': 'Failed to collect data from the specified URL'}), 400
         
-        analyzer = DataAnalyzer(df)
+        analyzer = DataAnalyzer(pages)
         stats = analyzer.get_descriptive_stats()
         recommendations = analyzer.create_recommendations()
         
-        page_data = df.to_dict('records')
+        page_data = format_pages(pages)
         
-        for page in page_data:
-            if isinstance(page.get('keywords'), list):
-                formatted_keywords = []
-                for item in page['keywords']:
-                    if isinstance(item, tuple) and len(item) == 2:
-                        formatted_keywords.append({"name": item[0], "value": item[1]})
-                page['keywords'] = formatted_keywords
-        
-        return jsonify({
+        return json_response({
             'status': 'success',
             'analyzed_url': url,
             'single_page_analysis': True,
@@ -145,8 +359,9 @@ def analyze_specific_url():
             'stats': stats,
             'recommendations': recommendations,
             'page_count': 1,
+            'crawl_id': record['crawl_id'],
             'crawl_domain': crawler.domain,
-            'sitemap_urls': crawler_instance.sitemap_urls
+            'sitemap_urls': record['sitemap_urls']
         })
         
     except Exception as e:
@@ -154,9 +369,190 @@ def analyze_specific_url():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    data = request.json or {}
+    url = data.get('url')
+    
+    if not url:
+        return jsonify({'error': 'URL is required'}), 400
+    
+    max_pages = parse_max_pages(data.get('max_pages', 20))
+    if max_pages is None:
+        return max_pages_error()
+    
+    try:
+        job = job_manager.submit(url, max_pages=max_pages,
+                                 single_page=bool(data.get('single_page', False)),
+                                 incremental=bool(data.get('incremental', False)),
+                                 spill=bool(data['spill']) if data.get('spill') is not None else None)
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 429
+    
+    response = jsonify({
+        'status': 'accepted',
+        'job_id': job.id,
+        'job': job.to_dict()
+    })
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response, 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    payload = job.to_dict()
+    if job.result is not None:
+        payload.update(job.result)
+    if request.args.get('include_pages', '1') != '0':
+        pages = job.pages()
+        if isinstance(pages, SpillFile):
+            payload['pages'] = format_spilled_pages(pages)
+        else:
+            payload['pages'] = format_pages(pages) if not pages.empty else []
+    
+    return json_response(payload)
+
+@app.route('/api/jobs/<job_id>/resume', methods=['POST'])
+def resume_job(job_id):
+    try:
+        job = job_manager.resume(job_id)
+    except JobConflict as e:
+        return jsonify({'error': str(e)}), 409
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 429
+    
+    if job is None:
+        return jsonify({'error': 'No checkpoint found for this job'}), 404
+    
+    response = jsonify({
+        'status': 'accepted',
+        'job_id': job.id,
+        'job': job.to_dict()
+    })
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response, 202
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job.to_dict())
+
+def history_time(name):
+    # Query parameter as a Unix timestamp; ISO 8601 dates are accepted too.
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+def history_query(default_limit=1000):
+    return {
+        'domain': request.args.get('domain') or None,
+        'since': history_time('since'),
+        'until': history_time('until'),
+        'limit': min(int(request.args.get('limit', default_limit)), 10000),
+    }
+
+@app.route('/api/history/crawls', methods=['GET'])
+def history_crawls():
+    if history_store is None:
+        return jsonify({'error': 'Crawl history is disabled'}), 404
+    try:
+        query = history_query(default_limit=50)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    crawls = history_store.crawls(url=request.args.get('url') or None, **query)
+    return json_response({'status': 'success', 'crawls': crawls, 'count': len(crawls)})
+
+@app.route('/api/history/crawls/<crawl_id>', methods=['GET'])
+def history_crawl(crawl_id):
+    if history_store is None:
+        return jsonify({'error': 'Crawl history is disabled'}), 404
+    crawl = history_store.get(crawl_id)
+    if crawl is None:
+        return jsonify({'error': 'Crawl not found'}), 404
+    crawl['keywords'] = history_store.keyword_totals(crawl_id)
+    if request.args.get('include_pages', '1') != '0':
+        crawl['pages'] = history_store.pages(crawl_id)
+    return json_response(dict(crawl, status='success'))
+
+@app.route('/api/history/trends', methods=['GET'])
+def history_trends():
+    if history_store is None:
+        return jsonify({'error': 'Crawl history is disabled'}), 404
+    metric = request.args.get('metric', 'word_count')
+    if metric not in PAGE_METRICS:
+        return jsonify({'error': f"metric must be one of {', '.join(PAGE_METRICS)}"}), 400
+    try:
+        query = history_query()
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    url = request.args.get('url') or None
+    points = history_store.trend(metric, url=url, **query)
+    return json_response({'status': 'success', 'metric': metric, 'domain': query['domain'], 'url': url,
+                          'points': points})
+
+@app.route('/api/history/keywords', methods=['GET'])
+def history_keywords():
+    if history_store is None:
+        return jsonify({'error': 'Crawl history is disabled'}), 404
+    term = request.args.get('term')
+    if not term:
+        return jsonify({'error': 'term is required'}), 400
+    try:
+        query = history_query()
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    points = history_store.keyword_trend(term, **query)
+    return json_response({'status': 'success', 'term': term, 'domain': query['domain'], 'points': points})
+
+@app.route('/api/blobs/<blob_id>', methods=['GET'])
+def get_blob(blob_id):
+    blob_store = get_blob_store()
+    html = blob_store.get(blob_id) if blob_store else None
+    if html is None:
+        return jsonify({'error': 'Blob not found'}), 404
+    
+    try:
+        start = int(request.args.get('start', 0))
+        end = int(request.args.get('end', len(html)))
+    except ValueError:
+        return jsonify({'error': 'start and end must be integers'}), 400
+    
+    # The HTML comes from crawled sites, so it is served as text and never
+    # rendered in this origin.
+    response = Response(html[start:end], content_type='text/plain; charset=utf-8')
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    response.headers['Content-Security-Policy'] = 'sandbox'
+    response.headers['Content-Disposition'] = f'attachment; filename="{blob_id}.html"'
+    # Content-addressed, so a blob never changes.
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
 @app.route('/api/status', methods=['GET'])
 def api_status():
-    return jsonify({'status': 'API is running'})
+    http_cache = get_http_cache()
+    result_cache = get_result_cache()
+    sitemap_cache = get_sitemap_cache()
+    blob_store = get_blob_store()
+    return jsonify({
+        'status': 'API is running',
+        'http_cache': http_cache.stats() if http_cache else None,
+        'result_cache': result_cache.stats() if result_cache else None,
+        'sitemap_cache': sitemap_cache.stats() if sitemap_cache else None,
+        'blob_store': blob_store.stats() if blob_store else None,
+        'crawl_registry': crawl_registry.stats(),
+        'history': history_store.stats() if history_store else None,
+        'keyword_engine': keyword_engine.status()
+    })
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
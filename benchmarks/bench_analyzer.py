@@ -0,0 +1,117 @@
+"""DataAnalyzer keyword and page-metric stats: the old row-wise code against the vectorized path.
+
+Usage: python benchmarks/bench_analyzer.py [pages ...]
+
+Runs both implementations on synthetic analyze_page records (see
+bench_page_store.py) at 100, 1k and 10k pages by default. The row-wise
+version is the previous clean_data/get_descriptive_stats code: four
+df.apply(axis=1) calls for the main keyword columns and three
+df.iterrows() loops for common keywords, keywords by page and page
+metrics. The page DataFrame and PageStore are built before timing, since
+the crawl builds them as it goes; the vectorized time also covers the rest
+of DataAnalyzer (describe, correlations, top pages). Reports the time of
+each and checks that the output is identical.
+"""
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pandas as pd
+
+from bench_page_store import synthetic_records
+from crawler.analyzer import DataAnalyzer
+from crawler.store import PageStore
+
+
+def rowwise(df):
+    df['main_keyword'] = df.apply(
+        lambda row: row['keywords'][0][0] if isinstance(row['keywords'], list) and len(row['keywords']) > 0 else '',
+        axis=1)
+    df['main_keyword_phrase'] = df.apply(
+        lambda row: row['keyword_phrases'][0]['phrase']
+        if isinstance(row['keyword_phrases'], list) and len(row['keyword_phrases']) > 0 else '',
+        axis=1)
+    df['main_keyword_frequency'] = df.apply(
+        lambda row: row['keywords'][0][1] if isinstance(row['keywords'], list) and len(row['keywords']) > 0 else 0,
+        axis=1)
+    df['keyword_density'] = (df['main_keyword_frequency'] / df['word_count'] * 100).fillna(0)
+    df['keyword_relevance'] = df.apply(
+        lambda row: row['keywords'][0][2] if isinstance(row['keywords'], list) and len(row['keywords']) > 0 else 0,
+        axis=1)
+
+    all_keywords = []
+    for _, row in df.iterrows():
+        for kw, count, relevance in row['keywords']:
+            all_keywords.append({'text': kw, 'count': count, 'relevance': relevance, 'is_phrase': False})
+        for phrase_dict in row['keyword_phrases']:
+            all_keywords.append({'text': phrase_dict['phrase'], 'count': phrase_dict['count'],
+                                 'relevance': phrase_dict['relevance'], 'is_phrase': True})
+    keyword_data = defaultdict(lambda: {'count': 0, 'relevance': 0, 'page_count': 0, 'is_phrase': False})
+    for kw in all_keywords:
+        key = kw['text']
+        keyword_data[key]['count'] += kw['count']
+        keyword_data[key]['relevance'] += kw['relevance']
+        keyword_data[key]['page_count'] += 1
+        keyword_data[key]['is_phrase'] = kw['is_phrase']
+    keyword_list = [{'name': k, 'value': v['count'], 'relevance': v['relevance'],
+                     'page_count': v['page_count'], 'is_phrase': v['is_phrase']}
+                    for k, v in keyword_data.items()]
+    keyword_list.sort(key=lambda x: (x['relevance'], x['value']), reverse=True)
+
+    keyword_by_page = []
+    for _, row in df.iterrows():
+        keyword_by_page.append({
+            'url': row['url'], 'title': row['title'], 'page_link': row['page_link'],
+            'single_keywords': [{'keyword': kw, 'count': count, 'relevance': relevance}
+                                for kw, count, relevance in row['keywords'][:5]],
+            'phrases': [{'phrase': p['phrase'], 'count': p['count'], 'relevance': p['relevance']}
+                        for p in row['keyword_phrases'][:3]],
+        })
+
+    page_metrics = []
+    for _, row in df.iterrows():
+        page_metrics.append({
+            'url': row['url'].split('/')[-1] if '/' in row['url'] else row['url'],
+            'wordCount': int(row['word_count']),
+            'imageCount': int(row['image_count']),
+            'internalLinks': int(row['internal_links']),
+            'externalLinks': int(row['external_links']),
+            'h1Count': int(row['h1_count']),
+            'h2Count': int(row['h2_count']),
+            'h3Count': int(row['h3_count']),
+            'keywordDensity': float(row['keyword_density']),
+            'mainKeyword': row['main_keyword'],
+            'mainPhrase': row['main_keyword_phrase'],
+            'pageLink': row['page_link'],
+        })
+    return keyword_list, keyword_by_page, page_metrics
+
+
+def vectorized(pages):
+    analyzer = DataAnalyzer(pages)
+    stats = analyzer.get_descriptive_stats()
+    # get_descriptive_stats only returns the top 20 keywords; compare them all.
+    return analyzer.keyword_totals(), stats['keywords_by_page'], stats['pageMetrics']
+
+
+def timed(func, pages):
+    started = time.perf_counter()
+    result = func(pages)
+    return result, time.perf_counter() - started
+
+
+def main(sizes=(100, 1000, 10000)):
+    for size in sizes:
+        records = synthetic_records(size)
+        old, old_time = timed(rowwise, pd.DataFrame(records))
+        new, new_time = timed(vectorized, PageStore.from_records(records))
+        print(f"{size} pages")
+        print(f"  row-wise    {old_time:8.3f}s")
+        print(f"  vectorized  {new_time:8.3f}s  ({old_time / new_time:.1f}x)  identical: {old == new}")
+
+
+if __name__ == '__main__':
+    main(tuple(int(arg) for arg in sys.argv[1:]) or (100, 1000, 10000))
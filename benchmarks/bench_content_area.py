@@ -0,0 +1,51 @@
+"""Compare content-area extraction against the serialize-and-reparse version.
+
+Usage: python benchmarks/bench_content_area.py [page.html ...]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bs4 import BeautifulSoup
+
+from bench_dom_walk import synthetic_page
+from crawler.crawler import WebsiteCrawler
+from crawler.dom import BOILERPLATE_SELECTORS, MAIN_CONTENT_SELECTORS
+
+
+def reparse_content_area(soup):
+    for selector in MAIN_CONTENT_SELECTORS:
+        content_area = soup.select_one(selector)
+        if content_area and len(content_area.get_text(strip=True)) > 100:
+            return content_area
+
+    body = soup.find('body')
+    if not body:
+        return soup
+
+    content_area = BeautifulSoup(str(body), 'html.parser')
+    for selector in BOILERPLATE_SELECTORS:
+        for element in content_area.select(selector):
+            element.decompose()
+    return content_area
+
+
+def main(paths):
+    pages = [(path, open(path, encoding='utf-8', errors='replace').read()) for path in paths]
+    if not pages:
+        pages = [('synthetic', synthetic_page())]
+
+    crawler = WebsiteCrawler('http://example.com/', http_cache=False, result_cache=False)
+    for name, html in pages:
+        soup = BeautifulSoup(html, 'html.parser')
+        assert str(reparse_content_area(soup)) == str(crawler.find_content_area(soup))
+        old = min(timeit.repeat(lambda: reparse_content_area(soup), number=3, repeat=3)) / 3
+        new = min(timeit.repeat(lambda: crawler.find_content_area(soup), number=3, repeat=3)) / 3
+        print(f"{name}: {len(html) / 1024:.0f} KB  reparse {old * 1000:.1f} ms  "
+              f"pruned copy {new * 1000:.1f} ms  speedup {old / new:.2f}x")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,61 @@
+"""Compare the single-pass content walker against repeated find_all calls.
+
+Usage: python benchmarks/bench_dom_walk.py [page.html ...]
+
+Pass saved real-world pages to benchmark them; without arguments a large
+synthetic page is generated.
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bs4 import BeautifulSoup
+
+from crawler.dom import walk_content
+
+WORDS = "seo content analysis keyword crawler search engine ranking page optimization".split()
+
+
+def synthetic_page(sections=400):
+    random.seed(0)
+    parts = []
+    for i in range(sections):
+        text = ' '.join(random.choice(WORDS) for _ in range(60))
+        parts.append(
+            f"<div class='block'><h{1 + i % 3}>Section {i}</h{1 + i % 3}><p>{text}</p>"
+            f"<ul><li>{text[:40]}</li><li><a href='/p{i}'>next</a></li></ul>"
+            f"<img src='{i}.png'><a href='http://example.org/{i}'>out</a></div>"
+        )
+    return f"<html><head><title>Bench</title></head><body>{''.join(parts)}</body></html>"
+
+
+def find_all_metrics(content_area):
+    texts = [p.text for p in content_area.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li'])]
+    headings = content_area.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+    counts = [len(content_area.find_all(tag)) for tag in ('h1', 'h2', 'h3')]
+    paragraphs = [len(p.text.split()) for p in content_area.find_all('p')]
+    images = len(content_area.find_all('img'))
+    hrefs = [a['href'] for a in content_area.find_all('a', href=True)]
+    blocks = content_area.find_all(['p', 'ul', 'ol', 'table'])
+    return texts, headings, counts, paragraphs, images, hrefs, blocks
+
+
+def main(paths):
+    pages = [(path, open(path, encoding='utf-8', errors='replace').read()) for path in paths]
+    if not pages:
+        pages = [('synthetic', synthetic_page())]
+
+    for name, html in pages:
+        body = BeautifulSoup(html, 'html.parser').find('body')
+        runs = 5
+        old = min(timeit.repeat(lambda: find_all_metrics(body), number=runs, repeat=3)) / runs
+        new = min(timeit.repeat(lambda: walk_content(body), number=runs, repeat=3)) / runs
+        print(f"{name}: {len(html) / 1024:.0f} KB  find_all {old * 1000:.1f} ms  "
+              f"walk_content {new * 1000:.1f} ms  speedup {old / new:.2f}x")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
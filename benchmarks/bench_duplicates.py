@@ -0,0 +1,81 @@
+"""Near-duplicate detection: all-pairs SimHash comparison against banded lookup.
+
+Usage: python benchmarks/bench_duplicates.py [pages]
+
+Builds synthetic page texts (300 words from a 5000-word vocabulary) where
+one page in ten is a copy of an earlier page, either exact or with a few
+words changed, up to the given number of pages (20k by default). Reports
+the time to fingerprint the pages and the time and cluster count of
+duplicate_clusters against comparing every pair of SimHashes. All-pairs
+is quadratic, so it only runs on the smaller sizes.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from crawler.duplicates import NEAR_DUPLICATE_BITS, duplicate_clusters, fingerprint
+
+ALL_PAIRS_LIMIT = 5000
+
+
+def synthetic_pages(total, seed=1):
+    rng = random.Random(seed)
+    vocabulary = [f'word{i}' for i in range(5000)]
+    pages = []
+    for n in range(total):
+        if pages and n % 10 == 0:
+            page = list(rng.choice(pages))
+            for _ in range(rng.randrange(0, 3)):
+                page[rng.randrange(len(page))] = rng.choice(vocabulary)
+        else:
+            page = [rng.choice(vocabulary) for _ in range(300)]
+        pages.append(page)
+    return pages
+
+
+def all_pairs(content_hashes, simhashes):
+    parents = list(range(len(simhashes)))
+
+    def find(i):
+        while parents[i] != i:
+            i = parents[i]
+        return i
+
+    for i in range(len(simhashes)):
+        for j in range(i + 1, len(simhashes)):
+            if (content_hashes[i] == content_hashes[j] or
+                    bin(simhashes[i] ^ simhashes[j]).count('1') <= NEAR_DUPLICATE_BITS):
+                a, b = find(i), find(j)
+                if a != b:
+                    parents[max(a, b)] = min(a, b)
+    groups = {}
+    for i in range(len(simhashes)):
+        groups.setdefault(find(i), []).append(i)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def measure(name, func, *args):
+    started = time.perf_counter()
+    clusters = func(*args)
+    elapsed = time.perf_counter() - started
+    print(f"  {name:16s} {elapsed:8.3f}s  {len(clusters):6d} clusters")
+
+
+def main(total=20000):
+    for size in sorted({min(total, 1000), min(total, ALL_PAIRS_LIMIT), total}):
+        pages = synthetic_pages(size)
+        started = time.perf_counter()
+        fingerprints = [fingerprint(page) for page in pages]
+        print(f"{size} pages (fingerprints {time.perf_counter() - started:.3f}s)")
+        content_hashes = [int(content_hash, 16) for content_hash, _ in fingerprints]
+        simhashes = [int(simhash, 16) for _, simhash in fingerprints]
+        if size <= ALL_PAIRS_LIMIT:
+            measure('all pairs', all_pairs, content_hashes, simhashes)
+        measure('banded', duplicate_clusters, content_hashes, simhashes)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
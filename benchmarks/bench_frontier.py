@@ -0,0 +1,93 @@
+"""Crawl frontier throughput: the old list frontier against Frontier.
+
+Usage: python benchmarks/bench_frontier.py [links]
+
+Simulates enqueueing links discovered on crawled pages (40 links per
+page, drawn from a pool of distinct pages with fragment, trailing slash and
+query-order variants mixed in) until the given number of links has been
+enqueued (100k by default), popping one URL per page. Reports the time
+taken and how many URLs each frontier would fetch. The list frontier is
+quadratic, so it only runs on the smaller sizes.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from crawler.frontier import Frontier, normalize_url
+
+LINKS_PER_PAGE = 40
+LIST_FRONTIER_LIMIT = 20000
+
+
+def synthetic_links(total, seed=1):
+    rng = random.Random(seed)
+    pages = max(1, total // 4)
+    links = []
+    for _ in range(total):
+        n = rng.randrange(pages)
+        url = f'http://example.com/catalog/{n % 97}/item-{n}?color={n % 7}&size={n % 5}'
+        variant = rng.random()
+        if variant < 0.1:
+            url += '#reviews'
+        elif variant < 0.2:
+            url = f'http://example.com/catalog/{n % 97}/item-{n}?size={n % 5}&color={n % 7}'
+        elif variant < 0.25:
+            url = f'http://example.com/catalog/{n % 97}/item-{n}/?color={n % 7}&size={n % 5}'
+        links.append(url)
+    return links
+
+
+def list_frontier(links):
+    # The previous crawl(): a list with pop(0) and a membership scan per link.
+    to_visit = []
+    visited = set()
+    for start in range(0, len(links), LINKS_PER_PAGE):
+        for url in links[start:start + LINKS_PER_PAGE]:
+            if url not in visited and url not in to_visit:
+                to_visit.append(url)
+        if to_visit:
+            visited.add(to_visit.pop(0))
+    while to_visit:
+        visited.add(to_visit.pop(0))
+    return len(visited)
+
+
+def deque_frontier(links, **options):
+    frontier = Frontier(**options)
+    fetched = 0
+    for start in range(0, len(links), LINKS_PER_PAGE):
+        for url in links[start:start + LINKS_PER_PAGE]:
+            frontier.add(url, (1, 0))
+        if frontier:
+            frontier.pop()
+            fetched += 1
+    while frontier:
+        frontier.pop()
+        fetched += 1
+    return fetched
+
+
+def measure(name, func, links, **options):
+    normalize_url.cache_clear()
+    started = time.perf_counter()
+    fetched = func(links, **options)
+    elapsed = time.perf_counter() - started
+    print(f"  {name:22s} {elapsed:8.3f}s  {len(links) / elapsed:10.0f} links/sec  {fetched:6d} urls fetched")
+
+
+def main(total=100000):
+    for size in sorted({min(total, 10000), min(total, LIST_FRONTIER_LIMIT), total}):
+        links = synthetic_links(size)
+        print(f"{size} links")
+        if size <= LIST_FRONTIER_LIMIT:
+            measure('list', list_frontier, links)
+        measure('frontier', deque_frontier, links)
+        measure('frontier (priority)', deque_frontier, links, prioritized=True)
+        measure('frontier (bloom)', deque_frontier, links, bloom_capacity=size)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
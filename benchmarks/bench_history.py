@@ -0,0 +1,62 @@
+"""Crawl history queries over months of stored crawls.
+
+Usage: python benchmarks/bench_history.py [days] [pages]
+
+Stores one crawl a day for the given number of days (180 by default) for
+each of five domains, each crawl with the given number of synthetic pages
+(200 by default, see bench_page_store.py), in a temporary HistoryStore.
+Reports the time taken to save a crawl and the time of the queries behind
+the /api/history endpoints: listing a domain's crawls, a domain trend, a
+URL trend and a keyword trend.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_page_store import synthetic_records
+from crawler.analyzer import DataAnalyzer
+from crawler.history import HistoryStore
+from crawler.store import PageStore
+
+DOMAINS = 5
+DAY = 24 * 3600
+
+
+def measure(name, func, repeat=20):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"  {name:16s} {elapsed * 1000:8.2f}ms  {len(result):6d} rows")
+
+
+def main(days=180, pages=200):
+    # A few analyzers in rotation, so consecutive crawls of a domain differ.
+    analyzers = [DataAnalyzer(PageStore.from_records(synthetic_records(pages, seed=seed)))
+                 for seed in range(4)]
+    with tempfile.TemporaryDirectory() as directory:
+        store = HistoryStore(os.path.join(directory, 'history.sqlite3'))
+        start = time.time() - days * DAY
+        started = time.perf_counter()
+        for day in range(days):
+            for domain in range(DOMAINS):
+                store.record(f'crawl-{day}-{domain}', f'http://site{domain}.example/', f'site{domain}.example',
+                             analyzers[(day + domain) % len(analyzers)], crawled_at=start + day * DAY)
+        elapsed = time.perf_counter() - started
+        crawls = days * DOMAINS
+        size = os.path.getsize(store.path) / 1024 / 1024
+        print(f"{crawls} crawls of {pages} pages: {elapsed / crawls * 1000:.1f}ms per crawl, {size:.1f} MB")
+
+        since = start + days * DAY / 2
+        measure('crawls', lambda: store.crawls(domain='site2.example', limit=50))
+        measure('domain trend', lambda: store.trend('word_count', domain='site2.example'))
+        measure('domain trend 90d', lambda: store.trend('keyword_density', domain='site2.example', since=since))
+        measure('url trend', lambda: store.trend('word_count', url='http://example.com/catalog/5/item-5'))
+        measure('keyword trend', lambda: store.keyword_trend('term42', domain='site2.example'))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
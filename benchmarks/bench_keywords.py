@@ -0,0 +1,71 @@
+"""Per-page keyword extraction against the batch engine.
+
+Usage: python benchmarks/bench_keywords.py [pages ...]
+
+Generates pages of text drawn from a shared vocabulary (1k, 5k and 20k pages
+by default) and times KeywordEngine.extract page by page against one
+extract_batch call over all of them, without and with corpus TF-IDF terms,
+checking the keyword lists match. Runs with the engine as loaded (basic
+extraction without NLTK data) and with phrases: the NLTK path with a regex
+tokenizer standing in for word_tokenize, which counts bigrams and trigrams.
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from crawler.keywords import KeywordEngine
+
+VOCABULARY = 3000
+
+
+def synthetic_documents(pages, seed=2):
+    rng = random.Random(seed)
+    words = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 10)))
+             for _ in range(VOCABULARY)]
+    documents = []
+    for _ in range(pages):
+        text = ' '.join(rng.choice(words) for _ in range(rng.randint(100, 600)))
+        title = ' '.join(rng.choice(words) for _ in range(6))
+        documents.append((text, title, ' '.join(rng.choice(words) for _ in range(20))))
+    return documents
+
+
+def phrase_engine():
+    engine = KeywordEngine(allow_download=False)
+    if not engine.available:
+        engine._tokenize = re.compile(r'\w+').findall
+        engine.lemmatize = lambda word: word
+        engine.stop_words = set(engine.basic_stop_words)
+        engine.available = True
+    return engine
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+def main(sizes=(1000, 5000, 20000)):
+    engines = {'basic': KeywordEngine(allow_download=False), 'phrases': phrase_engine()}
+    for pages in sizes:
+        documents = synthetic_documents(pages)
+        for mode, engine in engines.items():
+            if mode == 'basic' and engine.available:
+                continue
+            per_page, single = timed(lambda: [engine.extract(*document, num_keywords=15)
+                                              for document in documents])
+            (batch, _), elapsed = timed(lambda: engine.extract_batch(documents, num_keywords=15,
+                                                                     tfidf_terms=0))
+            _, with_tfidf = timed(lambda: engine.extract_batch(documents, num_keywords=15))
+            print(f"{pages:6d} pages {mode:8s} extract {single:6.2f}s  extract_batch {elapsed:6.2f}s "
+                  f"({single / elapsed:4.2f}x)  with TF-IDF {with_tfidf:6.2f}s  "
+                  f"{'identical' if batch == per_page else 'DIFFERENT'}")
+
+
+if __name__ == '__main__':
+    main(tuple(int(arg) for arg in sys.argv[1:]) or (1000, 5000, 20000))
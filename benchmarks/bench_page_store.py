@@ -0,0 +1,100 @@
+"""Page metrics memory: a list of dicts plus an object DataFrame against PageStore.
+
+Usage: python benchmarks/bench_page_store.py [pages]
+
+Builds synthetic analyze_page records (15 keywords and a few phrases per
+page drawn from a shared vocabulary, templated titles, 2000-character
+content; structured_content left out since both layouts keep it as-is)
+for the given number of pages (10k by default). Reports the memory each
+layout holds per page, measured with tracemalloc, and the time taken by
+DataAnalyzer.
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pandas as pd
+
+from crawler.analyzer import DataAnalyzer
+from crawler.store import PageStore
+
+VOCABULARY = 5000
+
+
+def synthetic_records(pages, seed=1):
+    rng = random.Random(seed)
+    words = [f'term{i}' for i in range(VOCABULARY)]
+    records = []
+    for n in range(pages):
+        keywords = [(rng.choice(words), rng.randrange(1, 40), round(rng.uniform(0, 10), 2))
+                    for _ in range(15)]
+        phrases = [{'phrase': f'{rng.choice(words)} {rng.choice(words)}', 'count': rng.randrange(1, 10),
+                    'relevance': round(rng.uniform(0, 10), 2), 'words': 2}
+                   for _ in range(rng.randrange(0, 5))]
+        url = f'http://example.com/catalog/{n % 97}/item-{n}'
+        records.append({
+            'url': url,
+            'title': f'Item {n % 500} | Example Store',
+            'word_count': rng.randrange(50, 3000),
+            'image_count': rng.randrange(0, 30),
+            'heading_count': rng.randrange(0, 20),
+            'internal_links': rng.randrange(0, 200),
+            'external_links': rng.randrange(0, 30),
+            'keywords': keywords,
+            'keyword_phrases': phrases,
+            'meta_description': f'Buy item {n % 500} at Example Store.' if n % 3 else '',
+            'meta_description_length': 30 if n % 3 else 0,
+            'h1_count': rng.randrange(0, 3),
+            'h2_count': rng.randrange(0, 10),
+            'h3_count': rng.randrange(0, 10),
+            'paragraph_count': rng.randrange(0, 60),
+            'avg_paragraph_length': rng.uniform(0, 80),
+            'contains_schema': rng.random() < 0.5,
+            'page_size_kb': rng.uniform(10, 400),
+            'content': ' '.join(rng.choice(words) for _ in range(250))[:2000],
+            'structured_content': {},
+            'page_link': url,
+            'html_blob': f'{n:064x}',
+        })
+    return records
+
+
+def measure_memory(name, build, pages):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    held = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    print(f"  {name:28s} {size / 1024 / 1024:8.1f} MB  {size / pages:8.0f} bytes/page")
+    return held
+
+
+def main(pages=10000):
+    print(f"{pages} pages")
+    # Records are generated inside each measurement so nothing is shared
+    # between the two layouts; the crawler kept both the list and the frame.
+    def dicts_and_frame():
+        records = synthetic_records(pages)
+        return records, pd.DataFrame(records)
+
+    held = measure_memory('list of dicts + DataFrame', dicts_and_frame, pages)
+    store = measure_memory('PageStore', lambda: PageStore.from_records(synthetic_records(pages)), pages)
+    print(f"  PageStore.memory_usage()     {store.memory_usage()['bytes_per_page']:8.0f} bytes/page")
+
+    started = time.perf_counter()
+    analyzer = DataAnalyzer(store)
+    analyzer.get_descriptive_stats()
+    analyzer.create_recommendations()
+    print(f"  DataAnalyzer (PageStore)     {time.perf_counter() - started:8.3f}s")
+    object_columns = [col for col in analyzer.df.columns if analyzer.df[col].dtype == object]
+    print(f"  object columns               {object_columns or 'none'}")
+    del held
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
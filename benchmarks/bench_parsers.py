@@ -0,0 +1,47 @@
+"""Pages/sec for each installed HTML parser backend.
+
+Usage: python benchmarks/bench_parsers.py [page.html ...]
+
+Output equivalence between backends is checked in tests/test_parsers.py.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_dom_walk import synthetic_page
+from crawler.crawler import WebsiteCrawler
+from crawler.parsers import available_parsers, parse_html
+
+
+def analyze(crawler, url, html):
+    return crawler.analyze_page(url, parse_html(html, crawler.parser))
+
+
+def main(paths):
+    pages = [(path, open(path, encoding='utf-8', errors='replace').read()) for path in paths]
+    if not pages:
+        pages = [(f'synthetic-{n}', synthetic_page(n)) for n in (20, 100, 400)]
+
+    crawlers = {
+        name: WebsiteCrawler('http://example.com/', http_cache=False, result_cache=False, parser=name)
+        for name in available_parsers()
+    }
+
+    for backend, crawler in crawlers.items():
+        started = time.perf_counter()
+        for name, html in pages:
+            parse_html(html, backend)
+        parse_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for name, html in pages:
+            analyze(crawler, 'http://example.com/', html)
+        elapsed = time.perf_counter() - started
+        print(f"{backend:12s} parse {len(pages) / parse_elapsed:8.2f} pages/sec   "
+              f"parse+analyze {len(pages) / elapsed:8.2f} pages/sec")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,83 @@
+"""Analysis response serialization: the old jsonify path against crawler.serialize.
+
+Usage: python benchmarks/bench_serialize.py [pages ...]
+
+Builds the /api/analyze payload (page records plus DataAnalyzer stats and
+recommendations) for synthetic crawls of 1k and 10k pages by default (see
+bench_page_store.py; structured_content is left empty). The old path is
+what app.py did before: null out NaNs in the describe/corr dicts, then
+json.dumps with CustomJSONEncoder. Reports encode time and payload size
+uncompressed, gzipped and, when brotli is installed, brotli-compressed.
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import pandas as pd
+
+from bench_page_store import synthetic_records
+from crawler import serialize
+from crawler.analyzer import DataAnalyzer
+from crawler.store import PageStore
+
+
+class CustomJSONEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, (np.integer, np.floating, np.bool_)):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if pd.isna(obj):
+            return None
+        return super(CustomJSONEncoder, self).default(obj)
+
+
+def old_dumps(payload):
+    for key in ('numeric', 'correlations'):
+        table = payload['stats'][key]
+        for col in table:
+            for stat in table[col]:
+                if pd.isna(table[col][stat]):
+                    table[col][stat] = None
+    return json.dumps(payload, cls=CustomJSONEncoder).encode('utf-8')
+
+
+def payload_for(size):
+    pages = PageStore.from_records(synthetic_records(size))
+    analyzer = DataAnalyzer(pages)
+    return {
+        'status': 'success',
+        'pages': pages.records(),
+        'stats': analyzer.get_descriptive_stats(),
+        'recommendations': analyzer.create_recommendations(),
+        'page_count': len(pages),
+    }
+
+
+def measure(name, func, payload):
+    started = time.perf_counter()
+    body = func(payload)
+    elapsed = time.perf_counter() - started
+    print(f"  {name:20s} {elapsed:8.3f}s  {len(body) / 1024 / 1024:8.2f} MB")
+    return body
+
+
+def main(sizes=(1000, 10000)):
+    print(f"orjson: {'yes' if serialize.orjson else 'no'}  brotli: {'yes' if serialize.brotli else 'no'}")
+    for size in sizes:
+        payload = payload_for(size)
+        print(f"{size} pages")
+        measure('json + encoder', old_dumps, payload)
+        body = measure('serialize.dumps', serialize.dumps, payload)
+        for encoding in ('gzip', 'br'):
+            if encoding == 'br' and serialize.brotli is None:
+                continue
+            measure(encoding, lambda body: serialize.compress(body, encoding)[0], body)
+
+
+if __name__ == '__main__':
+    main(tuple(int(arg) for arg in sys.argv[1:]) or (1000, 10000))
@@ -0,0 +1,135 @@
+"""Sitemap ingestion: streaming SitemapReader against the old whole-document parse.
+
+Usage: python benchmarks/bench_sitemap.py [total_urls] [children]
+
+Serves a synthetic sitemap index with the given number of gzipped child
+sitemaps (50k URLs in total by default, plus a 5% overlap between
+children) from a local HTTP server, then reports wall time, time to first
+URL and (on a separate run) peak traced memory for both readers. Child
+fetches carry a small artificial latency so the concurrent fetch has
+something to overlap.
+"""
+import gzip
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from crawler.session import get_client
+from crawler.sitemap import SitemapReader, site_matcher
+
+NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+LATENCY = 0.05
+
+
+def build_site(host, total_urls, children):
+    per_child = total_urls // children
+    overlap = per_child // 20
+    files = {}
+    locs = []
+    for child in range(children):
+        start = child * per_child - (overlap if child else 0)
+        rows = ''.join(
+            f'<url><loc>http://{host}/product/{n}</loc><lastmod>2024-01-{n % 28 + 1:02d}</lastmod></url>'
+            for n in range(start, (child + 1) * per_child)
+        )
+        body = ('<?xml version="1.0" encoding="UTF-8"?>'
+                f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{rows}</urlset>')
+        files[f'/sitemap-{child}.xml.gz'] = gzip.compress(body.encode('utf-8'))
+        locs.append(f'http://{host}/sitemap-{child}.xml.gz')
+    index = ''.join(f'<sitemap><loc>{loc}</loc></sitemap>' for loc in locs)
+    files['/sitemap.xml'] = ('<?xml version="1.0" encoding="UTF-8"?>'
+                             f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{index}'
+                             '</sitemapindex>').encode('utf-8')
+    return files
+
+
+def serve(files):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = files.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            time.sleep(LATENCY)
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def whole_document(sitemap_url, domain):
+    # The previous get_sitemap_urls(): whole-document parse, children fetched
+    # one after another (decompression added so it can read the same files).
+    def load(url):
+        content = get_client().get(url).content
+        if content[:2] == b'\x1f\x8b':
+            content = gzip.decompress(content)
+        return ET.fromstring(content)
+
+    root = load(sitemap_url)
+    urls = [loc.text for loc in root.findall(f'.//{NS}loc')]
+    for sitemap in root.findall(f'.//{NS}sitemap'):
+        nested = load(sitemap.find(f'.//{NS}loc').text)
+        urls.extend(loc.text for loc in nested.findall(f'.//{NS}loc'))
+    urls = [url for url in urls if domain in url and not url.endswith(('.xml', '.xml.gz'))]
+    yield from dict.fromkeys(urls)
+
+
+def streaming(sitemap_url, domain):
+    reader = SitemapReader(max_workers=8)
+    for entry in reader.iter_entries(sitemap_url, site_matcher(domain)):
+        yield entry.loc
+
+
+def measure(name, reader, sitemap_url, domain):
+    started = time.perf_counter()
+    first = None
+    count = 0
+    for _ in reader(sitemap_url, domain):
+        if first is None:
+            first = time.perf_counter() - started
+        count += 1
+    elapsed = time.perf_counter() - started
+
+    # Memory is traced on a second run; tracing slows the first one down too much.
+    tracemalloc.start()
+    for _ in reader(sitemap_url, domain):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:16s} {count:7d} urls  {elapsed:6.2f}s total  {first:6.3f}s to first url  "
+          f"{peak / 1024 / 1024:7.1f} MB peak")
+    return count
+
+
+def main(total_urls=50000, children=10):
+    files = {}
+    server = serve(files)
+    host = f'127.0.0.1:{server.server_address[1]}'
+    files.update(build_site(host, total_urls, children))
+    sitemap_url = f'http://{host}/sitemap.xml'
+
+    print(f"{total_urls} urls in {children} gzipped child sitemaps, "
+          f"{sum(len(body) for body in files.values()) / 1024:.0f} KB on the wire")
+    old = measure('whole document', whole_document, sitemap_url, host)
+    new = measure('streaming', streaming, sitemap_url, host)
+    if old != new:
+        print(f"url counts differ: {old} vs {new}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,80 @@
+"""Peak memory of a large crawl's analysis kept in memory against spilled to disk.
+
+Usage: python benchmarks/bench_spill.py [pages ...]
+
+Feeds synthetic analyze_page records (see bench_page_store.py, generated
+500 at a time so the input itself is not held) through both paths, for
+2k, 10k and 40k pages by default. In memory: a PageStore holds every page,
+DataAnalyzer runs over it and the response body with all pages is built
+with serialize.dumps. Spilled: pages are appended to a SpillFile,
+SpillAnalyzer reads it back in chunks and the response is written with
+serialize.iter_dumps, a chunk of pages or per-page stats at a time, as
+/api/jobs does for spilled crawls. Reports time and the peak
+memory traced by tracemalloc for each.
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_page_store import synthetic_records
+from crawler.analyzer import DataAnalyzer, SpillAnalyzer
+from crawler.serialize import ChunkedList, dumps, iter_dumps
+from crawler.spill import SpillFile
+from crawler.store import PageStore
+
+BATCH = 500
+
+
+def pages(total):
+    for start in range(0, total, BATCH):
+        for n, metrics in enumerate(synthetic_records(min(BATCH, total - start), seed=start), start):
+            metrics['url'] = metrics['page_link'] = f'http://example.com/catalog/{n % 97}/item-{n}'
+            yield metrics
+
+
+def in_memory(total):
+    store = PageStore()
+    store.extend(pages(total))
+    analyzer = DataAnalyzer(store)
+    body = dumps({'stats': analyzer.get_descriptive_stats(),
+                  'recommendations': analyzer.create_recommendations(),
+                  'pages': store.records()})
+    return len(body)
+
+
+def spilled(total):
+    spill = SpillFile()
+    try:
+        spill.extend(pages(total))
+        analyzer = SpillAnalyzer(spill)
+        payload = {'stats': analyzer.get_descriptive_stats(),
+                   'recommendations': analyzer.create_recommendations(),
+                   'pages': ChunkedList(lambda: spill.iter_chunks(BATCH))}
+        return sum(len(piece) for piece in iter_dumps(payload))
+    finally:
+        spill.delete()
+
+
+def measure(name, func, total):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = func(total)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:10s} {elapsed:8.2f}s  peak {peak / 1024 / 1024:8.1f} MB  "
+          f"({peak / total / 1024:.2f} KB/page)  body {size / 1024 / 1024:.1f} MB")
+
+
+def main(sizes=(2000, 10000, 40000)):
+    for total in sizes:
+        print(f"{total} pages")
+        measure('in memory', in_memory, total)
+        measure('spilled', spilled, total)
+
+
+if __name__ == '__main__':
+    main(tuple(int(arg) for arg in sys.argv[1:]) or (2000, 10000, 40000))
@@ -1,14 +1,44 @@
 import pandas as pd
 import numpy as np
 from collections import Counter, defaultdict
+from urllib.parse import urlparse
+
+from .duplicates import duplicate_clusters
+from .keywords import get_keyword_engine
+from .serialize import ChunkedList
+from .store import PageStore
+
+# Columns SpillAnalyzer leaves out of its in-memory PageStore: the page
+# text, meta description and blob id.
+SPILL_OMITTED_COLUMNS = ('content', 'meta_description', 'html_blob')
+
+# Terms per page in the TF-IDF section.
+TFIDF_TERMS = 5
 
 class DataAnalyzer:
-    def __init__(self, df):
-        self.df = df
+    def __init__(self, pages):
+        # Takes a PageStore, or analyze_page records as a list or DataFrame.
+        if not isinstance(pages, PageStore):
+            records = pages.to_dict('records') if isinstance(pages, pd.DataFrame) else pages
+            pages = PageStore.from_records(records)
+        self.pages = pages
+        self.df = pages.to_frame()
+        self.keywords = pages.keyword_frame()
+        self.terms = pages.term_strings()
+        self._duplicates = None
         self.clean_data()
     
+    def top_keywords(self, phrase, n=1, keywords=None):
+        # The first n keywords (or phrases) of each page, in ranked order.
+        keywords = self.keywords if keywords is None else keywords
+        return keywords[keywords['phrase'] == phrase].groupby('page', sort=False).head(n)
+    
+    def term_column(self, terms):
+        # Categorical of keyword terms per page, '' where a page has none.
+        codes = terms.reindex(self.df.index, fill_value=0).to_numpy(np.int32)
+        return pd.Categorical.from_codes(codes, categories=pd.Index(self.terms, dtype=object))
+    
     def clean_data(self):
-        self.df['meta_description'] = self.df['meta_description'].fillna('')
         self.df['meta_description_length'] = self.df['meta_description_length'].fillna(0)
         
         numeric_cols = ['word_count', 'image_count', 'heading_count', 'internal_links', 
@@ -20,37 +50,24 @@ class DataAnalyzer:
         
         self.df['contains_schema'] = self.df['contains_schema'].astype(bool)
         
-        self.df['main_keyword'] = self.df.apply(self.get_main_keyword, axis=1)
-        self.df['main_keyword_phrase'] = self.df.apply(self.get_main_phrase, axis=1)
+        main_keywords = self.top_keywords(False).set_index('page')
+        main_phrases = self.top_keywords(True).set_index('page')
+        self.df['main_keyword'] = self.term_column(main_keywords['term'])
+        self.df['main_keyword_phrase'] = self.term_column(main_phrases['term'])
         
-        self.df['main_keyword_frequency'] = self.df.apply(
-         lambda row: row['keywords'][0][1] if isinstance(row['keywords'], list) and len(row['keywords']) > 0 else 0, 
-         axis=1
-        )
+        self.df['main_keyword_frequency'] = main_keywords['count'].reindex(self.df.index, fill_value=0)
         
         self.df['keyword_density'] = (self.df['main_keyword_frequency'] / self.df['word_count'] * 100).fillna(0)
         
-        self.df['keyword_relevance'] = self.df.apply(
-            lambda row: row['keywords'][0][2] if isinstance(row['keywords'], list) and len(row['keywords']) > 0 else 0,
-            axis=1
-        )
-        
-        unhashable_cols = []
-        for col in self.df.columns:
-            if self.df[col].dtype == 'object':
-                non_null_values = self.df[col].dropna()
-                if len(non_null_values) > 0:
-                    first_value = non_null_values.iloc[0]
-                    if isinstance(first_value, (list, dict)):
-                        unhashable_cols.append(col)
-        
-        hashable_cols = [col for col in self.df.columns if col not in unhashable_cols]
-        if hashable_cols:
-            duplicate_check_df = self.df[hashable_cols]
-            if duplicate_check_df.duplicated().any():
-                print(f"Found {duplicate_check_df.duplicated().sum()} duplicate rows. Removing...")
-                duplicate_indices = duplicate_check_df[duplicate_check_df.duplicated()].index
-                self.df = self.df.drop(index=duplicate_indices)
+        self.df['keyword_relevance'] = main_keywords['relevance'].reindex(self.df.index, fill_value=0)
+        
+        # Only a page recorded twice is dropped; pages with the same or
+        # nearly the same content are reported by duplicate_content().
+        duplicated = self.df['url'].duplicated()
+        if duplicated.any():
+            print(f"Found {duplicated.sum()} duplicate rows. Removing...")
+            self.df = self.df[~duplicated]
+            self.keywords = self.keywords[self.keywords['page'].isin(self.df.index)]
         
         q1 = self.df['word_count'].quantile(0.25)
         q3 = self.df['word_count'].quantile(0.75)
@@ -66,15 +83,88 @@ class DataAnalyzer:
         else:
             self.df['is_outlier'] = False
     
-    def get_main_keyword(self, row):
-        if isinstance(row['keywords'], list) and len(row['keywords']) > 0:
-            return row['keywords'][0][0]
-        return ''
+    def page_content(self, rows):
+        # Text of the given rows of df.
+        return rows['content']
+    
+    def keyword_totals(self):
+        # Count, relevance and page totals per term over keywords and
+        # phrases, most relevant first. bincount adds in table order, so the
+        # float sums match a row-by-row accumulation exactly, and the stable
+        # sort over first-seen terms keeps its order for ties.
+        terms = self.keywords['term'].to_numpy()
+        if not len(terms):
+            return []
+        counts = np.bincount(terms, weights=self.keywords['count'].to_numpy())
+        relevance = np.bincount(terms, weights=self.keywords['relevance'].to_numpy())
+        pages = np.bincount(terms)
+        last = self.keywords.drop_duplicates('term', keep='last')
+        is_phrase = pd.Series(last['phrase'].to_numpy(), index=last['term'].to_numpy())
+        
+        seen = pd.unique(terms)
+        order = seen[np.lexsort((-counts[seen], -relevance[seen]))]
+        return [
+            {
+                'name': name,
+                'value': value,
+                'relevance': rel,
+                'page_count': page_count,
+                'is_phrase': phrase
+            }
+            for name, value, rel, page_count, phrase in zip(
+                self.terms[order].tolist(), counts[order].astype(np.int64).tolist(),
+                relevance[order].tolist(), pages[order].tolist(), is_phrase.loc[order].tolist())
+        ]
     
-    def get_main_phrase(self, row):
-        if isinstance(row['keyword_phrases'], list) and len(row['keyword_phrases']) > 0:
-            return row['keyword_phrases'][0]['phrase']
-        return ''
+    def duplicate_content(self):
+        if self._duplicates is not None:
+            return self._duplicates
+        clusters = []
+        for kind, members in duplicate_clusters(self.df['content_hash'].to_numpy(),
+                                                self.df['simhash'].to_numpy()):
+            pages = self.df.iloc[members][['url', 'title', 'page_link']]
+            clusters.append({
+                'type': kind,
+                'page_count': len(members),
+                'pages': pages.to_dict('records')
+            })
+        clusters.sort(key=lambda cluster: cluster['page_count'], reverse=True)
+        self._duplicates = clusters
+        return clusters
+    
+    def site_comparison(self):
+        # Per-site averages and issue rates, for comparing the sites of a
+        # multi-site batch within the same analyzer pass.
+        df = self.df
+        table = pd.DataFrame({
+            'site': df['url'].map(lambda url: urlparse(url).netloc),
+            'word_count': df['word_count'],
+            'image_count': df['image_count'],
+            'internal_links': df['internal_links'],
+            'external_links': df['external_links'],
+            'keyword_density': df['keyword_density'],
+            'page_size_kb': df['page_size_kb'],
+            'missing_meta_description': df['meta_description_length'] == 0,
+            'h1_issues': df['h1_count'] != 1,
+            'low_content': df['word_count'] < 300,
+            'contains_schema': df['contains_schema'],
+        })
+        grouped = table.groupby('site', sort=False, observed=True)
+        comparison = grouped.mean()
+        comparison.insert(0, 'page_count', grouped.size())
+        comparison = comparison.rename(columns={
+            'word_count': 'avg_word_count',
+            'image_count': 'avg_image_count',
+            'internal_links': 'avg_internal_links',
+            'external_links': 'avg_external_links',
+            'keyword_density': 'avg_keyword_density',
+            'page_size_kb': 'avg_page_size_kb',
+            'missing_meta_description': 'missing_meta_description_rate',
+            'h1_issues': 'h1_issue_rate',
+            'low_content': 'low_content_rate',
+            'contains_schema': 'schema_rate',
+        })
+        return comparison.reset_index().to_dict('records')
     
     def get_descriptive_stats(self):
         stats = {}
@@ -84,70 +174,22 @@ class DataAnalyzer:
                         'h3_count', 'paragraph_count', 'avg_paragraph_length', 'page_size_kb',
                         'keyword_density', 'keyword_relevance']
         
-        describe_dict = self.df[numeric_cols].describe().to_dict()
-        for col in describe_dict:
-            for stat in describe_dict[col]:
-                if pd.isna(describe_dict[col][stat]):
-                    describe_dict[col][stat] = None
-        stats['numeric'] = describe_dict
-        
-        corr_dict = self.df[numeric_cols].corr().to_dict()
-        for col in corr_dict:
-            for stat in corr_dict[col]:
-                if pd.isna(corr_dict[col][stat]):
-                    corr_dict[col][stat] = None
-        stats['correlations'] = corr_dict
-        
-        all_keywords = []
-        for _, row in self.df.iterrows():
-            if isinstance(row['keywords'], list):
-                for kw, count, relevance in row['keywords']:
-                    all_keywords.append({
-                        'text': kw,
-                        'count': count,
-                        'relevance': relevance,
-                        'is_phrase': False
-                    })
-            
-            if isinstance(row['keyword_phrases'], list):
-                for phrase_dict in row['keyword_phrases']:
-                    all_keywords.append({
-                        'text': phrase_dict['phrase'],
-                        'count': phrase_dict['count'],
-                        'relevance': phrase_dict['relevance'],
-                        'is_phrase': True,
-                        'word_count': phrase_dict['words']
-                    })
-        
-        keyword_data = defaultdict(lambda: {'count': 0, 'relevance': 0, 'page_count': 0, 'is_phrase': False})
-        
-        for kw in all_keywords:
-            key = kw['text']
-            keyword_data[key]['count'] += kw['count']
-            keyword_data[key]['relevance'] += kw['relevance']
-            keyword_data[key]['page_count'] += 1
-            keyword_data[key]['is_phrase'] = kw.get('is_phrase', False)
-        
-        keyword_list = [
-            {
-                'name': k, 
-                'value': v['count'],
-                'relevance': v['relevance'],
-                'page_count': v['page_count'],
-                'is_phrase': v['is_phrase']
-            }
-            for k, v in keyword_data.items()
-        ]
+        # NaNs (e.g. the std of a single page) are left in; crawler.serialize
+        # writes them as null.
+        stats['numeric'] = self.df[numeric_cols].describe().to_dict()
+        
+        stats['correlations'] = self.df[numeric_cols].corr().to_dict()
         
-        keyword_list.sort(key=lambda x: (x['relevance'], x['value']), reverse=True)
+        keyword_list = self.keyword_totals()
         
         stats['common_keywords'] = keyword_list[:20]
         
         phrases = [kw for kw in keyword_list if kw['is_phrase']]
         stats['common_phrases'] = phrases[:15]
         
-        top_content = self.df.sort_values('word_count', ascending=False)[['url', 'title', 'word_count', 'content', 'page_link']].head(5)
-        stats['top_content_pages'] = top_content.to_dict('records')
+        top_content = self.df.sort_values('word_count', ascending=False).head(5)
+        top_content = top_content.assign(content=self.page_content(top_content))
+        stats['top_content_pages'] = top_content[['url', 'title', 'word_count', 'content', 'page_link']].to_dict('records')
         
         top_images = self.df.sort_values('image_count', ascending=False)[['url', 'title', 'image_count', 'page_link']].head(5)
         stats['top_image_pages'] = top_images.to_dict('records')
@@ -156,55 +198,10 @@ class DataAnalyzer:
         top_links = self.df.sort_values('total_links', ascending=False)[['url', 'title', 'internal_links', 'external_links', 'total_links', 'page_link']].head(5)
         stats['top_link_pages'] = top_links.to_dict('records')
         
-        keyword_by_page = []
-        for _, row in self.df.iterrows():
-            page_keywords = {
-                'url': row['url'],
-                'title': row['title'],
-                'page_link': row['page_link'],
-                'single_keywords': [],
-                'phrases': []
-            }
-            
-            if isinstance(row['keywords'], list):
-                for kw, count, relevance in row['keywords'][:5]:
-                    page_keywords['single_keywords'].append({
-                        'keyword': kw,
-                        'count': count,
-                        'relevance': relevance
-                    })
-            
-            if isinstance(row['keyword_phrases'], list):
-                for phrase_dict in row['keyword_phrases'][:3]:
-                    page_keywords['phrases'].append({
-                        'phrase': phrase_dict['phrase'],
-                        'count': phrase_dict['count'],
-                        'relevance': phrase_dict['relevance']
-                    })
-            
-            keyword_by_page.append(page_keywords)
-        
-        stats['keywords_by_page'] = keyword_by_page
-        
-        page_metrics = []
-        for _, row in self.df.iterrows():
-            metrics = {
-                'url': row['url'].split('/')[-1] if '/' in row['url'] else row['url'],
-                'wordCount': int(row['word_count']),
-                'imageCount': int(row['image_count']),
-                'internalLinks': int(row['internal_links']),
-                'externalLinks': int(row['external_links']),
-                'h1Count': int(row['h1_count']),
-                'h2Count': int(row['h2_count']),
-                'h3Count': int(row['h3_count']),
-                'keywordDensity': float(row['keyword_density']),
-                'mainKeyword': row['main_keyword'],
-                'mainPhrase': row['main_keyword_phrase'],
-                'pageLink': row['page_link']
-            }
-            page_metrics.append(metrics)
-        
-        stats['pageMetrics'] = page_metrics
+        stats['keywords_by_page'] = self.page_rows(self.keywords_by_page)
+        stats['tfidf_by_page'] = self.tfidf_by_page()
+        stats['duplicate_content'] = self.duplicate_content()
+        stats['pageMetrics'] = self.page_rows(self.page_metrics)
         
         heading_distribution = [
             {"name": "H1", "value": int(self.df['h1_count'].sum())},
@@ -221,6 +218,93 @@ class DataAnalyzer:
         
         return stats
     
+    def page_rows(self, build):
+        # A stats section with one entry per page, built by build(df).
+        return build(self.df)
+    
+    def page_keywords(self, df):
+        # Keyword rows of the pages in df, a contiguous slice of self.df;
+        # the table is in page order.
+        if len(df) == len(self.df):
+            return self.keywords
+        if df.empty:
+            return self.keywords.iloc[:0]
+        start, stop = np.searchsorted(self.keywords['page'].to_numpy(), [df.index[0], df.index[-1] + 1])
+        return self.keywords.iloc[start:stop]
+    
+    def keywords_by_page(self, df):
+        keywords = self.page_keywords(df)
+        single_keywords = defaultdict(list)
+        top = self.top_keywords(False, 5, keywords)
+        for page, term, count, relevance in zip(top['page'].tolist(), top['term'].tolist(),
+                                                top['count'].tolist(), top['relevance'].tolist()):
+            single_keywords[page].append({
+                'keyword': self.terms[term],
+                'count': count,
+                'relevance': relevance
+            })
+        
+        phrases_by_page = defaultdict(list)
+        top = self.top_keywords(True, 3, keywords)
+        for page, term, count, relevance in zip(top['page'].tolist(), top['term'].tolist(),
+                                                top['count'].tolist(), top['relevance'].tolist()):
+            phrases_by_page[page].append({
+                'phrase': self.terms[term],
+                'count': count,
+                'relevance': relevance
+            })
+        
+        keyword_by_page = []
+        for page, url, title, page_link in zip(df.index.tolist(), df['url'].tolist(),
+                                               df['title'].tolist(), df['page_link'].tolist()):
+            keyword_by_page.append({
+                'url': url,
+                'title': title,
+                'page_link': page_link,
+                'single_keywords': single_keywords.get(page, []),
+                'phrases': phrases_by_page.get(page, [])
+            })
+        
+        return keyword_by_page
+    
+    def page_documents(self, df):
+        # What the keyword engine takes for each page in df.
+        return list(zip(df['content'].tolist(), df['title'].tolist(), df['meta_description'].tolist()))
+    
+    def tfidf_by_page(self):
+        # Top TF-IDF terms of each page against the whole crawl, from one
+        # extract_batch pass over the stored page text.
+        _, tfidf = get_keyword_engine().extract_batch(self.page_documents(self.df), num_keywords=0,
+                                                      tfidf_terms=TFIDF_TERMS)
+        return self.tfidf_rows(self.df, tfidf)
+    
+    def tfidf_rows(self, df, tfidf):
+        return [
+            {
+                'url': url,
+                'page_link': page_link,
+                'terms': [{'term': term, 'score': score} for term, score in terms]
+            }
+            for url, page_link, terms in zip(df['url'].tolist(), df['page_link'].tolist(), tfidf)
+        ]
+    
+    def page_metrics(self, df):
+        columns = {
+            'url': df['url'].astype(str).str.rsplit('/', n=1).str[-1].tolist(),
+            'wordCount': df['word_count'].astype(np.int64).tolist(),
+            'imageCount': df['image_count'].astype(np.int64).tolist(),
+            'internalLinks': df['internal_links'].astype(np.int64).tolist(),
+            'externalLinks': df['external_links'].astype(np.int64).tolist(),
+            'h1Count': df['h1_count'].astype(np.int64).tolist(),
+            'h2Count': df['h2_count'].astype(np.int64).tolist(),
+            'h3Count': df['h3_count'].astype(np.int64).tolist(),
+            'keywordDensity': df['keyword_density'].astype(np.float64).tolist(),
+            'mainKeyword': df['main_keyword'].tolist(),
+            'mainPhrase': df['main_keyword_phrase'].tolist(),
+            'pageLink': df['page_link'].tolist()
+        }
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+    
     def create_recommendations(self):
         recommendations = {
             'general': [],
@@ -264,6 +348,15 @@ class DataAnalyzer:
                 'type': 'warning'
             })
         
+        duplicates = self.duplicate_content()
+        if duplicates:
+            duplicate_pages = sum(cluster['page_count'] for cluster in duplicates)
+            recommendations['content'].append({
+                'text': f"{duplicate_pages} pages in {len(duplicates)} groups have duplicate or near-duplicate content.",
+                'recommendation': "Search engines pick one page from a group of duplicates to rank. Make each page's content distinct, or point duplicates at the preferred page with a canonical link or redirect.",
+                'type': 'warning'
+            })
+        
         if self.df['keyword_density'].mean() < 0.5:
             recommendations['keywords'].append({
                 'text': f"Average keyword density: {self.df['keyword_density'].mean():.2f}%",
@@ -314,6 +407,13 @@ class DataAnalyzer:
                 'pages': no_h1_pages.head(5).to_dict('records')
             })
         
+        if duplicates:
+            recommendations['pages_to_improve'].append({
+                'issue': 'Duplicate content',
+                'description': 'These pages have the same or nearly the same content as other pages:',
+                'pages': [page for cluster in duplicates for page in cluster['pages']][:5]
+            })
+        
         no_meta_desc = self.df[self.df['meta_description_length'] == 0][['url', 'title', 'page_link']]
         if not no_meta_desc.empty:
             recommendations['pages_to_improve'].append({
@@ -330,4 +430,70 @@ class DataAnalyzer:
                 'pages': low_keyword_relevance.head(5).to_dict('records')
             })
         
-        return recommendations
\ No newline at end of file
+        return recommendations
+
+class SpillAnalyzer(DataAnalyzer):
+    # DataAnalyzer over a SpillFile, for crawls too large to hold in memory.
+    # Records are read back chunk_pages at a time into a PageStore without
+    # the page text, meta description and blob id. Every keyword row is
+    # kept, so keyword totals and the tables history records are the same
+    # as DataAnalyzer's. Sections with an entry per page are ChunkedLists
+    # built chunk_pages at a time when serialized, and the text of the top
+    # content pages is read back from the file. What stays in memory is
+    # numbers, keyword rows and short strings, under 3 KB per page, and the
+    # crawl's document frequencies for TF-IDF, counted while reading.
+    def __init__(self, spill, chunk_pages=1000):
+        self.spill = spill
+        self.chunk_pages = chunk_pages
+        engine = get_keyword_engine()
+        self.document_frequencies = Counter()
+        pages = PageStore(keep_structured=False, omit=SPILL_OMITTED_COLUMNS)
+        # The store's URL pool doubles as the set of pages seen so far; a
+        # repeated page is dropped by clean_data, so it is not counted.
+        seen = pages.pools['url'].codes
+        for chunk in spill.iter_chunks(chunk_pages):
+            documents = []
+            for metrics in chunk:
+                if metrics.get('url') not in seen:
+                    documents.append(self.record_document(metrics))
+                pages.append(metrics)
+            engine.document_frequencies(documents, self.document_frequencies)
+        super().__init__(pages)
+    
+    def record_document(self, metrics):
+        return (metrics.get('content') or '', metrics.get('title') or '', metrics.get('meta_description') or '')
+    
+    def page_rows(self, build):
+        df = self.df
+        size = self.chunk_pages
+        return ChunkedList(lambda: (build(df.iloc[start:start + size]) for start in range(0, len(df), size)))
+    
+    def spill_documents(self):
+        # (rows of df, their documents) chunk_pages at a time, read back
+        # from the file; store positions are positions in the spill file.
+        df = self.df
+        wanted = set(df.index.tolist())
+        positions, documents = [], []
+        for page, metrics in enumerate(self.spill.iter_records()):
+            if page in wanted:
+                positions.append(page)
+                documents.append(self.record_document(metrics))
+                if len(positions) == self.chunk_pages:
+                    yield df.loc[positions], documents
+                    positions, documents = [], []
+        if positions:
+            yield df.loc[positions], documents
+    
+    def tfidf_by_page(self):
+        engine = get_keyword_engine()
+        corpus = (self.document_frequencies, len(self.df))
+        return ChunkedList(lambda: (
+            self.tfidf_rows(rows, engine.extract_batch(documents, num_keywords=0, tfidf_terms=TFIDF_TERMS,
+                                                       corpus=corpus)[1])
+            for rows, documents in self.spill_documents()
+        ))
+    
+    def page_content(self, rows):
+        # Store positions are positions in the spill file.
+        return pd.Series(self.spill.field_values('content', rows.index.tolist()), index=rows.index,
+                         dtype=object)
@@ -0,0 +1,117 @@
+import queue
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from .cache import get_http_cache
+from .crawler import DEFAULT_HEADERS, WebsiteCrawler
+from .fetcher import FetchEngine
+from .registry import crawl_record
+
+
+def interleave_by_domain(urls):
+    # Deduplicated URLs in round-robin order over their domains, so a batch
+    # with many URLs of one site does not tie up every worker waiting on
+    # that site's per-host limits.
+    queues = OrderedDict()
+    for url in dict.fromkeys(urls):
+        queues.setdefault(urlparse(url).netloc.lower(), deque()).append(url)
+    ordered = []
+    while queues:
+        for domain in list(queues):
+            ordered.append(queues[domain].popleft())
+            if not queues[domain]:
+                del queues[domain]
+    return ordered
+
+
+class BatchAnalysis:
+    # Analyzes many sites at once: up to max_sites crawls run concurrently
+    # and share one FetchEngine, so per-host concurrency and rate limits
+    # hold across the whole batch. run() yields ('page', url, metrics) as
+    # pages are analyzed and ('site', url, summary) as each site finishes.
+    def __init__(self, urls, max_pages=1, max_sites=8, max_workers=16, per_host_limit=2,
+                 requests_per_second=None, parse_workers=0, registry=None):
+        self.urls = interleave_by_domain(urls)
+        self.max_pages = max_pages
+        self.max_sites = max(1, int(max_sites))
+        self.parse_workers = parse_workers
+        self.registry = registry
+        self.fetcher = FetchEngine(headers=dict(DEFAULT_HEADERS), max_workers=max_workers,
+                                   per_host_limit=per_host_limit,
+                                   requests_per_second=requests_per_second,
+                                   cache=get_http_cache())
+        self.cancel_event = threading.Event()
+        self._crawlers = set()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self.cancel_event.set()
+        with self._lock:
+            crawlers = list(self._crawlers)
+        for crawler in crawlers:
+            crawler.cancel()
+
+    def _crawl_site(self, url, events):
+        summary = {'url': url, 'status': 'failed', 'page_count': 0, 'failed_urls': [], 'error': None}
+        if self.cancel_event.is_set():
+            summary['status'] = 'cancelled'
+            events.put(('site', url, summary))
+            return
+
+        crawler = WebsiteCrawler(url, max_pages=self.max_pages, parse_workers=self.parse_workers,
+                                 fetcher=self.fetcher)
+        crawler.keep_pages = False
+        with self._lock:
+            self._crawlers.add(crawler)
+        try:
+            if self.max_pages == 1:
+                metrics = crawler.analyze_single_page(url, load_sitemap=False)
+                pages = [metrics] if metrics is not None else []
+            else:
+                pages = crawler.iter_crawl()
+            for metrics in pages:
+                summary['page_count'] += 1
+                events.put(('page', url, metrics))
+
+            if crawler.cancel_event.is_set():
+                summary['status'] = 'cancelled'
+            elif summary['page_count']:
+                summary['status'] = 'completed'
+                if self.registry is not None:
+                    record = self.registry.put(crawl_record(crawler, url, summary['page_count']))
+                    summary['crawl_id'] = record['crawl_id']
+            else:
+                summary['error'] = 'Failed to collect data from website'
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            summary['error'] = str(e)
+        finally:
+            with self._lock:
+                self._crawlers.discard(crawler)
+            summary['failed_urls'] = list(crawler.failed_urls)
+            summary['crawl_domain'] = crawler.domain
+            events.put(('site', url, summary))
+
+    def run(self):
+        events = queue.Queue()
+        executor = ThreadPoolExecutor(max_workers=self.max_sites, thread_name_prefix='batch-site')
+        try:
+            for url in self.urls:
+                executor.submit(self._crawl_site, url, events)
+            remaining = len(self.urls)
+            while remaining:
+                event = events.get()
+                if event[0] == 'site':
+                    remaining -= 1
+                yield event
+        finally:
+            # Also reached when the consumer stops early: sites not started
+            # yet are dropped and running crawls are cancelled. The shared
+            # fetcher is shut down only once no site task can submit to it,
+            # as a late submit would start a new fetch pool nobody stops.
+            self.cancel()
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.fetcher.shutdown(wait=False)
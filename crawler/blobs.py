@@ -0,0 +1,84 @@
+import hashlib
+import os
+import re
+import threading
+import zlib
+
+from .cache import CACHE_DIR, DiskCache
+
+BLOB_ID_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class BlobStore(DiskCache):
+    # Content-addressed store for page HTML: the id is the sha256 of the
+    # text, so a page seen in several crawls (or an unchanged one) is kept
+    # once. Page records only carry the id; the HTML is served on demand.
+    def blob_id(self, text):
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def put(self, text):
+        blob_id = self.blob_id(text)
+        try:
+            # Already stored, possibly by another process: only refresh it.
+            os.utime(self._path(blob_id))
+        except OSError:
+            super().put(blob_id, zlib.compress(text.encode('utf-8'), 6))
+            return blob_id
+        with self._lock:
+            if blob_id in self._index:
+                self._index.move_to_end(blob_id)
+        return blob_id
+
+    def get(self, blob_id):
+        if not BLOB_ID_RE.match(blob_id or ''):
+            return None
+        data = super().get(blob_id)
+        self.record(hit=data is not None)
+        if data is None:
+            return None
+        return zlib.decompress(data).decode('utf-8')
+
+
+class HTMLRefs:
+    # Points element markup into the stored content-area blob instead of
+    # keeping a copy per element. Each caller-named sequence is searched
+    # with its own cursor, since elements are visited in document order.
+    def __init__(self, store, html):
+        # A disabled store (None or False) stores nothing.
+        self.store = store or None
+        self.html = html
+        self.blob = self.store.put(html) if self.store is not None else None
+        self._cursors = {}
+
+    def ref(self, element_html, sequence):
+        if self.store is None:
+            return None
+        start = self.html.find(element_html, self._cursors.get(sequence, 0))
+        if start < 0:
+            return {'blob': self.store.put(element_html), 'start': 0, 'end': len(element_html)}
+        end = start + len(element_html)
+        self._cursors[sequence] = start + 1
+        return {'blob': self.blob, 'start': start, 'end': end}
+
+
+_blob_store = None
+_blob_store_lock = threading.Lock()
+
+
+def get_blob_store():
+    global _blob_store
+    if os.environ.get('SEO_BLOB_STORE', '1') == '0':
+        return None
+    with _blob_store_lock:
+        if _blob_store is None:
+            try:
+                _blob_store = BlobStore(
+                    os.path.join(CACHE_DIR, 'blobs'),
+                    max_bytes=int(os.environ.get('SEO_BLOB_STORE_MAX_MB', 1024)) * 1024 * 1024,
+                    ttl=int(os.environ.get('SEO_BLOB_STORE_TTL', 30 * 24 * 3600)),
+                )
+            except OSError as e:
+                print(f"HTML blob store disabled: {e}")
+                return None
+        return _blob_store
+
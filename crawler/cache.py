@@ -0,0 +1,304 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+CACHE_DIR = os.environ.get('SEO_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'seoanalyzer'))
+
+
+class DiskCache:
+    # Entries are files named by key; a hit refreshes the file's mtime, so
+    # the directory itself records size and recency for every process (each
+    # gunicorn worker) sharing it. The in-memory index is this process's
+    # view of it. A put rebuilds it from the directory when it goes over
+    # max_bytes or rescan_interval seconds after the last rebuild, so
+    # max_bytes bounds the shared directory, not each process; between
+    # rebuilds the directory can overshoot by what the other processes
+    # wrote in that time.
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024, ttl=7 * 24 * 3600, rescan_interval=10):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.rescan_interval = rescan_interval
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        self._index = OrderedDict()
+        self._size = 0
+        self._scanned_at = time.monotonic()
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.entry'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-6], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._size += size
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.entry')
+
+    def _forget(self, key):
+        size = self._index.pop(key, None)
+        if size is not None:
+            self._size -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                stored_at, value = pickle.load(f)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+
+        with self._lock:
+            if self.ttl and time.time() - stored_at > self.ttl:
+                self._forget(key)
+                return None
+            if key in self._index:
+                self._index.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, value):
+        data = pickle.dumps((time.time(), value), protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._size -= self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._size += len(data)
+            self.stores += 1
+            if self._size > self.max_bytes or time.monotonic() - self._scanned_at > self.rescan_interval:
+                self._load_index()
+                # Evicting down to 90% leaves room for a run of puts before
+                # the next rescan.
+                if self._size > self.max_bytes:
+                    while self._size > self.max_bytes * 0.9 and self._index:
+                        oldest = next(iter(self._index))
+                        self._forget(oldest)
+                        self.evictions += 1
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'entries': len(self._index),
+                'size_bytes': self._size,
+            }
+
+
+class HTTPCache(DiskCache):
+    def _key(self, url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def get(self, url):
+        return super().get(self._key(url))
+
+    def put(self, url, response):
+        super().put(self._key(url), {
+            'url': url,
+            'status_code': response.status_code,
+            'headers': dict(response.headers),
+            'encoding': response.encoding,
+            'content': response.content,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        })
+
+    def to_response(self, entry):
+        response = requests.Response()
+        response.status_code = entry['status_code']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = entry['encoding']
+        response.url = entry['url']
+        response._content = entry['content']
+        return response
+
+
+class ResultCache:
+    def __init__(self, directory=None, memory_bytes=64 * 1024 * 1024, disk_bytes=512 * 1024 * 1024,
+                 ttl=30 * 24 * 3600):
+        self.memory_bytes = memory_bytes
+        self.disk = DiskCache(directory, max_bytes=disk_bytes, ttl=ttl) if directory else None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+
+    def key(self, url, body, version):
+        digest = hashlib.sha256()
+        digest.update(str(version).encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(url.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(body)
+        return digest.hexdigest()
+
+    def _remember(self, key, data):
+        if len(data) > self.memory_bytes:
+            return
+        self._memory_size -= len(self._memory.pop(key, b''))
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def get(self, key):
+        # Values are kept pickled so callers always get a private copy.
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return pickle.loads(data)
+
+        value = self.disk.get(key) if self.disk else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        return value
+
+    def put(self, key, value):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._remember(key, data)
+        if self.disk:
+            try:
+                self.disk.put(key, value)
+            except OSError as e:
+                print(f"Failed to store analysis result: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_size,
+                'disk': self.disk.stats() if self.disk else None,
+            }
+
+
+def cached_get(client, cache, url, headers=None, **kwargs):
+    if not cache:
+        return client.get(url, headers=headers, **kwargs)
+
+    entry = cache.get(url)
+    request_headers = dict(headers or {})
+    if entry is not None:
+        if entry['etag']:
+            request_headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            request_headers['If-Modified-Since'] = entry['last_modified']
+
+    response = client.get(url, headers=request_headers, **kwargs)
+
+    if response.status_code == 304 and entry is not None:
+        cache.record(hit=True)
+        return cache.to_response(entry)
+
+    cache.record(hit=False)
+    cacheable = (
+        response.status_code == 200 and
+        (response.headers.get('ETag') or response.headers.get('Last-Modified')) and
+        'no-store' not in response.headers.get('Cache-Control', '')
+    )
+    if cacheable:
+        try:
+            cache.put(url, response)
+        except OSError as e:
+            print(f"Failed to cache {url}: {e}")
+    return response
+
+
+_http_cache = None
+_http_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    global _http_cache
+    if os.environ.get('SEO_HTTP_CACHE', '1') == '0':
+        return None
+    with _http_cache_lock:
+        if _http_cache is None:
+            try:
+                _http_cache = HTTPCache(
+                    os.path.join(CACHE_DIR, 'http'),
+                    max_bytes=int(os.environ.get('SEO_HTTP_CACHE_MAX_MB', 256)) * 1024 * 1024,
+                    ttl=int(os.environ.get('SEO_HTTP_CACHE_TTL', 7 * 24 * 3600)),
+                )
+            except OSError as e:
+                print(f"HTTP cache disabled: {e}")
+                return None
+        return _http_cache
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    global _result_cache
+    if os.environ.get('SEO_RESULT_CACHE', '1') == '0':
+        return None
+    with _result_cache_lock:
+        if _result_cache is None:
+            directory = os.path.join(CACHE_DIR, 'results')
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                print(f"Analysis result disk cache disabled: {e}")
+                directory = None
+            _result_cache = ResultCache(
+                directory,
+                memory_bytes=int(os.environ.get('SEO_RESULT_CACHE_MEMORY_MB', 64)) * 1024 * 1024,
+                disk_bytes=int(os.environ.get('SEO_RESULT_CACHE_DISK_MB', 512)) * 1024 * 1024,
+            )
+        return _result_cache
@@ -0,0 +1,141 @@
+import json
+import pickle
+import time
+
+from .sqlite import SQLiteStore, SharedStore, open_pruned_store
+
+
+class CheckpointStore(SQLiteStore):
+    # Crawl state on disk so a crawl can be resumed after a crash or
+    # redeploy. Pages are appended as they are checkpointed; the frontier
+    # and the rest of the crawler state are replaced on every checkpoint.
+    def __init__(self, path):
+        super().__init__(path)
+        with self._connect() as db:
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS crawls ('
+                'crawl_id TEXT PRIMARY KEY, start_url TEXT NOT NULL, max_pages INTEGER NOT NULL, '
+                'options TEXT NOT NULL, status TEXT NOT NULL, state BLOB, '
+                'created_at REAL NOT NULL, updated_at REAL NOT NULL)'
+            )
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS pages ('
+                'crawl_id TEXT NOT NULL, seq INTEGER NOT NULL, url TEXT NOT NULL, metrics BLOB NOT NULL, '
+                'info BLOB, PRIMARY KEY (crawl_id, seq))'
+            )
+            columns = [row[1] for row in db.execute('PRAGMA table_info(pages)')]
+            if 'info' not in columns:
+                db.execute('ALTER TABLE pages ADD COLUMN info BLOB')
+            db.execute('CREATE INDEX IF NOT EXISTS pages_url ON pages (crawl_id, url)')
+            db.execute('CREATE INDEX IF NOT EXISTS crawls_start_url ON crawls (start_url, updated_at)')
+
+    def create(self, crawl_id, start_url, max_pages, options=None):
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                'INSERT OR REPLACE INTO crawls (crawl_id, start_url, max_pages, options, status, state, '
+                'created_at, updated_at) VALUES (?, ?, ?, ?, ?, NULL, ?, ?)',
+                (crawl_id, start_url, max_pages, json.dumps(options or {}), 'running', now, now)
+            )
+            db.execute('DELETE FROM pages WHERE crawl_id = ?', (crawl_id,))
+
+    def save(self, crawl_id, pages, state, status='running'):
+        # pages is a list of (seq, metrics, info) not yet written; info holds
+        # what an incremental recrawl compares against (validators, body
+        # hash, lastmod, outgoing links).
+        rows = [
+            (crawl_id, seq, metrics['url'], pickle.dumps(metrics, protocol=pickle.HIGHEST_PROTOCOL),
+             pickle.dumps(info, protocol=pickle.HIGHEST_PROTOCOL) if info is not None else None)
+            for seq, metrics, info in pages
+        ]
+        with self._connect() as db:
+            db.executemany('INSERT OR REPLACE INTO pages (crawl_id, seq, url, metrics, info) '
+                           'VALUES (?, ?, ?, ?, ?)', rows)
+            if status == 'completed':
+                # A completed crawl is not resumed, so its state is dropped.
+                # Its pages are kept as the baseline for the next incremental
+                # recrawl, which makes earlier completed crawls of the same
+                # start URL obsolete.
+                state = None
+                superseded = ('SELECT crawl_id FROM crawls WHERE status = ? AND crawl_id != ? AND start_url = '
+                              '(SELECT start_url FROM crawls WHERE crawl_id = ?)')
+                db.execute(f'DELETE FROM pages WHERE crawl_id IN ({superseded})',
+                           (status, crawl_id, crawl_id))
+                db.execute(f'DELETE FROM crawls WHERE crawl_id IN ({superseded})',
+                           (status, crawl_id, crawl_id))
+            db.execute(
+                'UPDATE crawls SET state = ?, status = ?, updated_at = ? WHERE crawl_id = ?',
+                (pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL) if state is not None else None,
+                 status, time.time(), crawl_id)
+            )
+
+    def load(self, crawl_id):
+        row = self._connect().execute(
+            'SELECT start_url, max_pages, options, status, state, created_at, updated_at '
+            'FROM crawls WHERE crawl_id = ?', (crawl_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'crawl_id': crawl_id,
+            'start_url': row[0],
+            'max_pages': row[1],
+            'options': json.loads(row[2]),
+            'status': row[3],
+            'state': pickle.loads(row[4]) if row[4] is not None else None,
+            'created_at': row[5],
+            'updated_at': row[6],
+        }
+
+    def latest(self, start_url, status='completed'):
+        row = self._connect().execute(
+            'SELECT crawl_id FROM crawls WHERE start_url = ? AND status = ? ORDER BY updated_at DESC LIMIT 1',
+            (start_url, status)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_page(self, crawl_id, url):
+        row = self._connect().execute(
+            'SELECT metrics, info FROM pages WHERE crawl_id = ? AND url = ? ORDER BY seq DESC LIMIT 1',
+            (crawl_id, url)
+        ).fetchone()
+        if row is None or row[1] is None:
+            return None
+        return pickle.loads(row[0]), pickle.loads(row[1])
+
+    def page_urls(self, crawl_id):
+        rows = self._connect().execute('SELECT url FROM pages WHERE crawl_id = ? ORDER BY seq', (crawl_id,))
+        return [url for url, in rows]
+
+    def iter_pages(self, crawl_id):
+        rows = self._connect().execute('SELECT metrics FROM pages WHERE crawl_id = ? ORDER BY seq',
+                                       (crawl_id,))
+        for metrics, in rows:
+            yield pickle.loads(metrics)
+
+    def page_count(self, crawl_id):
+        return self._connect().execute('SELECT COUNT(*) FROM pages WHERE crawl_id = ?',
+                                       (crawl_id,)).fetchone()[0]
+
+    def delete(self, crawl_id):
+        with self._connect() as db:
+            db.execute('DELETE FROM pages WHERE crawl_id = ?', (crawl_id,))
+            db.execute('DELETE FROM crawls WHERE crawl_id = ?', (crawl_id,))
+
+    def prune(self, max_age):
+        cutoff = time.time() - max_age
+        with self._connect() as db:
+            db.execute('DELETE FROM pages WHERE crawl_id IN '
+                       '(SELECT crawl_id FROM crawls WHERE updated_at < ?)', (cutoff,))
+            db.execute('DELETE FROM crawls WHERE updated_at < ?', (cutoff,))
+
+
+_store = SharedStore(
+    lambda: open_pruned_store(CheckpointStore, 'SEO_CHECKPOINT_PATH', 'checkpoints.sqlite3',
+                              'SEO_CHECKPOINT_TTL', 7 * 24 * 3600, 'Crawl checkpoints'),
+    enabled_var='SEO_CHECKPOINTS',
+)
+
+
+def get_checkpoint_store():
+    return _store.get()
@@ -1,261 +1,260 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import numpy as np
 import re
-import os
-from collections import Counter, OrderedDict
-import xml.etree.ElementTree as ET
-import time
-import random
+from collections import deque
 from urllib.parse import urlparse, urljoin
-import html
+import hashlib
+import itertools
+import threading
+import uuid
+from concurrent.futures import Future
+from .blobs import HTMLRefs, get_blob_store
+from .cache import get_http_cache, get_result_cache
+from .dom import (BLOCK_TAGS, BOILERPLATE_MATCHERS, HEADING_TAGS, MAIN_CONTENT_MATCHERS,
+                  first_matches, pruned_copy, walk_content)
+from .duplicates import fingerprint
+from .fetcher import FetchEngine
+from .frontier import Frontier
+from .keywords import get_keyword_engine
+from .parsers import parse_html, resolve_parser
+from .sitemap import (SitemapEntry, SitemapReader, get_sitemap_cache, lastmod_timestamp,
+                      site_matcher)
+from .spill import SpillFile
+from .store import PageStore
+from .workers import get_analysis_pool
+
+# Bump whenever analyze_page output changes so memoized results are not reused.
+ANALYZER_VERSION = 4
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
 
 class WebsiteCrawler:
-    def __init__(self, start_url, max_pages=20):
+    def __init__(self, start_url, max_pages=20, max_workers=8, per_host_limit=4,
+                 requests_per_second=None, parse_workers=0, http_cache=None, result_cache=None,
+                 parser=None, sitemap_cache=None, prioritize=False, bloom_capacity=None,
+                 checkpoint=None, crawl_id=None, checkpoint_every=25, blob_store=None,
+                 incremental=False, fetcher=None, spill=False):
         self.start_url = start_url
         self.max_pages = max_pages
         self.visited_urls = set()
-        self.to_visit = [start_url]
+        self.frontier = Frontier(prioritized=prioritize, bloom_capacity=bloom_capacity)
         self.domain = urlparse(start_url).netloc
-        self.data = []
+        # With spill, pages go to an on-disk SpillFile as they are analyzed
+        # instead of being held in memory until the crawl ends.
+        self.data = SpillFile() if spill else PageStore()
         self.sitemap_urls = []
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        self.sitemap_lastmod = {}
+        self.headers = dict(DEFAULT_HEADERS)
+        # A fetcher passed in is shared with other crawlers (per-host limits
+        # then apply across all of them) and is left running at the end.
+        self.owns_fetcher = fetcher is None
+        if fetcher is None:
+            fetcher = FetchEngine(headers=self.headers, max_workers=max_workers,
+                                  per_host_limit=per_host_limit,
+                                  requests_per_second=requests_per_second,
+                                  cache=http_cache if http_cache is not None else get_http_cache())
+        self.fetcher = fetcher
+        self.start_links = []
+        self.sitemap_max_bytes = 50 * 1024 * 1024
+        self.sitemap_workers = 4
+        self.sitemap_cache = sitemap_cache if sitemap_cache is not None else get_sitemap_cache()
+        self.parse_workers = parse_workers
+        self.parser = resolve_parser(parser)
+        self.result_cache = result_cache if result_cache is not None else get_result_cache()
+        self.blob_store = blob_store if blob_store is not None else get_blob_store()
+        self.failed_urls = []
+        self.pages_analyzed = 0
+        self.keep_pages = True
+        self.in_flight_count = 0
+        self.on_page = None
+        self.cancel_event = threading.Event()
+        # Settings a resumed crawl is rebuilt with.
+        self.options = {
+            'max_workers': max_workers, 'per_host_limit': per_host_limit,
+            'requests_per_second': requests_per_second, 'parse_workers': parse_workers,
+            'parser': self.parser, 'prioritize': prioritize, 'bloom_capacity': bloom_capacity,
+            'checkpoint_every': checkpoint_every, 'incremental': incremental, 'spill': spill,
         }
+        self.checkpoint = checkpoint
+        self.crawl_id = crawl_id or uuid.uuid4().hex
+        self.checkpoint_every = checkpoint_every
+        self.resumed = False
+        self.depths = {}
+        self._unsaved = []
+        # Incremental recrawls compare each page against the newest completed
+        # checkpointed crawl of the same start URL and reuse its analysis
+        # when the page has not changed.
+        self.incremental = incremental and checkpoint is not None
+        self.baseline = None
+        self.pages_skipped = 0
     
-    def get_sitemap_urls(self):
-        sitemap_url = urljoin(self.start_url, '/sitemap.xml')
+    @classmethod
+    def resume(cls, crawl_id, checkpoint, **overrides):
+        saved = checkpoint.load(crawl_id)
+        if saved is None:
+            return None
+        options = dict(saved['options'])
+        options.update(overrides)
+        crawler = cls(saved['start_url'], max_pages=saved['max_pages'], checkpoint=checkpoint,
+                      crawl_id=crawl_id, **options)
+        if saved['state'] is not None:
+            crawler.restore(saved['state'])
+        return crawler
+    
+    def restore(self, state):
+        # Completed pages stay in the checkpoint store; only their URLs are
+        # loaded here (the pages themselves when the crawl is run with
+        # keep_pages).
+        self.visited_urls = set(self.checkpoint.page_urls(self.crawl_id))
+        self.pages_analyzed = len(self.visited_urls)
+        self.failed_urls = list(state['failed_urls'])
+        self.frontier = Frontier.from_snapshot(state['frontier'],
+                                               itertools.chain(self.visited_urls, self.failed_urls))
+        self.start_links = list(state['start_links'])
+        self.depths = dict(state['depths'])
+        self.baseline = state.get('baseline')
+        self.pages_skipped = state.get('pages_skipped', 0)
+        self.resumed = True
+        print(f"Resuming crawl {self.crawl_id} after {self.pages_analyzed} pages")
+    
+    def save_checkpoint(self, in_flight=(), status='running'):
+        if not self.checkpoint:
+            return
+        state = {
+            'frontier': self.frontier.snapshot(in_flight),
+            'failed_urls': self.failed_urls,
+            'start_links': self.start_links,
+            'depths': self.depths,
+            'baseline': self.baseline,
+            'pages_skipped': self.pages_skipped,
+        }
         try:
-            response = requests.get(sitemap_url, headers=self.headers, timeout=10)
-            if response.status_code == 200:
-                root = ET.fromstring(response.content)
-
-                urls = []
-                for url in root.findall('.//{http://www.sitemaps.org/schemas/sitemap/0.9}loc'):
-                    urls.append(url.text)
-                
-                sitemapindex_urls = []
-                for sitemap in root.findall('.//{http://www.sitemaps.org/schemas/sitemap/0.9}sitemap'):
-                    loc = sitemap.find('.//{http://www.sitemaps.org/schemas/sitemap/0.9}loc')
-                    if loc is not None and loc.text:
-                        sitemapindex_urls.append(loc.text)
-                
-                for nested_sitemap_url in sitemapindex_urls:
-                    try:
-                        nested_response = requests.get(nested_sitemap_url, headers=self.headers, timeout=10)
-                        if nested_response.status_code == 200:
-                            nested_root = ET.fromstring(nested_response.content)
-                            for url in nested_root.findall('.//{http://www.sitemaps.org/schemas/sitemap/0.9}loc'):
-                                urls.append(url.text)
-                    except Exception as e:
-                        print(f"Error accessing nested sitemap {nested_sitemap_url}: {e}")
-                
-                urls = [url for url in urls if self.domain in url]
-                
-                urls = [url for url in urls if not url.endswith('.xml')]
-                
-                self.sitemap_urls = urls
-                return urls
-            else:
-                print(f"Sitemap not found at {sitemap_url}")
-                return []
+            self.checkpoint.save(self.crawl_id, self._unsaved, state, status)
+            self._unsaved = []
         except Exception as e:
-            print(f"Error accessing sitemap: {e}")
-            return []
+            print(f"Failed to checkpoint crawl {self.crawl_id}: {e}")
     
-    def extract_keywords(self, text, title='', meta_description='', num_keywords=10):
-        import re
-        from collections import Counter
-        
+    def cancel(self):
+        self.cancel_event.set()
+    
+    def record_page(self, metrics, info=None, reused=False):
+        self.pages_analyzed += 1
+        if reused:
+            self.pages_skipped += 1
+        if self.keep_pages:
+            self.data.append(metrics)
+        if self.checkpoint:
+            self._unsaved.append((self.pages_analyzed, metrics, info))
+        if self.on_page is not None:
+            self.on_page(metrics)
+    
+    def sitemap_location(self):
+        return urljoin(self.start_url, '/sitemap.xml')
+    
+    def sitemap_filter(self):
+        on_site = site_matcher(self.domain)
+        return lambda url: on_site(url) and not url.endswith(('.xml', '.xml.gz'))
+    
+    def sitemap_reader(self):
+        return SitemapReader(headers=self.headers, max_workers=self.sitemap_workers,
+                             max_bytes=self.sitemap_max_bytes, documents=self.sitemap_cache or None)
+    
+    def iter_sitemap_entries(self):
+        # Yields sitemap entries for this site while the sitemap (and any
+        # child sitemaps) are still being read; sitemap_urls and
+        # sitemap_lastmod fill up as it goes. A fresh cached summary is
+        # replayed without touching the network.
+        self.sitemap_urls = []
+        self.sitemap_lastmod = {}
+        sitemap_url = self.sitemap_location()
+        summary = self.sitemap_cache.get_summary(sitemap_url) if self.sitemap_cache else None
+        reader = None
+        if summary is not None and self.sitemap_cache.is_fresh(summary):
+            entries = (SitemapEntry(url, summary['lastmod'].get(url)) for url in summary['urls'])
+        else:
+            reader = self.sitemap_reader()
+            entries = reader.iter_entries(sitemap_url, self.sitemap_filter())
         try:
-            stopwords = ['the', 'and', 'is', 'in', 'it', 'of', 'to', 'a', 'for', 'with', 'on', 'by', 
-                        'this', 'that', 'be', 'are', 'as', 'i', 'you', 'he', 'she', 'we', 'they',
-                        'was', 'were', 'have', 'has', 'had', 'can', 'could', 'will', 'would', 'may', 
-                        'might', 'should', 'shall', 'must', 'do', 'does', 'did', 'but', 'or', 'if',
-                        'then', 'else', 'when', 'where', 'why', 'how', 'all', 'any', 'both', 'each',
-                        'more', 'most', 'other', 'some', 'such', 'than', 'too', 'very', 'just', 'use',
-                        'get', 'make', 'like', 'using', 'used', 'would', 'also', 'may', 'one', 'well',
-                        'many', 'could', 'much', 'even', 'new', 'see', 'time', 'way']
-            
-            try:
-                import nltk
-                
-                nltk_data_dir = os.path.expanduser("~/nltk_data")
-                os.makedirs(nltk_data_dir, exist_ok=True)
-                
-                try:
-                    nltk.download('punkt', quiet=True, download_dir=nltk_data_dir)
-                    nltk.download('stopwords', quiet=True, download_dir=nltk_data_dir)
-                    nltk.download('wordnet', quiet=True, download_dir=nltk_data_dir)
-                    
-                    from nltk.corpus import stopwords as nltk_stopwords
-                    from nltk.tokenize import word_tokenize
-                    from nltk.stem import WordNetLemmatizer
-                    
-                    print("NLTK resources downloaded successfully")
-                    
-                    all_text = (title + " " + title + " " + meta_description + " " + 
-                               meta_description + " " + text).lower()
-                    
-                    words = word_tokenize(all_text)
-                    
-                    stop_words = set(nltk_stopwords.words('english'))
-                    stop_words.update(stopwords)
-                    
-                    lemmatizer = WordNetLemmatizer()
-                    
-                    processed_words = []
-                    for word in words:
-                        if (
-                            word.isalpha() and
-                            len(word) > 2 and
-                            word not in stop_words
-                        ):
-                            lemma = lemmatizer.lemmatize(word)
-                            processed_words.append(lemma)
-                    
-                    word_counts = Counter(processed_words)
-                    
-                    try:
-                        bigrams = list(nltk.bigrams(processed_words))
-                        trigrams = list(nltk.trigrams(processed_words))
-                        
-                        bigram_counts = Counter(bigrams)
-                        trigram_counts = Counter(trigrams)
-                        
-                        use_advanced = True
-                    except Exception as e:
-                        print(f"NLTK n-gram extraction failed: {e}")
-                        use_advanced = False
-                    
-                except Exception as e:
-                    print(f"Error with NLTK processing: {e}")
-                    use_advanced = False
-                    
-            except ImportError:
-                print("NLTK not available, using basic extraction")
-                use_advanced = False
-            
-            if 'use_advanced' not in locals() or not use_advanced:
-                all_text = (title + " " + meta_description + " " + text).lower()
-                words = re.findall(r'\b[a-zA-Z]{3,15}\b', all_text)
-                words = [word for word in words if word not in stopwords]
-                word_counts = Counter(words)
-                bigram_counts = Counter()
-                trigram_counts = Counter()
-            
-            keywords = []
-            
-            for word, count in word_counts.most_common(num_keywords):
-                relevance = count * (0.5 + min(len(word) / 10.0, 0.5))
-                keywords.append((word, count, relevance))
-            
-            if 'use_advanced' in locals() and use_advanced:
-                for bigram, count in bigram_counts.most_common(num_keywords // 2):
-                    if count > 1:
-                        phrase = " ".join(bigram)
-                        relevance = count * 1.2
-                        keywords.append((phrase, count, relevance))
-                
-                for trigram, count in trigram_counts.most_common(num_keywords // 4):
-                    if count > 1:
-                        phrase = " ".join(trigram)
-                        relevance = count * 1.5
-                        keywords.append((phrase, count, relevance))
-            
-            title_words = set(re.findall(r'\b[a-zA-Z]{3,15}\b', title.lower()))
-            meta_words = set(re.findall(r'\b[a-zA-Z]{3,15}\b', meta_description.lower()))
-            
-            for i, (keyword, count, relevance) in enumerate(keywords):
-                keyword_words = set(keyword.split())
-                
-                if keyword_words.intersection(title_words):
-                    keywords[i] = (keyword, count, relevance * 1.5)
-                    
-                if keyword_words.intersection(meta_words):
-                    keywords[i] = (keyword, count, relevance * 1.3)
-            
-            keywords.sort(key=lambda x: x[2], reverse=True)
-            
-            return keywords[:num_keywords]
-            
+            for entry in entries:
+                self.sitemap_urls.append(entry.loc)
+                if entry.lastmod:
+                    self.sitemap_lastmod[entry.loc] = entry.lastmod
+                yield entry
         except Exception as e:
-            print(f"Keyword extraction failed with error: {e}")
-            word_list = re.findall(r'\b[a-zA-Z]{3,15}\b', text.lower())
-            word_list = [w for w in word_list if w not in stopwords]
-            word_counts = Counter(word_list).most_common(num_keywords)
-            return [(word, count, count) for word, count in word_counts]
+            print(f"Error accessing sitemap: {e}")
+            return
+        if reader is not None and reader.complete and self.sitemap_cache:
+            self.sitemap_cache.put_summary(sitemap_url, self.sitemap_urls, self.sitemap_lastmod)
+    
+    def get_sitemap_urls(self):
+        # A stale cached summary is served immediately and refreshed in the
+        # background, so single-page analyses only wait on the sitemap the
+        # first time a site is seen.
+        if self.sitemap_cache:
+            sitemap_url = self.sitemap_location()
+            summary = self.sitemap_cache.get_summary(sitemap_url)
+            if summary is not None:
+                self.sitemap_urls = list(summary['urls'])
+                self.sitemap_lastmod = dict(summary['lastmod'])
+                if not self.sitemap_cache.is_fresh(summary):
+                    self.sitemap_cache.refresh_in_background(sitemap_url, self.sitemap_reader(),
+                                                             self.sitemap_filter())
+                return self.sitemap_urls
+        
+        for _ in self.iter_sitemap_entries():
+            pass
+        return self.sitemap_urls
+    
+    def extract_keywords(self, text, title='', meta_description='', num_keywords=10):
+        return get_keyword_engine().extract(text, title, meta_description, num_keywords)
+    
+    def extract_keywords_batch(self, documents, num_keywords=10, tfidf_terms=10, corpus=None):
+        return get_keyword_engine().extract_batch(documents, num_keywords, tfidf_terms, corpus)
     
     def find_content_area(self, soup):
-        main_content_selectors = [
-            'main', 'article', '#content', '.content', 
-            '#main-content', '.main-content', '.post-content', '.entry-content',
-            '.page-content', '#primary', '.site-content', '[role="main"]'
-        ]
-        
-        content_area = None
-        for selector in main_content_selectors:
-            content_area = soup.select_one(selector)
+        for content_area in first_matches(soup, MAIN_CONTENT_MATCHERS):
             if content_area and len(content_area.get_text(strip=True)) > 100:
                 return content_area
         
         body = soup.find('body')
         if not body:
             return soup
-            
-        content_area = BeautifulSoup(str(body), 'html.parser')
-        
-        elements_to_remove = [
-            'header', '.header', '#header', 'nav', '.nav', '#nav',
-            'footer', '.footer', '#footer', '.site-footer',
-            '.sidebar', '#sidebar', 'aside', '.widget', '.widgets',
-            '.advertisement', '.ads', '.ad-container',
-            '.menu', '#menu', '.navigation', '.social-links',
-            '.site-header', '.site-footer', '.comments', '#comments',
-            '.cookie-notice', '.popup', '.modal'
-        ]
-        
-        for selector in elements_to_remove:
-            for element in content_area.select(selector):
-                element.decompose()
-        
-        return content_area
+        
+        return pruned_copy(body, BOILERPLATE_MATCHERS)
     
-    def extract_structured_content(self, soup):
+    def extract_structured_content(self, soup, stats=None):
+        refs = HTMLRefs(self.blob_store, str(soup))
         structured_content = {
-            'html': str(soup),
+            'html_blob': refs.blob,
             'headings': [],
             'sections': []
         }
 
-        content_area = self.find_content_area(soup)
-        
-        headings = content_area.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+        if stats is None:
+            stats = walk_content(self.find_content_area(soup))
         
-        for heading in headings:
+        for heading in stats.headings:
             structured_content['headings'].append({
                 'level': int(heading.name[1]),
                 'text': heading.get_text(strip=True),
-                'html': str(heading)
+                'html_ref': refs.ref(str(heading), 'headings')
             })
         
         current_heading = None
         current_content = []
+        # Serialized HTML stands in for the elements themselves: Tag hashes
+        # by its markup anyway, and the string is needed for the output.
         processed_elements = set()
         
-        top_level_elements = []
-        for element in content_area.children:
-            if element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'ul', 'ol', 'table', 'div']:
-                top_level_elements.append(element)
-        
-        for element in top_level_elements:
-            if element in processed_elements:
+        for top in stats.top_level:
+            element = top.element
+            element_html = str(element)
+            if element_html in processed_elements:
                 continue
                 
-            processed_elements.add(element)
+            processed_elements.add(element_html)
             
-            if element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
+            if element.name in HEADING_TAGS:
                 if current_heading and current_content:
                     structured_content['sections'].append({
                         'heading': current_heading,
@@ -265,32 +264,29 @@ class WebsiteCrawler:
                 current_heading = {
                     'level': int(element.name[1]),
                     'text': element.get_text(strip=True),
-                    'html': str(element)
+                    'html_ref': refs.ref(element_html, 'top')
                 }
                 current_content = []
-            elif element.name in ['p', 'ul', 'ol', 'table']:
+            elif element.name in BLOCK_TAGS:
                 content_text = element.get_text(strip=True)
                 if content_text:
                     current_content.append({
                         'type': element.name,
                         'text': content_text,
-                        'html': str(element)
+                        'html_ref': refs.ref(element_html, 'top')
                     })
             elif element.name == 'div':
-                has_heading = bool(element.find(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']))
-                
-                if not has_heading:
-                    inner_elements = element.find_all(['p', 'ul', 'ol', 'table'])
-                    
-                    if inner_elements:
-                        for inner in inner_elements:
-                            processed_elements.add(inner)
+                if not top.has_heading:
+                    if top.blocks:
+                        for inner in top.blocks:
+                            inner_html = str(inner)
+                            processed_elements.add(inner_html)
                             content_text = inner.get_text(strip=True)
                             if content_text:
                                 current_content.append({
                                     'type': inner.name,
                                     'text': content_text,
-                                    'html': str(inner)
+                                    'html_ref': refs.ref(inner_html, 'inner')
                                 })
                     else:
                         content_text = element.get_text(strip=True)
@@ -298,7 +294,7 @@ class WebsiteCrawler:
                             current_content.append({
                                 'type': 'div',
                                 'text': content_text,
-                                'html': str(element)
+                                'html_ref': refs.ref(element_html, 'top')
                             })
         
         if current_heading and current_content:
@@ -307,20 +303,18 @@ class WebsiteCrawler:
                 'content': current_content
             })
         
-        if not structured_content['sections'] and len(content_area.get_text(strip=True)) > 0:
-            paragraphs = []
-            for p in content_area.find_all(['p', 'ul', 'ol', 'table']):
-                if p not in processed_elements:
-                    paragraphs.append(p)
-            
+        if not structured_content['sections'] and stats.has_text:
             content = []
-            for p in paragraphs:
+            for p in stats.blocks:
+                p_html = str(p)
+                if p_html in processed_elements:
+                    continue
                 text = p.get_text(strip=True)
                 if text:
                     content.append({
                         'type': p.name,
                         'text': text,
-                        'html': str(p)
+                        'html_ref': refs.ref(p_html, 'blocks')
                     })
             
             if content:
@@ -354,9 +348,15 @@ class WebsiteCrawler:
             'content': '',
             'structured_content': {},
             'page_link': url,
-            'raw_html': str(soup),
+            'html_blob': None,
+            'content_hash': None,
+            'simhash': None,
         }
         
+        raw_html = str(soup)
+        if self.blob_store:
+            metrics['html_blob'] = self.blob_store.put(raw_html)
+        
         title_tag = soup.find('title')
         title_text = title_tag.text.strip() if title_tag else 'No Title'
         metrics['title'] = title_text
@@ -370,10 +370,14 @@ class WebsiteCrawler:
         
         content_area = self.find_content_area(soup)
         
-        metrics['structured_content'] = self.extract_structured_content(content_area)
+        stats = walk_content(content_area)
         
-        text_content = ' '.join([p.text for p in content_area.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li'])])
-        metrics['word_count'] = len(re.findall(r'\b\w+\b', text_content))
+        metrics['structured_content'] = self.extract_structured_content(content_area, stats)
+        
+        text_content = ' '.join(stats.texts)
+        words = re.findall(r'\b\w+\b', text_content)
+        metrics['word_count'] = len(words)
+        metrics['content_hash'], metrics['simhash'] = fingerprint(words)
         
         metrics['content'] = text_content[:2000] + '...' if len(text_content) > 2000 else text_content
         
@@ -396,26 +400,21 @@ class WebsiteCrawler:
         metrics['keywords'] = single_words
         metrics['keyword_phrases'] = phrases
         
-        metrics['image_count'] = len(content_area.find_all('img'))
+        metrics['image_count'] = stats.image_count
         
-        headings = content_area.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-        metrics['heading_count'] = len(headings)
-        metrics['h1_count'] = len(content_area.find_all('h1'))
-        metrics['h2_count'] = len(content_area.find_all('h2'))
-        metrics['h3_count'] = len(content_area.find_all('h3'))
+        metrics['heading_count'] = len(stats.headings)
+        metrics['h1_count'] = stats.heading_counts['h1']
+        metrics['h2_count'] = stats.heading_counts['h2']
+        metrics['h3_count'] = stats.heading_counts['h3']
         
-        paragraphs = content_area.find_all('p')
-        metrics['paragraph_count'] = len(paragraphs)
-        if paragraphs:
-            total_length = sum(len(p.text.split()) for p in paragraphs)
-            metrics['avg_paragraph_length'] = total_length / len(paragraphs)
+        metrics['paragraph_count'] = len(stats.paragraph_words)
+        if stats.paragraph_words:
+            metrics['avg_paragraph_length'] = sum(stats.paragraph_words) / len(stats.paragraph_words)
         
-        all_links = content_area.find_all('a', href=True)
         internal_links = 0
         external_links = 0
         
-        for link in all_links:
-            href = link['href']
+        for href in stats.hrefs:
             if href.startswith('#') or not href:
                 continue
             elif href.startswith('/') or self.domain in href:
@@ -426,93 +425,264 @@ class WebsiteCrawler:
         metrics['internal_links'] = internal_links
         metrics['external_links'] = external_links
         
-        metrics['contains_schema'] = bool(soup.find_all('script', type='application/ld+json'))
+        metrics['contains_schema'] = soup.find('script', type='application/ld+json') is not None
         
-        metrics['page_size_kb'] = len(str(soup)) / 1024
+        metrics['page_size_kb'] = len(raw_html) / 1024
         
         return metrics
     
-    def crawl_single_page(self, url=None):
-        if url is None:
-            url = self.start_url
-            
+    def analyzer_version(self):
+        return f"{ANALYZER_VERSION}:{self.parser}"
+    
+    def previous_page(self, url):
+        # (metrics, info) for url from the baseline crawl, or None.
+        if not self.baseline:
+            return None
+        try:
+            return self.checkpoint.get_page(self.baseline, url)
+        except Exception as e:
+            print(f"Failed to load previous crawl of {url}: {e}")
+            return None
+    
+    def conditional_headers(self, previous):
+        headers = {}
+        if previous is not None:
+            info = previous[1]
+            if info.get('etag'):
+                headers['If-None-Match'] = info['etag']
+            if info.get('last_modified'):
+                headers['If-Modified-Since'] = info['last_modified']
+        return headers
+    
+    def page_info(self, url, response, links, body_hash=None):
+        # What the next incremental crawl compares this page against.
+        return {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'body_hash': body_hash or hashlib.sha256(response.content).hexdigest(),
+            'lastmod': self.sitemap_lastmod.get(url),
+            'analyzer': self.analyzer_version(),
+            'links': links,
+        }
+    
+    def unchanged_in_sitemap(self, url, previous):
+        # The sitemap still declares the lastmod the page had last time, so
+        # it is not fetched at all.
+        if previous is None or previous[1].get('analyzer') != self.analyzer_version():
+            return False
+        lastmod = self.sitemap_lastmod.get(url)
+        return bool(lastmod) and previous[1].get('lastmod') == lastmod
+    
+    def reused_result(self, url, response, previous):
+        metrics, info = previous
+        info = dict(info, lastmod=self.sitemap_lastmod.get(url, info.get('lastmod')))
+        if response is not None and response.status_code == 200:
+            info.update(etag=response.headers.get('ETag') or info.get('etag'),
+                        last_modified=response.headers.get('Last-Modified') or info.get('last_modified'))
+        return response, (metrics, info['links']), info, True
+    
+    def page_result(self, url, response, previous=None, pool=None):
+        # Returns (response, (metrics, links) or None, info, reused). A page
+        # is reused from the baseline crawl when it answers 304 or its body
+        # hashes the same as last time.
+        body_hash = None
+        if previous is not None and previous[1].get('analyzer') == self.analyzer_version():
+            if response.status_code == 304:
+                return self.reused_result(url, response, previous)
+            if response.status_code == 200:
+                body_hash = hashlib.sha256(response.content).hexdigest()
+                if body_hash == previous[1].get('body_hash'):
+                    return self.reused_result(url, response, previous)
+        
+        response, analyzed = self.analyze_response(url, response, pool)
+        info = None
+        if analyzed is not None and self.checkpoint:
+            info = self.page_info(url, response, analyzed[1], body_hash)
+        return response, analyzed, info, False
+    
+    def analyze_single_page(self, url, load_sitemap=True):
         print(f"Analyzing single page: {url}")
         
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                metrics = self.analyze_page(url, soup)
-                self.data = [metrics]
+            previous = self.previous_page(url)
+            response = self.fetcher.fetch(url, self.conditional_headers(previous))
+            response, analyzed, info, reused = self.page_result(url, response, previous)
+            if analyzed is not None:
+                metrics, links = analyzed
+                if isinstance(self.data, SpillFile):
+                    self.data.delete()
+                    self.data = SpillFile()
+                else:
+                    self.data = PageStore(keep_structured=self.data.keep_structured)
+                self.record_page(metrics, info, reused)
                 self.visited_urls.add(url)
+                self.frontier.mark_seen(url)
+                self.start_links = links
                 print(f"Successfully analyzed page: {url}")
                 
-                self.get_sitemap_urls()
+                if load_sitemap:
+                    self.get_sitemap_urls()
                 
-                return pd.DataFrame(self.data)
+                return metrics
             else:
                 print(f"Failed to access page: {response.status_code}")
-                return pd.DataFrame()
+                self.failed_urls.append(url)
         except Exception as e:
             print(f"Error analyzing page {url}: {e}")
-            return pd.DataFrame()
+            self.failed_urls.append(url)
+        return None
     
-    def crawl(self):
-        df = self.crawl_single_page()
+    def crawl_single_page(self, url=None):
+        if url is None:
+            url = self.start_url
         
-        if df.empty:
-            return df
+        if self.analyze_single_page(url) is None:
+            return PageStore()
+        return self.data
+    
+    def extract_links(self, soup):
+        links = []
+        for link in soup.find_all('a', href=True):
+            url = link['href']
+            if url.startswith('/'):
+                url = urljoin(self.start_url, url)
+            if self.domain in url:
+                links.append(url)
+        return links
+    
+    def enqueue_links(self, links, depths=None, depth=1):
+        for url in links:
+            if self.frontier.add(url, (depth, 0)) and depths is not None:
+                depths[url] = depth
+    
+    def analyze_response(self, url, response, pool=None):
+        if response.status_code != 200:
+            return response, None
+        
+        key = None
+        if self.result_cache:
+            key = self.result_cache.key(url, response.content, self.analyzer_version())
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                return response, cached
+        
+        if pool is not None:
+            analyzed = pool.analyze(url, self.start_url, response.content, response.encoding,
+                                    self.parser)
+        else:
+            soup = parse_html(response.text, self.parser)
+            analyzed = (self.analyze_page(url, soup), list(dict.fromkeys(self.extract_links(soup))))
         
-        if not self.sitemap_urls:
-            self.get_sitemap_urls()
-            
-        if self.sitemap_urls:
-            print(f"Found {len(self.sitemap_urls)} URLs in sitemap")
-            for url in self.sitemap_urls:
-                if url not in self.visited_urls and len(self.visited_urls) < self.max_pages:
-                    self.to_visit.append(url)
+        if key is not None:
+            self.result_cache.put(key, analyzed)
+        return response, analyzed
+    
+    def iter_crawl(self):
+        if self.resumed:
+            if self.keep_pages and not self.data:
+                self.data.extend(self.checkpoint.iter_pages(self.crawl_id))
         else:
-            response = requests.get(self.start_url, headers=self.headers, timeout=10)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                links = soup.find_all('a', href=True)
-                for link in links:
-                    url = link['href']
-                    if url.startswith('/'):
-                        url = urljoin(self.start_url, url)
-                    
-                    if self.domain in url and url not in self.visited_urls and url not in self.to_visit:
-                        self.to_visit.append(url)
-        
-        while self.to_visit and len(self.visited_urls) < self.max_pages:
-            url = self.to_visit.pop(0)
-            
-            if url in self.visited_urls:
-                continue
+            if self.incremental:
+                self.baseline = self.checkpoint.latest(self.start_url)
+                if self.baseline:
+                    print(f"Incremental crawl against {self.baseline}")
+            if self.checkpoint:
+                self.checkpoint.create(self.crawl_id, self.start_url, self.max_pages, self.options)
+            start_metrics = self.analyze_single_page(self.start_url, load_sitemap=False)
             
-            try:
-                time.sleep(random.uniform(0.5, 1.5))
+            if start_metrics is None:
+                self.save_checkpoint(status='failed')
+                return
+            yield start_metrics
+        
+        # Sitemap URLs go ahead of discovered links and are taken as the crawl
+        # needs them, so fetching starts while the sitemap is still being read.
+        # A prioritized frontier needs every entry up front to order them.
+        sitemap = self.iter_sitemap_entries()
+        first_entry = next(sitemap, None)
+        depths = self.depths
+        if first_entry is None:
+            self.enqueue_links(self.start_links, depths)
+        elif self.frontier.prioritized:
+            for entry in itertools.chain([first_entry], sitemap):
+                self.frontier.add(entry.loc, (1, -lastmod_timestamp(entry.lastmod)))
+        else:
+            self.frontier.feed(entry.loc for entry in itertools.chain([first_entry], sitemap))
+        
+        # Pages are fetched and analyzed on the engine's thread pool (analysis
+        # moves to the process pool when parse_workers is set); results are
+        # consumed in queue order so the crawl is identical to a sequential one.
+        pool = get_analysis_pool(self.parse_workers) if self.parse_workers else None
+        
+        in_flight = deque()
+        status = 'running'
+        try:
+            while (self.frontier or in_flight) and not self.cancel_event.is_set():
+                while (self.frontier and len(in_flight) < self.fetcher.max_workers and
+                       len(self.visited_urls) + len(in_flight) < self.max_pages):
+                    url = self.frontier.pop()
+                    if url in self.visited_urls:
+                        continue
+                    previous = self.previous_page(url)
+                    if self.unchanged_in_sitemap(url, previous):
+                        future = Future()
+                        future.set_result(self.reused_result(url, None, previous))
+                    else:
+                        print(f"Crawling: {url}")
+                        handler = lambda url, response, previous=previous: self.page_result(
+                            url, response, previous, pool)
+                        future = self.fetcher.submit(url, handler, self.conditional_headers(previous))
+                    in_flight.append((url, future))
+                    self.in_flight_count = len(in_flight)
                 
-                print(f"Crawling: {url}")
+                if not in_flight:
+                    break
                 
-                response = requests.get(url, headers=self.headers, timeout=10)
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    metrics = self.analyze_page(url, soup)
-                    self.data.append(metrics)
-                    self.visited_urls.add(url)
-                    
-                    links = soup.find_all('a', href=True)
-                    for link in links:
-                        new_url = link['href']
-                        if new_url.startswith('/'):
-                            new_url = urljoin(self.start_url, new_url)
-                        
-                        if self.domain in new_url and new_url not in self.visited_urls and new_url not in self.to_visit:
-                            self.to_visit.append(new_url)
-            except Exception as e:
-                print(f"Error crawling {url}: {e}")
-        
-        print(f"Crawling complete. Visited {len(self.visited_urls)} pages.")
-        
-        return pd.DataFrame(self.data)
\ No newline at end of file
+                url, future = in_flight.popleft()
+                self.in_flight_count = len(in_flight)
+                try:
+                    response, analyzed, info, reused = future.result()
+                    if analyzed is not None:
+                        metrics, links = analyzed
+                        self.record_page(metrics, info, reused)
+                        self.visited_urls.add(url)
+                        self.enqueue_links(links, depths, depths.get(url, 1) + 1)
+                        if len(self._unsaved) >= self.checkpoint_every:
+                            self.save_checkpoint([url for url, _ in in_flight])
+                        yield metrics
+                    else:
+                        self.failed_urls.append(url)
+                except Exception as e:
+                    print(f"Error crawling {url}: {e}")
+                    self.failed_urls.append(url)
+            status = 'cancelled' if self.cancel_event.is_set() else 'completed'
+        finally:
+            # An interrupted crawl keeps its in-flight URLs queued for a resume.
+            self.save_checkpoint([url for url, _ in in_flight], status)
+            for _, future in in_flight:
+                future.cancel()
+            self.in_flight_count = 0
+            if self.owns_fetcher:
+                self.fetcher.shutdown(wait=False)
+        
+        if self.cancel_event.is_set():
+            self.frontier.close()
+            sitemap.close()
+            print(f"Crawl cancelled after {len(self.visited_urls)} pages.")
+        else:
+            for _ in sitemap:
+                pass
+            if self.sitemap_urls:
+                print(f"Found {len(self.sitemap_urls)} URLs in sitemap")
+            print(f"Crawling complete. Visited {len(self.visited_urls)} pages.")
+            if self.baseline:
+                print(f"Reused {self.pages_skipped} unchanged pages from crawl {self.baseline}")
+    
+    def crawl(self):
+        for _ in self.iter_crawl():
+            pass
+        
+        if self.checkpoint and not self.keep_pages:
+            # Nothing was kept during the crawl, so the store is still empty.
+            self.data.extend(self.checkpoint.iter_pages(self.crawl_id))
+        return self.data
\ No newline at end of file
@@ -0,0 +1,176 @@
+from bs4 import BeautifulSoup
+from bs4.element import NavigableString, Tag
+
+HEADING_TAGS = frozenset(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+TEXT_TAGS = HEADING_TAGS | {'p', 'li'}
+BLOCK_TAGS = frozenset(['p', 'ul', 'ol', 'table'])
+SECTION_TAGS = HEADING_TAGS | BLOCK_TAGS | {'div'}
+
+
+MAIN_CONTENT_SELECTORS = [
+    'main', 'article', '#content', '.content',
+    '#main-content', '.main-content', '.post-content', '.entry-content',
+    '.page-content', '#primary', '.site-content', '[role="main"]'
+]
+
+BOILERPLATE_SELECTORS = [
+    'header', '.header', '#header', 'nav', '.nav', '#nav',
+    'footer', '.footer', '#footer', '.site-footer',
+    '.sidebar', '#sidebar', 'aside', '.widget', '.widgets',
+    '.advertisement', '.ads', '.ad-container',
+    '.menu', '#menu', '.navigation', '.social-links',
+    '.site-header', '.site-footer', '.comments', '#comments',
+    '.cookie-notice', '.popup', '.modal'
+]
+
+
+class SimpleSelector:
+    # The content selectors are all single tag, #id, .class or [attr="value"]
+    # selectors; matching them directly avoids a soupsieve pass per selector.
+    def __init__(self, selector):
+        self.selector = selector
+        self.name = self.attr = self.value = self.class_name = None
+        if selector.startswith('#'):
+            self.attr, self.value = 'id', selector[1:]
+        elif selector.startswith('.'):
+            self.class_name = selector[1:]
+        elif selector.startswith('['):
+            attr, _, value = selector[1:-1].partition('=')
+            self.attr, self.value = attr, value.strip('"\'')
+        else:
+            self.name = selector
+
+    def matches(self, tag):
+        if self.name is not None:
+            return tag.name == self.name
+        if self.class_name is not None:
+            classes = tag.get('class')
+            if isinstance(classes, str):
+                classes = classes.split()
+            return bool(classes) and self.class_name in classes
+        return tag.get(self.attr) == self.value
+
+
+MAIN_CONTENT_MATCHERS = [SimpleSelector(selector) for selector in MAIN_CONTENT_SELECTORS]
+BOILERPLATE_MATCHERS = [SimpleSelector(selector) for selector in BOILERPLATE_SELECTORS]
+
+
+def first_matches(soup, matchers):
+    # First element in document order for each selector, like select_one().
+    found = [None] * len(matchers)
+    remaining = len(matchers)
+    for node in soup.descendants:
+        if not isinstance(node, Tag):
+            continue
+        for i, matcher in enumerate(matchers):
+            if found[i] is None and matcher.matches(node):
+                found[i] = node
+                remaining -= 1
+        if not remaining:
+            break
+    return found
+
+
+def _clone(tag):
+    return type(tag)(
+        None, tag.builder, tag.name, tag.namespace, tag.prefix, tag.attrs,
+        is_xml=tag._is_xml, sourceline=tag.sourceline, sourcepos=tag.sourcepos,
+        can_be_empty_element=tag.can_be_empty_element,
+        cdata_list_attributes=tag.cdata_list_attributes,
+        preserve_whitespace_tags=tag.preserve_whitespace_tags
+    )
+
+
+def pruned_copy(tag, matchers):
+    # Copies tag into a fresh document, leaving out every subtree that
+    # matches one of the matchers. Equivalent to copying the markup into a
+    # new soup and decomposing the selected elements, without serializing
+    # and reparsing it.
+    document = BeautifulSoup('', 'html.parser')
+    if any(matcher.matches(tag) for matcher in matchers):
+        return document
+
+    stack = [(tag, document)]
+    while stack:
+        source, target = stack.pop()
+        if isinstance(source, Tag):
+            clone = _clone(source)
+            clone.hidden = source.hidden
+            clone.interesting_string_types = source.interesting_string_types
+            target.append(clone)
+            for child in reversed(source.contents):
+                if isinstance(child, Tag) and any(matcher.matches(child) for matcher in matchers):
+                    continue
+                stack.append((child, clone))
+        else:
+            target.append(source.__copy__())
+    return document
+
+
+class TopLevelElement:
+    def __init__(self, element):
+        self.element = element
+        self.has_heading = False
+        self.blocks = []
+
+
+class ContentStats:
+    def __init__(self):
+        self.headings = []
+        self.texts = []
+        self.paragraph_words = []
+        self.blocks = []
+        self.top_level = []
+        self.hrefs = []
+        self.image_count = 0
+        self.heading_counts = dict.fromkeys(HEADING_TAGS, 0)
+        self.has_text = False
+
+
+def walk_content(content_area):
+    # Collects everything analyze_page and extract_structured_content need
+    # from the content area in one pass over its descendants, in document
+    # order, so the results match the equivalent find_all() calls.
+    stats = ContentStats()
+    string_types = getattr(content_area, 'interesting_string_types', (NavigableString,))
+    if isinstance(string_types, type):
+        string_types = (string_types,)
+
+    top = None
+    for node in content_area.descendants:
+        if not isinstance(node, Tag):
+            if not stats.has_text and type(node) in string_types and node.strip():
+                stats.has_text = True
+            continue
+
+        name = node.name
+        if node.parent is content_area:
+            top = TopLevelElement(node) if name in SECTION_TAGS else None
+            if top is not None:
+                stats.top_level.append(top)
+        elif top is not None:
+            if name in HEADING_TAGS:
+                top.has_heading = True
+            elif name in BLOCK_TAGS:
+                top.blocks.append(node)
+
+        if name in TEXT_TAGS:
+            text = node.get_text()
+            stats.texts.append(text)
+            if name == 'p':
+                stats.paragraph_words.append(len(text.split()))
+            else:
+                if name in HEADING_TAGS:
+                    stats.headings.append(node)
+                    stats.heading_counts[name] += 1
+
+        if name in BLOCK_TAGS:
+            stats.blocks.append(node)
+        elif name == 'img':
+            stats.image_count += 1
+        elif name == 'a':
+            href = node.get('href')
+            if href is not None:
+                stats.hrefs.append(href)
+
+    return stats
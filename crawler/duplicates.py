@@ -0,0 +1,96 @@
+import hashlib
+from collections import defaultdict
+
+import numpy as np
+
+SHINGLE_WORDS = 3
+# Pages whose 64-bit SimHashes differ in at most this many bits count as
+# near-duplicates (the usual setting for web pages).
+NEAR_DUPLICATE_BITS = 3
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def fingerprint(words):
+    # (content hash, SimHash) of a page's words as 16-digit hex strings, or
+    # (None, None) for a page without text. Both are over the lowercased
+    # words only, so markup, whitespace and punctuation changes do not
+    # count as different content.
+    words = [word.lower() for word in words]
+    if not words:
+        return None, None
+    content_hash = _hash64(' '.join(words))
+
+    if len(words) < SHINGLE_WORDS:
+        shingles = [' '.join(words)]
+    else:
+        shingles = [' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    hashes = np.array([_hash64(shingle) for shingle in set(shingles)], dtype='<u8')
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 > len(hashes)
+    simhash = int(np.packbits(votes, bitorder='little').view('<u8')[0])
+    return f'{content_hash:016x}', f'{simhash:016x}'
+
+
+def _find(parents, i):
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+
+def duplicate_clusters(content_hashes, simhashes, max_distance=NEAR_DUPLICATE_BITS):
+    # Groups of page positions with the same content hash or SimHashes
+    # within max_distance bits, as (kind, positions) with kind 'exact' when
+    # every page in the group has the same content hash. Hashes of 0 mean
+    # no fingerprint and are skipped.
+    #
+    # Near-duplicates are found by splitting the SimHash into
+    # max_distance + 1 bands: two hashes within max_distance bits agree on
+    # at least one band, so only pages sharing a band value are compared.
+    content_hashes = np.asarray(content_hashes, dtype=np.uint64)
+    simhashes = np.asarray(simhashes, dtype=np.uint64)
+    pages = np.flatnonzero(content_hashes != 0).tolist()
+    parents = list(range(len(content_hashes)))
+
+    def union(a, b):
+        a, b = _find(parents, a), _find(parents, b)
+        if a != b:
+            parents[max(a, b)] = min(a, b)
+
+    first = {}
+    for i, value in zip(pages, content_hashes[pages].tolist()):
+        if value in first:
+            union(first[value], i)
+        else:
+            first[value] = i
+
+    # One representative per distinct text is enough for the SimHash pass.
+    representatives = sorted(first.values())
+    bands = max_distance + 1
+    width = 64 // bands
+    values = simhashes[representatives].tolist()
+    for band in range(bands):
+        shift = band * width
+        mask = (1 << (width if band < bands - 1 else 64 - shift)) - 1
+        buckets = defaultdict(list)
+        for i, value in zip(representatives, values):
+            buckets[(value >> shift) & mask].append((i, value))
+        for bucket in buckets.values():
+            for n, (i, a) in enumerate(bucket):
+                for j, b in bucket[n + 1:]:
+                    if bin(a ^ b).count('1') <= max_distance:
+                        union(i, j)
+
+    groups = defaultdict(list)
+    for i in pages:
+        groups[_find(parents, i)].append(i)
+    clusters = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        kind = 'exact' if len(set(content_hashes[members].tolist())) == 1 else 'near'
+        clusters.append((kind, members))
+    return clusters
@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from .cache import cached_get
+from .session import get_client
+
+# Per-host politeness: requests a second (0 turns the limit off) and how
+# many may go out back to back after a pause.
+REQUESTS_PER_SECOND = float(os.environ.get('SEO_REQUESTS_PER_SECOND', 1.0))
+BURST = int(os.environ.get('SEO_BURST', 1))
+
+class TokenBucket:
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class FetchEngine:
+    def __init__(self, headers=None, max_workers=8, per_host_limit=4,
+                 requests_per_second=None, burst=None, timeout=None, cache=None):
+        self.headers = headers or {}
+        self.max_workers = max(1, int(max_workers))
+        self.per_host_limit = max(1, int(per_host_limit))
+        self.requests_per_second = REQUESTS_PER_SECOND if requests_per_second is None else requests_per_second
+        self.burst = BURST if burst is None else burst
+        self.timeout = timeout
+        self.cache = cache
+        self._executor = None
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host_state(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                bucket = None
+                if self.requests_per_second:
+                    bucket = TokenBucket(self.requests_per_second, self.burst)
+                state = (threading.BoundedSemaphore(self.per_host_limit), bucket)
+                self._hosts[host] = state
+            return state
+
+    def fetch(self, url, headers=None):
+        if headers:
+            headers = dict(self.headers, **headers)
+        slots, bucket = self._host_state(url)
+        with slots:
+            if bucket is not None:
+                bucket.acquire()
+            return cached_get(get_client(), self.cache, url, headers=headers or self.headers,
+                              timeout=self.timeout)
+
+    def _fetch_and_handle(self, url, handler, headers=None):
+        response = self.fetch(url, headers)
+        if handler is None:
+            return response
+        return handler(url, response)
+
+    def submit(self, url, handler=None, headers=None):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='fetch')
+            executor = self._executor
+        return executor.submit(self._fetch_and_handle, url, handler, headers)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=wait)
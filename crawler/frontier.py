@@ -0,0 +1,189 @@
+import hashlib
+import heapq
+import itertools
+import math
+from collections import deque
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': ':80', 'https': ':443'}
+
+
+@lru_cache(maxsize=65536)
+def normalize_url(url):
+    # Canonical form used to decide whether two links are the same page:
+    # lower-case scheme and host, no default port, no fragment, no trailing
+    # slash (except the root) and query parameters in sorted order. Cached,
+    # since navigation links repeat on every page of a site.
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    default_port = DEFAULT_PORTS.get(scheme)
+    if default_port and netloc.endswith(default_port):
+        netloc = netloc[:-len(default_port)]
+    path = parts.path or '/'
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+    query = parts.query
+    if query:
+        query = '&'.join(sorted(param for param in query.split('&') if param))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def strip_fragment(url):
+    index = url.find('#')
+    return url if index < 0 else url[:index]
+
+
+class BloomFilter:
+    # Fixed-size seen-set for very large crawls: about 1.2 bytes per URL at
+    # a 1% false positive rate, at the cost of occasionally skipping a URL
+    # that was never actually queued.
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = int(capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __len__(self):
+        return self.count
+
+
+class Frontier:
+    # URLs waiting to be crawled. Each canonical URL is queued at most once;
+    # the stored URL is the first spelling seen, minus its fragment. Plain
+    # FIFO by default, or a heap ordered by the priority passed to add()
+    # (lower first, ties in insertion order).
+    def __init__(self, prioritized=False, bloom_capacity=None, bloom_error_rate=0.01):
+        self.prioritized = prioritized
+        self._queue = [] if prioritized else deque()
+        self._seen = BloomFilter(bloom_capacity, bloom_error_rate) if bloom_capacity else set()
+        self._order = itertools.count()
+        self._feed = None
+        self._fed = None
+        self._retry = deque()
+        self.duplicates = 0
+
+    def seen(self, url):
+        return normalize_url(url) in self._seen
+
+    def mark_seen(self, url):
+        key = normalize_url(url)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        return True
+
+    def add(self, url, priority=0):
+        if not self.mark_seen(url):
+            self.duplicates += 1
+            return False
+        url = strip_fragment(url)
+        if self.prioritized:
+            heapq.heappush(self._queue, (priority, next(self._order), url))
+        else:
+            self._queue.append(url)
+        return True
+
+    def feed(self, urls):
+        # Lazily merged source (the sitemap) that is drained ahead of the
+        # queue, one URL at a time, so a long source never has to be held
+        # here in full.
+        self._feed = iter(urls)
+        if self._fed is None:
+            self._advance_feed()
+
+    def _advance_feed(self):
+        self._fed = None
+        while self._feed is not None:
+            url = next(self._feed, None)
+            if url is None:
+                self._feed = None
+            elif self.mark_seen(url):
+                self._fed = strip_fragment(url)
+            else:
+                self.duplicates += 1
+                continue
+            return
+
+    def close(self):
+        feed, self._feed, self._fed = self._feed, None, None
+        if feed is not None and hasattr(feed, 'close'):
+            feed.close()
+
+    def pop(self):
+        if self._retry:
+            return self._retry.popleft()
+        if self._fed is not None:
+            url = self._fed
+            self._advance_feed()
+            return url
+        if self.prioritized:
+            return heapq.heappop(self._queue)[2]
+        return self._queue.popleft()
+
+    def __len__(self):
+        return len(self._retry) + len(self._queue) + (self._fed is not None)
+
+    def __bool__(self):
+        return bool(self._retry) or self._fed is not None or bool(self._queue)
+
+    def snapshot(self, requeue=()):
+        # Picklable state for a checkpoint. requeue lists URLs that were
+        # popped but not finished (in flight); they come back first after a
+        # restore. A feed cannot be saved, so the caller feeds it again and
+        # the seen-set skips what was already taken from it. A plain seen-set
+        # is not saved: every seen URL is either still queued or was handed
+        # out, so from_snapshot() rebuilds it from the queue plus the URLs
+        # the caller already crawled.
+        retry = list(self._retry) + list(requeue)
+        if self._fed is not None:
+            retry.append(self._fed)
+        return {
+            'prioritized': self.prioritized,
+            'queue': list(self._queue),
+            'retry': retry,
+            'seen': self._seen if isinstance(self._seen, BloomFilter) else None,
+            'order': next(self._order),
+            'duplicates': self.duplicates,
+        }
+
+    @classmethod
+    def from_snapshot(cls, state, handed_out=()):
+        frontier = cls(prioritized=state['prioritized'])
+        frontier._queue = list(state['queue']) if frontier.prioritized else deque(state['queue'])
+        frontier._retry = deque(state['retry'])
+        if state['seen'] is not None:
+            frontier._seen = state['seen']
+        else:
+            queued = (entry[2] for entry in frontier._queue) if frontier.prioritized else frontier._queue
+            for url in itertools.chain(queued, frontier._retry, handed_out):
+                frontier._seen.add(normalize_url(url))
+        frontier._order = itertools.count(state['order'])
+        frontier.duplicates = state['duplicates']
+        return frontier
+
+    def stats(self):
+        return {
+            'queued': len(self),
+            'seen': len(self._seen),
+            'duplicates': self.duplicates,
+            'bloom': isinstance(self._seen, BloomFilter),
+        }
@@ -0,0 +1,256 @@
+import json
+import sqlite3
+import time
+
+import numpy as np
+
+from .serialize import dumps
+from .sqlite import SQLiteStore, SharedStore, open_pruned_store
+from .store import NUMERIC_COLUMNS
+
+# Per-page columns kept for every crawl, besides url, title and the main
+# keyword. Each is also averaged per crawl, so domain trends only read the
+# crawls table.
+PAGE_METRICS = tuple(NUMERIC_COLUMNS) + ('keyword_density',)
+REAL_METRICS = {name for name, dtype in NUMERIC_COLUMNS.items() if np.issubdtype(dtype, np.floating)}
+REAL_METRICS.add('keyword_density')
+
+# Pages of one crawl are inserted in chunks this size; terms are looked up
+# in chunks under SQLite's parameter limit.
+INSERT_CHUNK = 5000
+TERM_CHUNK = 500
+
+
+class HistoryStore(SQLiteStore):
+    # Finished crawls kept in SQLite for later queries: a summary row per
+    # crawl (with stats and recommendations), the page metrics and the
+    # keyword table. Unlike the checkpoint store, rows are typed columns
+    # rather than pickles, so trends are plain indexed SQL.
+    def __init__(self, path):
+        super().__init__(path)
+        averages = ''.join(f'avg_{name} REAL, ' for name in PAGE_METRICS)
+        metrics = ''.join(f"{name} {'REAL' if name in REAL_METRICS else 'INTEGER'}, " for name in PAGE_METRICS)
+        with self._connect() as db:
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS crawls ('
+                'crawl_id TEXT PRIMARY KEY, url TEXT NOT NULL, domain TEXT NOT NULL, '
+                'crawled_at REAL NOT NULL, page_count INTEGER NOT NULL, ' + averages +
+                'stats TEXT, recommendations TEXT)'
+            )
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS pages ('
+                'crawl_id TEXT NOT NULL, page INTEGER NOT NULL, url TEXT NOT NULL, '
+                'crawled_at REAL NOT NULL, title TEXT, main_keyword TEXT, ' + metrics +
+                'content_hash TEXT, PRIMARY KEY (crawl_id, page)) WITHOUT ROWID'
+            )
+            db.execute('CREATE TABLE IF NOT EXISTS terms (term_id INTEGER PRIMARY KEY, term TEXT NOT NULL UNIQUE)')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS keywords ('
+                'crawl_id TEXT NOT NULL, page INTEGER NOT NULL, term_id INTEGER NOT NULL, '
+                'count INTEGER NOT NULL, relevance REAL NOT NULL, phrase INTEGER NOT NULL, '
+                'PRIMARY KEY (crawl_id, page, term_id, phrase)) WITHOUT ROWID'
+            )
+            db.execute('CREATE INDEX IF NOT EXISTS crawls_domain ON crawls (domain, crawled_at)')
+            db.execute('CREATE INDEX IF NOT EXISTS crawls_url ON crawls (url, crawled_at)')
+            db.execute('CREATE INDEX IF NOT EXISTS crawls_time ON crawls (crawled_at)')
+            db.execute('CREATE INDEX IF NOT EXISTS pages_url ON pages (url, crawled_at)')
+            # Covers keyword trends, which never need the page rows.
+            db.execute('CREATE INDEX IF NOT EXISTS keywords_term ON keywords (term_id, crawl_id, count, relevance)')
+
+    def _term_ids(self, db, terms):
+        db.executemany('INSERT OR IGNORE INTO terms (term) VALUES (?)', ((term,) for term in terms))
+        ids = {}
+        for start in range(0, len(terms), TERM_CHUNK):
+            chunk = terms[start:start + TERM_CHUNK]
+            rows = db.execute(f"SELECT term, term_id FROM terms WHERE term IN ({','.join('?' * len(chunk))})",
+                              chunk)
+            ids.update(rows)
+        return ids
+
+    def record(self, crawl_id, url, domain, analyzer, stats=None, recommendations=None, pages=None,
+               crawled_at=None):
+        # Saves the pages DataAnalyzer kept (or only the page ids in pages,
+        # for one site of a batch) under crawl_id, replacing an earlier save
+        # of the same crawl. A failed write is reported and skipped, since
+        # the analysis itself already succeeded.
+        crawled_at = time.time() if crawled_at is None else crawled_at
+        df = analyzer.df
+        keywords = analyzer.keywords
+        if pages is not None:
+            df = df[df.index.isin(pages)]
+            keywords = keywords[keywords['page'].isin(df.index)]
+        if df.empty:
+            return False
+
+        columns = [df[name].to_numpy(np.float64 if name in REAL_METRICS else np.int64).tolist()
+                   for name in PAGE_METRICS]
+        averages = [float(df[name].mean()) for name in PAGE_METRICS]
+        content_hashes = [f'{value:016x}' if value else None for value in df['content_hash'].tolist()]
+        page_rows = list(zip(
+            [crawl_id] * len(df), df.index.tolist(), df['url'].tolist(), [crawled_at] * len(df),
+            df['title'].tolist(), df['main_keyword'].tolist(), *columns, content_hashes
+        ))
+
+        codes = keywords['term'].to_numpy()
+        unique_codes = np.unique(codes)
+        terms = analyzer.terms[unique_codes].tolist()
+        placeholders = ', '.join('?' * (6 + len(PAGE_METRICS) + 1))
+        try:
+            with self._connect() as db:
+                self._delete(db, crawl_id)
+                db.execute(
+                    f"INSERT INTO crawls VALUES ({', '.join('?' * (5 + len(PAGE_METRICS) + 2))})",
+                    (crawl_id, url, domain, crawled_at, len(df), *averages,
+                     dumps(stats).decode('utf-8') if stats is not None else None,
+                     dumps(recommendations).decode('utf-8') if recommendations is not None else None)
+                )
+                for start in range(0, len(page_rows), INSERT_CHUNK):
+                    db.executemany(f'INSERT INTO pages VALUES ({placeholders})',
+                                   page_rows[start:start + INSERT_CHUNK])
+                ids = self._term_ids(db, terms)
+                term_ids = np.array([ids[term] for term in terms], dtype=np.int64)
+                mapped = term_ids[np.searchsorted(unique_codes, codes)] if len(codes) else codes
+                db.executemany(
+                    'INSERT OR REPLACE INTO keywords VALUES (?, ?, ?, ?, ?, ?)',
+                    zip([crawl_id] * len(codes), keywords['page'].tolist(), mapped.tolist(),
+                        keywords['count'].tolist(), keywords['relevance'].tolist(),
+                        keywords['phrase'].astype(int).tolist())
+                )
+        except sqlite3.Error as e:
+            print(f"Could not save crawl {crawl_id} to history: {e}")
+            return False
+        return True
+
+    def _delete(self, db, crawl_id):
+        for table in ('keywords', 'pages', 'crawls'):
+            db.execute(f'DELETE FROM {table} WHERE crawl_id = ?', (crawl_id,))
+
+    def _summary(self, row, names):
+        summary = dict(zip(names, row))
+        summary['averages'] = {name: summary.pop(f'avg_{name}') for name in PAGE_METRICS}
+        return summary
+
+    def crawls(self, domain=None, url=None, since=None, until=None, limit=50):
+        # Newest first, without stats and recommendations.
+        where, params = self._filters(domain, url, since, until)
+        names = ['crawl_id', 'url', 'domain', 'crawled_at', 'page_count'] + [f'avg_{name}' for name in PAGE_METRICS]
+        rows = self._connect().execute(
+            f"SELECT {', '.join(names)} FROM crawls{where} ORDER BY crawled_at DESC LIMIT ?",
+            params + [limit]
+        )
+        return [self._summary(row, names) for row in rows]
+
+    def get(self, crawl_id):
+        names = ['crawl_id', 'url', 'domain', 'crawled_at', 'page_count'] + \
+            [f'avg_{name}' for name in PAGE_METRICS] + ['stats', 'recommendations']
+        row = self._connect().execute(f"SELECT {', '.join(names)} FROM crawls WHERE crawl_id = ?",
+                                      (crawl_id,)).fetchone()
+        if row is None:
+            return None
+        crawl = self._summary(row, names)
+        for key in ('stats', 'recommendations'):
+            crawl[key] = json.loads(crawl[key]) if crawl[key] is not None else None
+        return crawl
+
+    def pages(self, crawl_id):
+        names = ['url', 'title', 'main_keyword'] + list(PAGE_METRICS) + ['content_hash']
+        rows = self._connect().execute(
+            f"SELECT {', '.join(names)} FROM pages WHERE crawl_id = ? ORDER BY page", (crawl_id,)
+        )
+        return [dict(zip(names, row)) for row in rows]
+
+    def keyword_totals(self, crawl_id, limit=50):
+        rows = self._connect().execute(
+            'SELECT t.term, SUM(k.count), SUM(k.relevance), COUNT(*), MAX(k.phrase) FROM keywords k '
+            'JOIN terms t ON t.term_id = k.term_id WHERE k.crawl_id = ? GROUP BY k.term_id '
+            'ORDER BY SUM(k.relevance) DESC, SUM(k.count) DESC LIMIT ?', (crawl_id, limit)
+        )
+        return [{'name': term, 'value': count, 'relevance': relevance, 'page_count': pages,
+                 'is_phrase': bool(phrase)}
+                for term, count, relevance, pages, phrase in rows]
+
+    def _filters(self, domain=None, url=None, since=None, until=None, prefix=''):
+        clauses, params = [], []
+        for column, op, value in (('domain', '=', domain), ('url', '=', url),
+                                  ('crawled_at', '>=', since), ('crawled_at', '<=', until)):
+            if value is not None:
+                clauses.append(f'{prefix}{column} {op} ?')
+                params.append(value)
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def trend(self, metric, domain=None, url=None, since=None, until=None, limit=1000):
+        # A metric over time, oldest first: the per-crawl average for a
+        # domain (or for every crawl), or the page's own value for a URL.
+        if metric not in PAGE_METRICS:
+            raise ValueError(f"Unknown metric {metric}")
+        db = self._connect()
+        if url is not None:
+            where, params = self._filters(url=url, since=since, until=until)
+            rows = db.execute(
+                f'SELECT crawl_id, crawled_at, {metric} FROM pages{where} ORDER BY crawled_at DESC LIMIT ?',
+                params + [limit]
+            )
+        else:
+            where, params = self._filters(domain=domain, since=since, until=until)
+            rows = db.execute(
+                f'SELECT crawl_id, crawled_at, avg_{metric} FROM crawls{where} ORDER BY crawled_at DESC LIMIT ?',
+                params + [limit]
+            )
+        points = [{'crawl_id': crawl_id, 'crawled_at': crawled_at, 'value': value}
+                  for crawl_id, crawled_at, value in rows]
+        points.reverse()
+        return points
+
+    def keyword_trend(self, term, domain=None, since=None, until=None, limit=1000):
+        # Total count, relevance and pages per crawl for one keyword or
+        # phrase, oldest first. Crawls where it does not appear are left out.
+        row = self._connect().execute('SELECT term_id FROM terms WHERE term = ?', (term,)).fetchone()
+        if row is None:
+            return []
+        where, params = self._filters(domain=domain, since=since, until=until, prefix='c.')
+        where = (where + ' AND' if where else ' WHERE') + ' k.term_id = ?'
+        rows = self._connect().execute(
+            'SELECT c.crawl_id, c.crawled_at, c.domain, SUM(k.count), SUM(k.relevance), COUNT(*) '
+            f'FROM keywords k JOIN crawls c ON c.crawl_id = k.crawl_id{where} '
+            'GROUP BY c.crawl_id ORDER BY c.crawled_at DESC LIMIT ?',
+            params + [row[0], limit]
+        )
+        points = [{'crawl_id': crawl_id, 'crawled_at': crawled_at, 'domain': domain, 'count': count,
+                   'relevance': relevance, 'page_count': pages}
+                  for crawl_id, crawled_at, domain, count, relevance, pages in rows]
+        points.reverse()
+        return points
+
+    def delete(self, crawl_id):
+        with self._connect() as db:
+            self._delete(db, crawl_id)
+
+    def prune(self, max_age):
+        cutoff = time.time() - max_age
+        with self._connect() as db:
+            for table in ('keywords', 'pages'):
+                db.execute(f'DELETE FROM {table} WHERE crawl_id IN '
+                           '(SELECT crawl_id FROM crawls WHERE crawled_at < ?)', (cutoff,))
+            db.execute('DELETE FROM crawls WHERE crawled_at < ?', (cutoff,))
+
+    def stats(self):
+        db = self._connect()
+        crawls, first, last = db.execute('SELECT COUNT(*), MIN(crawled_at), MAX(crawled_at) FROM crawls').fetchone()
+        return {
+            'path': self.path,
+            'crawls': crawls,
+            'pages': db.execute('SELECT COUNT(*) FROM pages').fetchone()[0],
+            'oldest': first,
+            'newest': last,
+        }
+
+
+_store = SharedStore(
+    lambda: open_pruned_store(HistoryStore, 'SEO_HISTORY_PATH', 'history.sqlite3',
+                              'SEO_HISTORY_TTL', 365 * 24 * 3600, 'Crawl history'),
+    enabled_var='SEO_HISTORY',
+)
+
+
+def get_history_store():
+    return _store.get()
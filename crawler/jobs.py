@@ -0,0 +1,202 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .analyzer import DataAnalyzer, SpillAnalyzer
+from .crawler import WebsiteCrawler
+from .registry import crawl_record
+from .spill import SpillFile, should_spill
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobConflict(Exception):
+    pass
+
+
+class CrawlJob:
+    def __init__(self, url, max_pages=20, single_page=False, crawler_options=None, registry=None,
+                 checkpoint=None, crawler=None, incremental=False, history=None, spill=False):
+        self.id = crawler.crawl_id if crawler is not None else uuid.uuid4().hex
+        self.registry = registry
+        self.history = history
+        self.url = url
+        self.max_pages = 1 if single_page else max_pages
+        self.single_page = single_page
+        self.status = 'queued'
+        self.error = None
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        if crawler is None:
+            options = dict(crawler_options or {})
+            if spill and not single_page:
+                options['spill'] = True
+            if checkpoint is not None and not single_page:
+                options.update(checkpoint=checkpoint, crawl_id=self.id, incremental=incremental)
+            crawler = WebsiteCrawler(url, max_pages=self.max_pages, **options)
+        self.crawler = crawler
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed', 'cancelled')
+
+    def cancel(self):
+        if self.status == 'queued':
+            self.status = 'cancelled'
+            self.finished_at = time.time()
+        self.crawler.cancel()
+
+    def run(self):
+        if self.status == 'cancelled':
+            return
+        self.status = 'running'
+        self.started_at = time.time()
+        try:
+            if self.single_page:
+                pages = self.crawler.crawl_single_page()
+            else:
+                pages = self.crawler.crawl()
+
+            if self.crawler.cancel_event.is_set():
+                self.status = 'cancelled'
+            elif pages.empty:
+                self.status = 'failed'
+                self.error = 'Failed to collect data from website'
+            else:
+                analyzer = SpillAnalyzer(pages) if isinstance(pages, SpillFile) else DataAnalyzer(pages)
+                self.result = {
+                    'stats': analyzer.get_descriptive_stats(),
+                    'recommendations': analyzer.create_recommendations(),
+                    'sitemap_urls': self.crawler.sitemap_urls,
+                    'baseline_crawl_id': self.crawler.baseline,
+                    'pages_skipped': self.crawler.pages_skipped,
+                }
+                if self.registry is not None:
+                    self.registry.put(crawl_record(self.crawler, self.url, len(pages), crawl_id=self.id))
+                if self.history is not None:
+                    self.history.record(self.id, self.url, self.crawler.domain, analyzer,
+                                        self.result['stats'], self.result['recommendations'])
+                self.status = 'completed'
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            self.status = 'failed'
+            self.error = str(e)
+        finally:
+            self.finished_at = time.time()
+
+    def progress(self):
+        crawler = self.crawler
+        return {
+            'pages_fetched': crawler.pages_analyzed,
+            'pages_failed': len(crawler.failed_urls),
+            'pages_skipped': crawler.pages_skipped,
+            'pages_in_flight': crawler.in_flight_count,
+            'pages_queued': 0 if self.finished else len(crawler.frontier),
+            'max_pages': self.max_pages,
+            'page_store': crawler.data.memory_usage(),
+        }
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'url': self.url,
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'progress': self.progress(),
+            'crawl_domain': self.crawler.domain,
+            'resumable': self.crawler.checkpoint is not None and not self.single_page,
+        }
+
+    def pages(self):
+        return self.crawler.data
+    
+    def discard(self):
+        # Called once the job is dropped from the manager.
+        if isinstance(self.crawler.data, SpillFile):
+            self.crawler.data.delete()
+
+
+class JobManager:
+    def __init__(self, max_workers=2, max_queue=16, max_finished=100, finished_ttl=3600, registry=None,
+                 checkpoint=None, history=None):
+        self.max_queue = max_queue
+        self.registry = registry
+        self.history = history
+        self.checkpoint = checkpoint
+        self.max_finished = max_finished
+        self.finished_ttl = finished_ttl
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='crawl-job')
+
+    def _prune(self):
+        now = time.time()
+        finished = [job for job in self._jobs.values() if job.finished]
+        excess = len(finished) - self.max_finished
+        for job in finished:
+            if excess > 0 or now - job.finished_at > self.finished_ttl:
+                del self._jobs[job.id]
+                job.discard()
+                excess -= 1
+
+    def _check_capacity(self):
+        self._prune()
+        waiting = sum(1 for job in self._jobs.values() if not job.finished)
+        if waiting >= self.max_queue:
+            raise JobQueueFull(f"{waiting} crawl jobs are already queued or running")
+
+    def submit(self, url, max_pages=20, single_page=False, crawler_options=None, incremental=False,
+               spill=None):
+        # spill defaults to on for crawls of SEO_SPILL_MIN_PAGES or more.
+        if spill is None:
+            spill = should_spill(max_pages)
+        with self._lock:
+            self._check_capacity()
+            job = CrawlJob(url, max_pages=max_pages, single_page=single_page,
+                           crawler_options=crawler_options, registry=self.registry,
+                           checkpoint=self.checkpoint, incremental=incremental, history=self.history,
+                           spill=spill)
+            self._jobs[job.id] = job
+        self._executor.submit(job.run)
+        return job
+
+    def resume(self, job_id):
+        # Continues a checkpointed crawl under the same id, from this or an
+        # earlier process; pages already crawled are not fetched again.
+        if self.checkpoint is None:
+            return None
+        with self._lock:
+            existing = self._jobs.get(job_id)
+            if existing is not None and not existing.finished:
+                raise JobConflict(f"Job {job_id} is still {existing.status}")
+            self._check_capacity()
+            crawler = WebsiteCrawler.resume(job_id, self.checkpoint)
+            if crawler is None:
+                return None
+            job = CrawlJob(crawler.start_url, max_pages=crawler.max_pages, registry=self.registry,
+                           crawler=crawler, history=self.history)
+            if existing is not None:
+                existing.discard()
+            self._jobs[job.id] = job
+        self._executor.submit(job.run)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
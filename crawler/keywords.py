@@ -0,0 +1,339 @@
+import itertools
+import os
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+STOPWORDS = ['the', 'and', 'is', 'in', 'it', 'of', 'to', 'a', 'for', 'with', 'on', 'by',
+             'this', 'that', 'be', 'are', 'as', 'i', 'you', 'he', 'she', 'we', 'they',
+             'was', 'were', 'have', 'has', 'had', 'can', 'could', 'will', 'would', 'may',
+             'might', 'should', 'shall', 'must', 'do', 'does', 'did', 'but', 'or', 'if',
+             'then', 'else', 'when', 'where', 'why', 'how', 'all', 'any', 'both', 'each',
+             'more', 'most', 'other', 'some', 'such', 'than', 'too', 'very', 'just', 'use',
+             'get', 'make', 'like', 'using', 'used', 'would', 'also', 'may', 'one', 'well',
+             'many', 'could', 'much', 'even', 'new', 'see', 'time', 'way']
+
+NLTK_RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'stopwords': 'corpora/stopwords',
+    'wordnet': 'corpora/wordnet',
+}
+
+WORD_RE = re.compile(r'\b[a-zA-Z]{3,15}\b')
+
+
+class KeywordEngine:
+    def __init__(self, data_dir=None, allow_download=None):
+        self.data_dir = data_dir or os.environ.get('NLTK_DATA') or os.path.join(os.path.expanduser('~'), 'nltk_data')
+        if allow_download is None:
+            allow_download = os.environ.get('SEO_NLTK_DOWNLOAD', '1') != '0'
+        self.allow_download = allow_download
+        self.available = False
+        self.missing = []
+        self.stop_words = set(STOPWORDS)
+        self.basic_stop_words = set(STOPWORDS)
+        self._tokenize = None
+        self.lemmatize = None
+
+        started = time.perf_counter()
+        self._load()
+        self.startup_seconds = time.perf_counter() - started
+
+        if self.available:
+            print(f"Keyword engine ready in {self.startup_seconds:.2f}s")
+        else:
+            print(f"Keyword engine using basic extraction (missing NLTK data: {', '.join(self.missing)}) "
+                  f"after {self.startup_seconds:.2f}s")
+
+    def _load(self):
+        try:
+            import nltk
+        except ImportError:
+            self.missing = ['nltk']
+            return
+
+        if self.data_dir not in nltk.data.path:
+            nltk.data.path.insert(0, self.data_dir)
+
+        for name, path in NLTK_RESOURCES.items():
+            try:
+                nltk.data.find(path)
+                continue
+            except LookupError:
+                pass
+            if self.allow_download:
+                try:
+                    os.makedirs(self.data_dir, exist_ok=True)
+                    if nltk.download(name, quiet=True, download_dir=self.data_dir):
+                        continue
+                except Exception as e:
+                    print(f"Failed to download NLTK resource {name}: {e}")
+            self.missing.append(name)
+
+        if self.missing:
+            return
+
+        try:
+            from nltk.corpus import stopwords as nltk_stopwords
+            from nltk.stem import WordNetLemmatizer
+            from nltk.tokenize import word_tokenize
+
+            self.stop_words = set(nltk_stopwords.words('english'))
+            self.stop_words.update(STOPWORDS)
+            self.lemmatize = lru_cache(maxsize=100000)(WordNetLemmatizer().lemmatize)
+            self.lemmatize('pages')
+            word_tokenize('warm up')
+            self._tokenize = word_tokenize
+            self.available = True
+        except Exception as e:
+            print(f"Error loading NLTK resources: {e}")
+            self.missing.append('nltk')
+
+    def status(self):
+        return {
+            'available': self.available,
+            'missing': self.missing,
+            'startup_seconds': round(self.startup_seconds, 4),
+            'lemma_cache': self.lemmatize.cache_info()._asdict() if self.lemmatize else None,
+        }
+
+    def nltk_text(self, text, title='', meta_description=''):
+        return (title + " " + title + " " + meta_description + " " +
+                meta_description + " " + text).lower()
+
+    def basic_text(self, text, title='', meta_description=''):
+        return (title + " " + meta_description + " " + text).lower()
+
+    def process_words(self, text, title='', meta_description=''):
+        stop_words = self.stop_words
+        lemmatize = self.lemmatize
+        return [
+            lemmatize(word) for word in self._tokenize(self.nltk_text(text, title, meta_description))
+            if word.isalpha() and len(word) > 2 and word not in stop_words
+        ]
+
+    def basic_words(self, text, title='', meta_description=''):
+        return [word for word in WORD_RE.findall(self.basic_text(text, title, meta_description))
+                if word not in self.basic_stop_words]
+
+    def vocabulary_words(self, tokens):
+        # What process_words or basic_words turns each token into, None for
+        # the ones they drop; for distinct tokens of a whole batch.
+        if self.available:
+            stop_words = self.stop_words
+            return [self.lemmatize(word) if word.isalpha() and len(word) > 2 and word not in stop_words
+                    else None for word in tokens]
+        return [None if word in self.basic_stop_words else word for word in tokens]
+
+    def score(self, top_words, top_bigrams, top_trigrams, title='', meta_description='',
+              num_keywords=10):
+        keywords = []
+
+        for word, count in top_words:
+            relevance = count * (0.5 + min(len(word) / 10.0, 0.5))
+            keywords.append((word, count, relevance))
+
+        for bigram, count in top_bigrams:
+            if count > 1:
+                keywords.append((" ".join(bigram), count, count * 1.2))
+
+        for trigram, count in top_trigrams:
+            if count > 1:
+                keywords.append((" ".join(trigram), count, count * 1.5))
+
+        title_words = set(WORD_RE.findall(title.lower()))
+        meta_words = set(WORD_RE.findall(meta_description.lower()))
+
+        for i, (keyword, count, relevance) in enumerate(keywords):
+            keyword_words = set(keyword.split())
+
+            if keyword_words.intersection(title_words):
+                keywords[i] = (keyword, count, relevance * 1.5)
+
+            if keyword_words.intersection(meta_words):
+                keywords[i] = (keyword, count, relevance * 1.3)
+
+        keywords.sort(key=lambda x: x[2], reverse=True)
+
+        return keywords[:num_keywords]
+
+    def extract(self, text, title='', meta_description='', num_keywords=10):
+        try:
+            if self.available:
+                try:
+                    words = self.process_words(text, title, meta_description)
+                    return self.score(Counter(words).most_common(num_keywords),
+                                      Counter(zip(words, words[1:])).most_common(num_keywords // 2),
+                                      Counter(zip(words, words[1:], words[2:])).most_common(num_keywords // 4),
+                                      title, meta_description, num_keywords)
+                except Exception as e:
+                    print(f"Error with NLTK processing: {e}")
+
+            words = self.basic_words(text, title, meta_description)
+            return self.score(Counter(words).most_common(num_keywords), [], [],
+                              title, meta_description, num_keywords)
+        except Exception as e:
+            print(f"Keyword extraction failed with error: {e}")
+            word_list = [w for w in WORD_RE.findall(text.lower()) if w not in self.basic_stop_words]
+            word_counts = Counter(word_list).most_common(num_keywords)
+            return [(word, count, count) for word, count in word_counts]
+
+    def batch_words(self, text, title='', meta_description=''):
+        # The words extract() counts for a page.
+        if self.available:
+            return self.process_words(text, title, meta_description)
+        return self.basic_words(text, title, meta_description)
+
+    def document_frequencies(self, documents, frequencies=None):
+        # Number of documents each word occurs in, added to frequencies. For
+        # TF-IDF over a corpus passed to extract_batch a chunk at a time.
+        frequencies = Counter() if frequencies is None else frequencies
+        for text, title, meta_description in documents:
+            frequencies.update(set(self.batch_words(text, title, meta_description)))
+        return frequencies
+
+    def extract_batch(self, documents, num_keywords=10, tfidf_terms=10, corpus=None):
+        # documents is a sequence of (text, title, meta_description) tuples.
+        # Returns the same keyword lists extract() would give for each page,
+        # plus the top TF-IDF terms of each page against the whole batch, or
+        # against corpus, a (document_frequencies(), document count) pair,
+        # when the batch is one chunk of a larger corpus.
+        use_phrases = self.available
+        num_docs = len(documents)
+        if use_phrases:
+            raw = [self._tokenize(self.nltk_text(*document)) for document in documents]
+        else:
+            raw = [WORD_RE.findall(self.basic_text(*document)) for document in documents]
+
+        # factorize interns the tokens of the whole batch in hashed C code;
+        # stop words, filtering and lemmatizing then run once per distinct
+        # token instead of once per occurrence.
+        raw_lengths = np.array([len(words) for words in raw], dtype=np.int64)
+        all_tokens = np.empty(int(raw_lengths.sum()), dtype=object)
+        all_tokens[:] = list(itertools.chain.from_iterable(raw))
+        raw_codes, raw_vocabulary = pd.factorize(all_tokens)
+        counted = self.vocabulary_words(raw_vocabulary.tolist())
+        keep = np.fromiter((word is not None for word in counted), dtype=bool, count=len(counted))
+        kept_words = np.empty(int(keep.sum()), dtype=object)
+        kept_words[:] = [word for word in counted if word is not None]
+        term_ids, terms = pd.factorize(kept_words)
+        raw_terms = np.full(len(counted), -1, dtype=np.int64)
+        raw_terms[keep] = term_ids
+        kept = keep[raw_codes]
+        tokens = raw_terms[raw_codes[kept]]
+        docs = np.repeat(np.arange(num_docs, dtype=np.int64), raw_lengths)[kept]
+        lengths = np.bincount(docs, minlength=num_docs)
+        terms = np.asarray(terms, dtype=object)
+        vocab_size = max(len(terms), 1)
+
+        unigrams = self._count_keys(docs, tokens, vocab_size)
+        top_words = self._top_ngrams(unigrams, num_docs, num_keywords)
+        top_bigrams = [[] for _ in documents]
+        top_trigrams = [[] for _ in documents]
+        if use_phrases and len(tokens) > 1:
+            same_doc = docs[1:] == docs[:-1]
+            bigrams = tokens[:-1] * vocab_size + tokens[1:]
+            top_bigrams = self._top_ngrams(self._count_keys(docs[:-1][same_doc], bigrams[same_doc],
+                                                            vocab_size * vocab_size),
+                                           num_docs, num_keywords // 2)
+            if len(tokens) > 2:
+                same_doc = same_doc[:-1] & same_doc[1:]
+                bigram_ids = pd.factorize(bigrams)[0]
+                trigrams = bigram_ids[:-1] * vocab_size + tokens[2:]
+                trigram_words = np.stack([tokens[:-2], tokens[1:-1], tokens[2:]], axis=1)
+                span = (int(bigram_ids.max()) + 1) * vocab_size
+                top_trigrams = self._top_ngrams(self._count_keys(docs[:-2][same_doc], trigrams[same_doc], span),
+                                                num_docs, num_keywords // 4, trigram_words[same_doc])
+
+        words = terms.tolist()
+        results = []
+        for i, (text, title, meta_description) in enumerate(documents):
+            results.append(self.score(
+                [(words[word], count) for word, count in top_words[i]],
+                [((words[gram // vocab_size], words[gram % vocab_size]), count) for gram, count in top_bigrams[i]],
+                [(tuple(words[w] for w in gram), count) for gram, count in top_trigrams[i]],
+                title, meta_description, num_keywords,
+            ))
+
+        return results, self._tfidf(unigrams, lengths, words, tfidf_terms, corpus)
+
+    def _count_keys(self, docs, grams, span):
+        # Distinct (page, n-gram) keys with their first position and count.
+        # Pages come in order, so sorted keys are grouped by page, and the
+        # stable sort finds each key's first occurrence.
+        keys = docs * span + grams
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        starts = np.flatnonzero(np.diff(keys, prepend=-1))
+        counts = np.diff(starts, append=len(keys))
+        return keys[starts] // span, keys[starts] % span, order[starts], counts
+
+    def _top_per_doc(self, key_docs, order, num_docs, limit):
+        # The first limit positions of each page in order, which lists the
+        # keys grouped by page.
+        key_docs = key_docs[order]
+        starts = np.searchsorted(key_docs, np.arange(num_docs))
+        rank = np.arange(len(order)) - starts[key_docs]
+        return order[rank < limit]
+
+    def _top_ngrams(self, counted, num_docs, limit, labels=None):
+        # Counter.most_common order: count descending, ties by first occurrence.
+        key_docs, grams, first, counts = counted
+        if limit <= 0 or len(grams) == 0:
+            return [[] for _ in range(num_docs)]
+        # Keys in order of first occurrence (still grouped by page), then a
+        # stable sort by page and descending count.
+        by_first = np.argsort(first)
+        most = int(counts.max())
+        rank = key_docs[by_first] * (most + 1) + (most - counts[by_first])
+        keep = self._top_per_doc(key_docs, by_first[np.argsort(rank, kind='stable')], num_docs, limit)
+        if labels is None:
+            kept = grams[keep].tolist()
+        else:
+            kept = [tuple(label) for label in labels[first[keep]].tolist()]
+        bounds = np.searchsorted(key_docs[keep], np.arange(num_docs + 1)).tolist()
+        kept = list(zip(kept, counts[keep].tolist()))
+        return [kept[start:end] for start, end in zip(bounds, bounds[1:])]
+
+    def _tfidf(self, unigrams, lengths, words, limit, corpus=None):
+        num_docs = len(lengths)
+        key_docs, key_terms, first, counts = unigrams
+        if len(key_terms) == 0 or limit <= 0:
+            return [[] for _ in range(num_docs)]
+        if corpus is None:
+            document_frequency = np.bincount(key_terms, minlength=len(words))
+            corpus_size = num_docs
+        else:
+            frequencies, corpus_size = corpus
+            document_frequency = np.fromiter((frequencies.get(word, 0) for word in words),
+                                             dtype=np.float64, count=len(words))
+        idf = np.log((1 + corpus_size) / (1 + document_frequency)) + 1
+        scores = counts / lengths[key_docs] * idf[key_terms]
+
+        # Ties go to the word that comes first in the page, so a page gets
+        # the same terms whichever chunk it is scored in.
+        order = np.argsort(first)
+        order = order[np.argsort(-scores[order], kind='stable')]
+        order = order[np.argsort(key_docs[order], kind='stable')]
+        keep = self._top_per_doc(key_docs, order, num_docs, limit)
+        tfidf = [[] for _ in range(num_docs)]
+        for doc, term, score in zip(key_docs[keep].tolist(), key_terms[keep].tolist(), scores[keep].tolist()):
+            tfidf[doc].append((words[term], score))
+        return tfidf
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_keyword_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = KeywordEngine()
+        return _engine
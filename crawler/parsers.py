@@ -0,0 +1,49 @@
+import importlib
+import os
+
+from bs4 import BeautifulSoup
+
+# Tree builders BeautifulSoup can drive, fastest first, and the module each
+# one needs. html5lib is by far the slowest, so it comes last.
+PARSER_BACKENDS = {
+    'lxml': 'lxml',
+    'html.parser': None,
+    'html5lib': 'html5lib',
+}
+
+DEFAULT_PARSER = os.environ.get('SEO_HTML_PARSER', 'html.parser')
+
+_available = None
+
+
+def available_parsers():
+    global _available
+    if _available is None:
+        found = []
+        for name, module in PARSER_BACKENDS.items():
+            if module is None:
+                found.append(name)
+                continue
+            try:
+                importlib.import_module(module)
+                found.append(name)
+            except ImportError:
+                pass
+        _available = found
+    return list(_available)
+
+
+def resolve_parser(name=None):
+    name = name or DEFAULT_PARSER
+    if name == 'fastest':
+        return available_parsers()[0]
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown HTML parser backend: {name}")
+    if name not in available_parsers():
+        print(f"HTML parser backend {name} is not installed, falling back to html.parser")
+        return 'html.parser'
+    return name
+
+
+def parse_html(markup, parser='html.parser'):
+    return BeautifulSoup(markup, parser)
@@ -0,0 +1,184 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from .cache import CACHE_DIR
+from .sqlite import SQLiteStore, SharedStore
+
+
+def crawl_record(crawler, url, page_count=0, crawl_id=None):
+    return {
+        'crawl_id': crawl_id or uuid.uuid4().hex,
+        'url': url,
+        'domain': crawler.domain,
+        'sitemap_urls': list(crawler.sitemap_urls),
+        'page_count': page_count,
+        'created_at': time.time(),
+    }
+
+
+def domain_of(url):
+    return urlparse(url).netloc
+
+
+class MemoryCrawlRegistry:
+    # Finished crawls for this process, keyed by crawl id, with the newest
+    # crawl of each domain indexed for lookups by domain.
+    def __init__(self, ttl=24 * 3600, max_bytes=64 * 1024 * 1024, max_entries=1000):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._records = OrderedDict()
+        self._sizes = {}
+        self._domains = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _forget(self, crawl_id):
+        record = self._records.pop(crawl_id)
+        self._size -= self._sizes.pop(crawl_id)
+        if self._domains.get(record['domain']) == crawl_id:
+            del self._domains[record['domain']]
+
+    def _expire(self):
+        now = time.time()
+        while self._records:
+            crawl_id, record = next(iter(self._records.items()))
+            if now - record['created_at'] <= self.ttl:
+                break
+            self._forget(crawl_id)
+            self.evictions += 1
+
+    def put(self, record):
+        size = len(json.dumps(record))
+        with self._lock:
+            if record['crawl_id'] in self._records:
+                self._forget(record['crawl_id'])
+            self._records[record['crawl_id']] = record
+            self._sizes[record['crawl_id']] = size
+            self._domains[record['domain']] = record['crawl_id']
+            self._size += size
+            self._expire()
+            while len(self._records) > 1 and (self._size > self.max_bytes or
+                                              len(self._records) > self.max_entries):
+                self._forget(next(iter(self._records)))
+                self.evictions += 1
+        return record
+
+    def get(self, crawl_id):
+        with self._lock:
+            self._expire()
+            return self._records.get(crawl_id)
+
+    def latest(self, domain=None):
+        with self._lock:
+            self._expire()
+            if domain is not None:
+                crawl_id = self._domains.get(domain)
+                return self._records.get(crawl_id) if crawl_id else None
+            if not self._records:
+                return None
+            return next(reversed(self._records.values()))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'entries': len(self._records),
+                'size_bytes': self._size,
+                'evictions': self.evictions,
+            }
+
+
+class SQLiteCrawlRegistry(SQLiteStore):
+    # Same interface as MemoryCrawlRegistry, backed by a SQLite file so every
+    # gunicorn worker on the host sees the same crawls.
+    def __init__(self, path, ttl=24 * 3600, max_entries=10000):
+        super().__init__(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        with self._connect() as db:
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS crawls ('
+                'crawl_id TEXT PRIMARY KEY, domain TEXT NOT NULL, '
+                'created_at REAL NOT NULL, record TEXT NOT NULL)'
+            )
+            db.execute('CREATE INDEX IF NOT EXISTS crawls_domain ON crawls (domain, created_at)')
+            db.execute('CREATE INDEX IF NOT EXISTS crawls_created ON crawls (created_at)')
+
+    def _load(self, row):
+        return json.loads(row[0]) if row else None
+
+    def put(self, record):
+        with self._connect() as db:
+            db.execute(
+                'INSERT OR REPLACE INTO crawls (crawl_id, domain, created_at, record) VALUES (?, ?, ?, ?)',
+                (record['crawl_id'], record['domain'], record['created_at'], json.dumps(record))
+            )
+            db.execute('DELETE FROM crawls WHERE created_at < ?', (time.time() - self.ttl,))
+            db.execute(
+                'DELETE FROM crawls WHERE crawl_id NOT IN '
+                '(SELECT crawl_id FROM crawls ORDER BY created_at DESC LIMIT ?)',
+                (self.max_entries,)
+            )
+        return record
+
+    def get(self, crawl_id):
+        row = self._connect().execute(
+            'SELECT record FROM crawls WHERE crawl_id = ? AND created_at >= ?',
+            (crawl_id, time.time() - self.ttl)
+        ).fetchone()
+        return self._load(row)
+
+    def latest(self, domain=None):
+        cutoff = time.time() - self.ttl
+        db = self._connect()
+        if domain is not None:
+            row = db.execute(
+                'SELECT record FROM crawls WHERE domain = ? AND created_at >= ? '
+                'ORDER BY created_at DESC LIMIT 1', (domain, cutoff)
+            ).fetchone()
+        else:
+            row = db.execute(
+                'SELECT record FROM crawls WHERE created_at >= ? ORDER BY created_at DESC LIMIT 1',
+                (cutoff,)
+            ).fetchone()
+        return self._load(row)
+
+    def stats(self):
+        entries = self._connect().execute('SELECT COUNT(*) FROM crawls').fetchone()[0]
+        return {
+            'backend': 'sqlite',
+            'path': self.path,
+            'entries': entries,
+        }
+
+
+def _open_registry():
+    backend = os.environ.get('SEO_CRAWL_REGISTRY', 'memory')
+    ttl = int(os.environ.get('SEO_CRAWL_REGISTRY_TTL', 24 * 3600))
+    if backend == 'sqlite':
+        path = os.environ.get('SEO_CRAWL_REGISTRY_PATH', os.path.join(CACHE_DIR, 'crawls.sqlite3'))
+        try:
+            return SQLiteCrawlRegistry(path, ttl=ttl)
+        except (OSError, sqlite3.Error) as e:
+            print(f"SQLite crawl registry unavailable, keeping crawls in memory: {e}")
+    elif backend != 'memory':
+        print(f"Unknown crawl registry backend {backend}, keeping crawls in memory")
+    return MemoryCrawlRegistry(
+        ttl=ttl,
+        max_bytes=int(os.environ.get('SEO_CRAWL_REGISTRY_MAX_MB', 64)) * 1024 * 1024,
+    )
+
+
+_registry = SharedStore(_open_registry)
+
+
+def get_crawl_registry():
+    return _registry.get()
@@ -0,0 +1,160 @@
+import gzip
+import json
+import math
+import zlib
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed.
+COMPRESS_MIN_BYTES = 1024
+# Tuned with benchmarks/bench_serialize.py: on a 10k-page payload brotli 3
+# is faster than gzip 5 for about the same size, and higher settings cost
+# far more time than they save in bytes.
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 3
+
+
+class ChunkedList:
+    # A JSON array whose items are produced a list at a time by chunks(),
+    # a callable returning an iterator of lists. iter_dumps writes it one
+    # chunk at a time; dumps builds the whole list.
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from chunk
+
+
+def _default(obj):
+    # Types neither encoder handles by itself. NaN and missing values become
+    # null, as JSON has no NaN.
+    if isinstance(obj, ChunkedList):
+        return list(obj)
+    if isinstance(obj, (np.integer, np.bool_)):
+        return obj.item()
+    if isinstance(obj, np.floating):
+        value = obj.item()
+        return None if math.isnan(value) or math.isinf(value) else value
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _finite(obj):
+    # The stdlib encoder writes NaN/Infinity literals instead of calling
+    # default, so floats are cleaned up front on that path.
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple, ChunkedList)):
+        return [_finite(value) for value in obj]
+    return obj
+
+
+def dumps(obj):
+    # JSON bytes for an analysis payload. orjson writes NaN and infinity as
+    # null and NumPy scalars and arrays natively; without it the stdlib
+    # encoder is used.
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_finite(obj), default=_default, separators=(',', ':'),
+                      allow_nan=False).encode('utf-8')
+
+
+def has_chunks(obj):
+    # Whether obj holds a ChunkedList, directly or in nested dicts.
+    if isinstance(obj, ChunkedList):
+        return True
+    return isinstance(obj, dict) and any(has_chunks(value) for value in obj.values())
+
+
+def iter_dumps(obj):
+    # dumps() as an iterator of bytes that writes each ChunkedList in obj a
+    # chunk at a time, so no more than one chunk is serialized at once.
+    if isinstance(obj, ChunkedList):
+        yield b'['
+        separator = b''
+        for chunk in obj.chunks():
+            if chunk:
+                yield separator + dumps(chunk)[1:-1]
+                separator = b','
+        yield b']'
+    elif isinstance(obj, dict) and has_chunks(obj):
+        separator = b'{'
+        for key, value in obj.items():
+            yield separator + dumps(str(key)) + b':'
+            yield from iter_dumps(value)
+            separator = b','
+        yield b'}'
+    else:
+        yield dumps(obj)
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def accepted_encodings(header):
+    encodings = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        encodings.add(name.strip().lower())
+    return encodings
+
+
+def compress(body, accept_encoding):
+    # Returns (body, content encoding or None). Brotli is preferred when
+    # the client takes it and the module is installed.
+    if len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    encodings = accepted_encodings(accept_encoding)
+    if brotli is not None and 'br' in encodings:
+        return brotli.compress(body, quality=BROTLI_QUALITY), 'br'
+    if 'gzip' in encodings:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), 'gzip'
+    return body, None
+
+
+def compress_stream(chunks, accept_encoding):
+    # compress() for a body produced piece by piece: returns (iterator of
+    # bytes, content encoding or None).
+    encodings = accepted_encodings(accept_encoding)
+    if brotli is not None and 'br' in encodings:
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return _compressed(chunks, compressor.process, compressor.finish), 'br'
+    if 'gzip' in encodings:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return _compressed(chunks, compressor.compress, compressor.flush), 'gzip'
+    return chunks, None
+
+
+def _compressed(chunks, process, finish):
+    for chunk in chunks:
+        data = process(chunk)
+        if data:
+            yield data
+    yield finish()
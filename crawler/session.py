@@ -0,0 +1,172 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import brotli  # noqa: F401 - enables br decoding in urllib3
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 10
+MAX_BODY_BYTES = 10 * 1024 * 1024
+# Longest a Retry-After header can make a fetch thread sleep, in seconds.
+MAX_RETRY_AFTER = 10
+
+
+class ResponseTooLarge(requests.RequestException):
+    pass
+
+
+class CappedRetry(Retry):
+    # Honours Retry-After, but never sleeps longer than max_retry_after, so
+    # a server asking for an hour does not park a fetch thread for an hour.
+    def __init__(self, *args, max_retry_after=MAX_RETRY_AFTER, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_retry_after = max_retry_after
+
+    def new(self, **kwargs):
+        kwargs.setdefault('max_retry_after', self.max_retry_after)
+        return super().new(**kwargs)
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.max_retry_after)
+
+
+class BodyStream:
+    # File-like view of a streamed response body for incremental parsers,
+    # with the same size cap as HTTPClient.get().
+    def __init__(self, response, limit):
+        self.response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = response.url
+        self.limit = limit
+        self.size = 0
+        self._chunks = response.iter_content(64 * 1024)
+        self._buffer = b''
+
+    def _fill(self, size):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self.size += len(chunk)
+            if self.size > self.limit:
+                raise ResponseTooLarge(f"{self.url} exceeded {self.limit} bytes")
+            self._buffer += chunk
+
+    def peek(self, size):
+        self._fill(size)
+        return self._buffer[:size]
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            self._fill(-1)
+            data, self._buffer = self._buffer, b''
+            return data
+        if not self._buffer:
+            self._fill(1)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        self.response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HTTPClient:
+    def __init__(self, pool_connections=32, pool_maxsize=32, retries=2, backoff_factor=0.5,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 max_body_bytes=MAX_BODY_BYTES, max_retry_after=MAX_RETRY_AFTER):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_body_bytes = max_body_bytes
+
+        retry = CappedRetry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=True,
+            max_retry_after=max_retry_after,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                              max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+
+    def get(self, url, headers=None, timeout=None, max_bytes=None, **kwargs):
+        limit = max_bytes or self.max_body_bytes
+        response = self.session.get(url, headers=headers, timeout=timeout or self.timeout,
+                                    stream=True, **kwargs)
+        try:
+            declared = response.headers.get('Content-Length', '')
+            if declared.isdigit() and int(declared) > limit:
+                raise ResponseTooLarge(f"{url} declares {declared} bytes (limit {limit})")
+
+            # iter_content yields decoded bytes, so the cap also applies to
+            # the decompressed size of gzip/br bodies.
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(64 * 1024):
+                size += len(chunk)
+                if size > limit:
+                    raise ResponseTooLarge(f"{url} exceeded {limit} bytes")
+                chunks.append(chunk)
+            response._content = b''.join(chunks)
+        finally:
+            response.close()
+        return response
+
+    def open(self, url, headers=None, timeout=None, max_bytes=None, **kwargs):
+        limit = max_bytes or self.max_body_bytes
+        response = self.session.get(url, headers=headers, timeout=timeout or self.timeout,
+                                    stream=True, **kwargs)
+        declared = response.headers.get('Content-Length', '')
+        if declared.isdigit() and int(declared) > limit:
+            response.close()
+            raise ResponseTooLarge(f"{url} declares {declared} bytes (limit {limit})")
+        return BodyStream(response, limit)
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HTTPClient()
+        return _client
+
+
+def configure_client(**kwargs):
+    global _client
+    with _client_lock:
+        previous = _client
+        _client = HTTPClient(**kwargs)
+    if previous is not None:
+        previous.close()
+    return _client
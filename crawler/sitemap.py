@@ -0,0 +1,314 @@
+import gzip
+import hashlib
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import CACHE_DIR, DiskCache
+from .session import ResponseTooLarge, get_client
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# The sitemap protocol caps a single sitemap at 50MB uncompressed.
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+
+SITEMAP_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+# Protocol elements, in the sitemaps.org namespace or, for sitemaps that
+# leave it out, in none. Extensions such as <image:loc> or <xhtml:link> are
+# in their own namespaces and are skipped.
+SITEMAP_TAGS = {prefix + name: name for prefix in (SITEMAP_NS, '')
+                for name in ('loc', 'lastmod', 'url', 'sitemap')}
+
+
+class SitemapEntry:
+    __slots__ = ('loc', 'lastmod')
+
+    def __init__(self, loc, lastmod=None):
+        self.loc = loc
+        self.lastmod = lastmod
+
+    def __repr__(self):
+        return f"SitemapEntry({self.loc!r}, {self.lastmod!r})"
+
+
+class LimitedReader:
+    # Caps the decompressed size of .xml.gz sitemaps, which the HTTP body
+    # limit only sees compressed.
+    def __init__(self, stream, limit, name):
+        self.stream = stream
+        self.limit = limit
+        self.name = name
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.size += len(data)
+        if self.size > self.limit:
+            raise ResponseTooLarge(f"{self.name} exceeded {self.limit} bytes after decompression")
+        return data
+
+
+def parse_sitemap(stream):
+    # Incremental parse of a urlset or sitemapindex document. Returns
+    # ([(loc, lastmod), ...], [(child sitemap url, lastmod), ...]); each entry is
+    # dropped from the tree as soon as it is read so memory stays flat for
+    # large files. Only protocol elements count (see SITEMAP_TAGS).
+    entries = []
+    children = []
+    loc = lastmod = None
+    root = None
+    for event, element in ET.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            continue
+        name = SITEMAP_TAGS.get(element.tag)
+        if name == 'loc':
+            loc = element.text
+        elif name == 'lastmod':
+            lastmod = element.text
+        elif name == 'url' or name == 'sitemap':
+            loc = loc.strip() if loc else None
+            if loc:
+                lastmod = lastmod.strip() if lastmod else None
+                if name == 'url':
+                    entries.append((loc, lastmod))
+                else:
+                    children.append((loc, lastmod))
+            loc = lastmod = None
+            root.clear()
+    return entries, children
+
+
+def lastmod_timestamp(lastmod):
+    # W3C datetime as used by <lastmod> (a date, or a datetime with an
+    # offset or Z); 0 when missing or unparseable.
+    if not lastmod:
+        return 0
+    try:
+        value = datetime.fromisoformat(lastmod.replace('Z', '+00:00'))
+    except ValueError:
+        return 0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def site_matcher(domain):
+    # Predicate for URLs on domain (with or without a leading www.), as one
+    # regex match per URL since it runs for every sitemap entry.
+    domain = domain.lower()
+    if domain.startswith('www.'):
+        domain = domain[4:]
+    pattern = re.compile(r'[a-z][a-z0-9+.-]*://(?:www\.)?' + re.escape(domain) + r'(?:[/?#]|$)',
+                         re.IGNORECASE)
+    return lambda url: pattern.match(url) is not None
+
+
+class SitemapReader:
+    def __init__(self, headers=None, max_workers=4, max_bytes=SITEMAP_MAX_BYTES, max_sitemaps=1000,
+                 documents=None):
+        self.headers = headers or {}
+        self.max_workers = max(1, int(max_workers))
+        self.max_bytes = max_bytes
+        self.max_sitemaps = max_sitemaps
+        # Optional store of parsed sitemap files (a SitemapCache) used to
+        # revalidate instead of refetching.
+        self.documents = documents
+        self.sitemaps_fetched = 0
+        self.sitemaps_not_modified = 0
+        self.sitemaps_reused = 0
+        self.sitemaps_failed = []
+        self.complete = False
+
+    def fetch(self, sitemap_url, lastmod=None):
+        # Returns (document, how). A cached copy is reused outright when the
+        # parent index still declares the same lastmod, and otherwise
+        # revalidated with its ETag / Last-Modified.
+        cached = self.documents.get(sitemap_url) if self.documents else None
+        if cached is not None and lastmod and cached['lastmod'] == lastmod:
+            return cached, 'reused'
+
+        headers = dict(self.headers)
+        if cached is not None:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        with get_client().open(sitemap_url, headers=headers, max_bytes=self.max_bytes) as body:
+            if body.status_code == 304 and cached is not None:
+                document, how = cached, 'not_modified'
+            elif body.status_code != 200:
+                print(f"Sitemap not found at {sitemap_url}")
+                return None, 'missing'
+            else:
+                stream = body
+                if body.peek(2) == GZIP_MAGIC:
+                    stream = LimitedReader(gzip.GzipFile(fileobj=body), self.max_bytes, sitemap_url)
+                entries, children = parse_sitemap(stream)
+                document, how = {
+                    'entries': entries,
+                    'children': children,
+                    'etag': body.headers.get('ETag'),
+                    'last_modified': body.headers.get('Last-Modified'),
+                    'lastmod': lastmod,
+                }, 'fetched'
+
+        if self.documents is not None and (how == 'fetched' or document['lastmod'] != lastmod):
+            document['lastmod'] = lastmod
+            if document['etag'] or document['last_modified'] or lastmod:
+                try:
+                    self.documents.put(sitemap_url, document)
+                except OSError as e:
+                    print(f"Failed to cache sitemap {sitemap_url}: {e}")
+        return document, how
+
+    def iter_entries(self, sitemap_url, accept=None):
+        # Child sitemaps are fetched concurrently, but their entries are
+        # yielded in index order so the result matches a sequential read.
+        # Each URL is yielded once, the first time it is seen.
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='sitemap')
+        seen_sitemaps = {sitemap_url}
+        seen_urls = set()
+        futures = deque([(sitemap_url, executor.submit(self.fetch, sitemap_url))])
+        self.complete = False
+        try:
+            while futures:
+                url, future = futures.popleft()
+                try:
+                    document, how = future.result()
+                except Exception as e:
+                    print(f"Error accessing sitemap {url}: {e}")
+                    self.sitemaps_failed.append(url)
+                    continue
+                if document is None:
+                    continue
+                if how == 'reused':
+                    self.sitemaps_reused += 1
+                elif how == 'not_modified':
+                    self.sitemaps_not_modified += 1
+                else:
+                    self.sitemaps_fetched += 1
+
+                for child, lastmod in document['children']:
+                    if child not in seen_sitemaps and len(seen_sitemaps) < self.max_sitemaps:
+                        seen_sitemaps.add(child)
+                        futures.append((child, executor.submit(self.fetch, child, lastmod)))
+
+                for loc, lastmod in document['entries']:
+                    if loc in seen_urls or (accept is not None and not accept(loc)):
+                        continue
+                    seen_urls.add(loc)
+                    yield SitemapEntry(loc, lastmod)
+            # Only a read where the top-level sitemap answered is worth caching.
+            self.complete = sitemap_url not in self.sitemaps_failed
+        finally:
+            for _, future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+
+class SitemapCache(DiskCache):
+    # Parsed sitemap files for revalidation, plus a per-site summary (the
+    # filtered URL list) that is served as-is while younger than fresh_ttl.
+    # Lives on disk so every worker process shares it.
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024, ttl=7 * 24 * 3600, fresh_ttl=3600):
+        super().__init__(directory, max_bytes=max_bytes, ttl=ttl)
+        self.fresh_ttl = fresh_ttl
+        self.background_refreshes = 0
+        self._refreshing = set()
+        self._executor = None
+
+    def _key(self, kind, url):
+        return hashlib.sha256(f"{kind}:{url}".encode('utf-8')).hexdigest()
+
+    def get(self, sitemap_url):
+        return super().get(self._key('document', sitemap_url))
+
+    def put(self, sitemap_url, document):
+        super().put(self._key('document', sitemap_url), document)
+
+    def get_summary(self, sitemap_url):
+        summary = super().get(self._key('summary', sitemap_url))
+        self.record(hit=summary is not None)
+        return summary
+
+    def put_summary(self, sitemap_url, urls, lastmod):
+        summary = {'urls': list(urls), 'lastmod': dict(lastmod), 'fetched_at': time.time()}
+        try:
+            super().put(self._key('summary', sitemap_url), summary)
+        except OSError as e:
+            print(f"Failed to cache sitemap summary for {sitemap_url}: {e}")
+        return summary
+
+    def is_fresh(self, summary):
+        return time.time() - summary['fetched_at'] <= self.fresh_ttl
+
+    def refresh(self, sitemap_url, reader, accept=None):
+        urls = []
+        lastmod = {}
+        for entry in reader.iter_entries(sitemap_url, accept):
+            urls.append(entry.loc)
+            if entry.lastmod:
+                lastmod[entry.loc] = entry.lastmod
+        if reader.complete:
+            self.put_summary(sitemap_url, urls, lastmod)
+        return urls
+
+    def refresh_in_background(self, sitemap_url, reader, accept=None):
+        # At most one refresh per sitemap at a time in this process.
+        with self._lock:
+            if sitemap_url in self._refreshing:
+                return False
+            self._refreshing.add(sitemap_url)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='sitemap-refresh')
+            self.background_refreshes += 1
+            executor = self._executor
+
+        def run():
+            try:
+                self.refresh(sitemap_url, reader, accept)
+            except Exception as e:
+                print(f"Background sitemap refresh failed for {sitemap_url}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(sitemap_url)
+
+        executor.submit(run)
+        return True
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats['background_refreshes'] = self.background_refreshes
+            stats['refreshing'] = len(self._refreshing)
+        return stats
+
+
+_sitemap_cache = None
+_sitemap_cache_lock = threading.Lock()
+
+
+def get_sitemap_cache():
+    global _sitemap_cache
+    if os.environ.get('SEO_SITEMAP_CACHE', '1') == '0':
+        return None
+    with _sitemap_cache_lock:
+        if _sitemap_cache is None:
+            try:
+                _sitemap_cache = SitemapCache(
+                    os.path.join(CACHE_DIR, 'sitemaps'),
+                    max_bytes=int(os.environ.get('SEO_SITEMAP_CACHE_MAX_MB', 256)) * 1024 * 1024,
+                    fresh_ttl=int(os.environ.get('SEO_SITEMAP_TTL', 3600)),
+                )
+            except OSError as e:
+                print(f"Sitemap cache disabled: {e}")
+                return None
+        return _sitemap_cache
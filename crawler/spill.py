@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+import uuid
+
+from .cache import CACHE_DIR
+from .serialize import dumps, loads
+
+SPILL_DIR = os.environ.get('SEO_SPILL_DIR', os.path.join(CACHE_DIR, 'spill'))
+
+_pruned = False
+_prune_lock = threading.Lock()
+
+
+def spill_directory():
+    # Creates the directory and, once per process, removes spill files left
+    # behind by crashed or restarted workers.
+    global _pruned
+    os.makedirs(SPILL_DIR, exist_ok=True)
+    with _prune_lock:
+        if not _pruned:
+            _pruned = True
+            cutoff = time.time() - int(os.environ.get('SEO_SPILL_TTL', 24 * 3600))
+            for entry in os.scandir(SPILL_DIR):
+                try:
+                    if entry.name.endswith('.ndjson') and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except OSError:
+                    pass
+    return SPILL_DIR
+
+
+def should_spill(max_pages):
+    # Crawls of this many pages or more write their pages to disk instead of
+    # keeping them in a PageStore.
+    if os.environ.get('SEO_SPILL', '1') == '0':
+        return False
+    return max_pages >= int(os.environ.get('SEO_SPILL_MIN_PAGES', 1000))
+
+
+class SpillFile:
+    # Append-only NDJSON file of analyze_page records, used in place of a
+    # PageStore when a crawl is too large to hold in memory. Pages are
+    # written as they are analyzed and read back in chunks, so memory use
+    # depends on the chunk size rather than the size of the crawl. Readers
+    # on other threads only see lines that were completely written.
+    def __init__(self, path=None):
+        self.path = path or os.path.join(spill_directory(), f'{uuid.uuid4().hex}.ndjson')
+        self._file = open(self.path, 'ab')
+        self._lock = threading.Lock()
+        self.size = 0
+        self.bytes_written = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def empty(self):
+        return self.size == 0
+
+    def append(self, metrics):
+        line = dumps(metrics) + b'\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.bytes_written += len(line)
+            self.size += 1
+
+    def extend(self, records):
+        for metrics in records:
+            self.append(metrics)
+
+    def iter_records(self):
+        size = self.size
+        with open(self.path, 'rb') as f:
+            for _, line in zip(range(size), f):
+                yield loads(line)
+
+    def iter_chunks(self, size=1000):
+        chunk = []
+        for metrics in self.iter_records():
+            chunk.append(metrics)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def field_values(self, name, pages):
+        # The given field of the pages at the given positions, in one pass.
+        wanted = set(pages)
+        values = {}
+        for page, metrics in enumerate(self.iter_records()):
+            if page in wanted:
+                values[page] = metrics.get(name)
+                if len(values) == len(wanted):
+                    break
+        return [values.get(page) for page in pages]
+
+    def memory_usage(self):
+        return {
+            'pages': self.size,
+            'spilled': True,
+            'spill_bytes': self.bytes_written,
+            'total_bytes': 0,
+            'bytes_per_page': 0,
+        }
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def delete(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,59 @@
+import os
+import sqlite3
+import threading
+
+from .cache import CACHE_DIR
+
+
+class SQLiteStore:
+    # Base for the stores kept in a SQLite file under the cache directory.
+    # Each thread gets its own connection; WAL lets readers on other threads
+    # and gunicorn workers run while one connection writes.
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _connect(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+
+class SharedStore:
+    # One store per process, opened on first use by calling open_store.
+    # get() returns None while the store is disabled through enabled_var or
+    # open_store returns None; opening is retried on the next call.
+    def __init__(self, open_store, enabled_var=None):
+        self.open_store = open_store
+        self.enabled_var = enabled_var
+        self._store = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.enabled_var and os.environ.get(self.enabled_var, '1') == '0':
+            return None
+        with self._lock:
+            if self._store is None:
+                self._store = self.open_store()
+            return self._store
+
+
+def open_pruned_store(store_class, path_var, filename, ttl_var, ttl, label):
+    # Opens a store at path_var (default filename in the cache directory)
+    # and drops entries older than ttl_var seconds. Prints why and returns
+    # None when the file cannot be opened.
+    path = os.environ.get(path_var, os.path.join(CACHE_DIR, filename))
+    try:
+        store = store_class(path)
+        store.prune(int(os.environ.get(ttl_var, ttl)))
+    except (OSError, sqlite3.Error) as e:
+        print(f"{label} disabled: {e}")
+        return None
+    return store
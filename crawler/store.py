@@ -0,0 +1,239 @@
+import itertools
+import sys
+
+import numpy as np
+import pandas as pd
+
+NUMERIC_COLUMNS = {
+    'word_count': np.int32,
+    'image_count': np.int32,
+    'heading_count': np.int32,
+    'internal_links': np.int32,
+    'external_links': np.int32,
+    'meta_description_length': np.int32,
+    'h1_count': np.int32,
+    'h2_count': np.int32,
+    'h3_count': np.int32,
+    'paragraph_count': np.int32,
+    'avg_paragraph_length': np.float64,
+    'page_size_kb': np.float64,
+    'contains_schema': np.bool_,
+}
+
+# 64-bit fingerprints, hex strings in the records.
+HASH_COLUMNS = ('content_hash', 'simhash')
+
+STRING_COLUMNS = ('url', 'title', 'meta_description', 'content', 'page_link', 'html_blob')
+
+# Key order of analyze_page's metrics, which records() reproduces.
+RECORD_FIELDS = (
+    'url', 'title', 'word_count', 'image_count', 'heading_count', 'internal_links',
+    'external_links', 'keywords', 'keyword_phrases', 'meta_description',
+    'meta_description_length', 'h1_count', 'h2_count', 'h3_count', 'paragraph_count',
+    'avg_paragraph_length', 'contains_schema', 'page_size_kb', 'content', 'structured_content',
+    'page_link', 'html_blob', 'content_hash', 'simhash',
+)
+
+KEYWORD_COLUMNS = {
+    'page': np.int32,
+    'term': np.int32,
+    'count': np.int32,
+    'relevance': np.float64,
+    'phrase': np.bool_,
+    'words': np.int8,
+}
+
+
+class StringPool:
+    # Interns strings to int32 codes. Code 0 is always the empty string, so
+    # missing values need no separate mask.
+    def __init__(self):
+        self.strings = ['']
+        self.codes = {'': 0}
+
+    def intern(self, value):
+        if value is None:
+            value = ''
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.strings)
+            self.strings.append(sys.intern(value) if len(value) < 256 else value)
+            self.codes[value] = code
+        return code
+
+    def __len__(self):
+        return len(self.strings)
+
+    def nbytes(self):
+        return sum(sys.getsizeof(s) for s in self.strings) + sys.getsizeof(self.codes)
+
+
+class Column:
+    # Append-only typed array with amortized doubling.
+    def __init__(self, dtype, capacity=64):
+        self.values = np.zeros(capacity, dtype=dtype)
+        self.size = 0
+
+    def append(self, value):
+        if self.size == len(self.values):
+            grown = np.zeros(len(self.values) * 2, dtype=self.values.dtype)
+            grown[:self.size] = self.values
+            self.values = grown
+        self.values[self.size] = value
+        self.size += 1
+
+    def view(self, size=None):
+        return self.values[:self.size if size is None else size]
+
+
+class PageStore:
+    # Columnar replacement for a list of analyze_page dicts: numeric metrics
+    # in NumPy arrays, strings as codes into per-column pools, and keywords
+    # and phrases flattened into one (page, term, count, relevance) table.
+    # structured_content stays a Python object per page since only the
+    # response uses it; keep_structured=False drops it. String columns named
+    # in omit are stored as '' (see SpillAnalyzer).
+    def __init__(self, keep_structured=True, omit=()):
+        self.keep_structured = keep_structured
+        self.omit = frozenset(omit)
+        self.numeric = {name: Column(dtype) for name, dtype in NUMERIC_COLUMNS.items()}
+        self.hashes = {name: Column(np.uint64) for name in HASH_COLUMNS}
+        self.strings = {name: Column(np.int32) for name in STRING_COLUMNS}
+        self.pools = {name: StringPool() for name in STRING_COLUMNS}
+        self.keyword_columns = {name: Column(dtype) for name, dtype in KEYWORD_COLUMNS.items()}
+        self.terms = StringPool()
+        self.structured = []
+        self.size = 0
+
+    @classmethod
+    def from_records(cls, records, keep_structured=True, omit=()):
+        store = cls(keep_structured=keep_structured, omit=omit)
+        for metrics in records:
+            store.append(metrics)
+        return store
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def empty(self):
+        return self.size == 0
+
+    def _add_keyword(self, page, term, count, relevance, phrase, words):
+        columns = self.keyword_columns
+        columns['page'].append(page)
+        columns['term'].append(self.terms.intern(term))
+        columns['count'].append(count)
+        columns['relevance'].append(relevance)
+        columns['phrase'].append(phrase)
+        columns['words'].append(words)
+
+    def append(self, metrics):
+        page = self.size
+        for name, column in self.numeric.items():
+            value = metrics.get(name)
+            column.append(0 if value is None or value != value else value)
+        for name, column in self.hashes.items():
+            value = metrics.get(name)
+            column.append(int(value, 16) if value else 0)
+        for name, column in self.strings.items():
+            column.append(self.pools[name].intern(metrics.get(name) if name not in self.omit else None))
+        for kw, count, relevance in metrics.get('keywords') or ():
+            self._add_keyword(page, kw, count, relevance, False, 1)
+        for phrase in metrics.get('keyword_phrases') or ():
+            self._add_keyword(page, phrase['phrase'], phrase['count'], phrase['relevance'], True,
+                              phrase['words'])
+        self.structured.append(metrics.get('structured_content') if self.keep_structured else None)
+        # Published last so readers on other threads only see complete pages.
+        self.size += 1
+
+    def extend(self, records):
+        for metrics in records:
+            self.append(metrics)
+
+    def to_frame(self):
+        # One row per page, indexed by page id; strings become categoricals
+        # over their pool, so no column has object dtype.
+        size = self.size
+        data = {}
+        for name in STRING_COLUMNS:
+            data[name] = pd.Categorical.from_codes(self.strings[name].view(size),
+                                                   categories=self._categories(name))
+        for name, column in itertools.chain(self.numeric.items(), self.hashes.items()):
+            data[name] = column.view(size)
+        frame = pd.DataFrame(data, copy=False)
+        return frame[[field for field in RECORD_FIELDS if field in frame.columns]]
+
+    def _categories(self, name):
+        # Pools only grow, so a snapshot taken after the codes covers them.
+        return pd.Index(list(self.pools[name].strings), dtype=object)
+
+    def keyword_frame(self, pages=None):
+        # Keywords and phrases of every page, in page order and, within a
+        # page, in the order analyze_page ranked them (keywords first).
+        pages = self.size if pages is None else pages
+        size = min(column.size for column in self.keyword_columns.values())
+        frame = pd.DataFrame({name: column.view(size) for name, column in self.keyword_columns.items()},
+                             copy=False)
+        return frame[frame['page'] < pages]
+
+    def term_strings(self):
+        return np.array(self.terms.strings, dtype=object)
+
+    def records(self):
+        # analyze_page-shaped dicts, for the JSON response.
+        size = self.size
+        numeric = {name: column.view(size).tolist() for name, column in self.numeric.items()}
+        hashes = {name: [f'{value:016x}' if value else None for value in column.view(size).tolist()]
+                  for name, column in self.hashes.items()}
+        strings = {name: [self.pools[name].strings[code] for code in column.view(size).tolist()]
+                   for name, column in self.strings.items()}
+        keywords = [[] for _ in range(size)]
+        phrases = [[] for _ in range(size)]
+        table = self.keyword_frame(size)
+        terms = self.terms.strings
+        for page, term, count, relevance, phrase, words in zip(*(table[name].tolist()
+                                                                 for name in KEYWORD_COLUMNS)):
+            if phrase:
+                phrases[page].append({'phrase': terms[term], 'count': count, 'relevance': relevance,
+                                      'words': words})
+            else:
+                keywords[page].append((terms[term], count, relevance))
+
+        records = []
+        for page in range(size):
+            record = {}
+            for field in RECORD_FIELDS:
+                if field in numeric:
+                    record[field] = numeric[field][page]
+                elif field in hashes:
+                    record[field] = hashes[field][page]
+                elif field in strings:
+                    record[field] = strings[field][page]
+                elif field == 'keywords':
+                    record[field] = keywords[page]
+                elif field == 'keyword_phrases':
+                    record[field] = phrases[page]
+                elif field == 'structured_content':
+                    record[field] = self.structured[page] if self.structured[page] is not None else {}
+            if not record['html_blob']:
+                record['html_blob'] = None
+            records.append(record)
+        return records
+
+    def memory_usage(self):
+        numeric = sum(column.values.nbytes for column in itertools.chain(self.numeric.values(),
+                                                                         self.hashes.values()))
+        strings = sum(column.values.nbytes for column in self.strings.values())
+        strings += sum(pool.nbytes() for pool in self.pools.values())
+        keywords = sum(column.values.nbytes for column in self.keyword_columns.values())
+        keywords += self.terms.nbytes()
+        total = numeric + strings + keywords
+        return {
+            'pages': self.size,
+            'numeric_bytes': numeric,
+            'string_bytes': strings,
+            'keyword_bytes': keywords,
+            'total_bytes': total,
+            'bytes_per_page': total / self.size if self.size else 0,
+        }
@@ -0,0 +1,82 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from requests.compat import chardet
+
+from .keywords import get_keyword_engine
+from .parsers import parse_html
+
+_crawlers = {}
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _init_worker():
+    # Load the NLTK corpora once per worker process instead of on the first
+    # page each worker happens to receive.
+    get_keyword_engine()
+
+
+def _crawler_for(start_url, parser):
+    from .crawler import WebsiteCrawler
+
+    crawler = _crawlers.get((start_url, parser))
+    if crawler is None:
+        if len(_crawlers) >= 32:
+            _crawlers.clear()
+        crawler = WebsiteCrawler(start_url, max_pages=1, http_cache=False, result_cache=False,
+                                 parser=parser, sitemap_cache=False)
+        _crawlers[(start_url, parser)] = crawler
+    return crawler
+
+
+def analyze_document(url, start_url, body, encoding=None, parser='html.parser'):
+    if not encoding:
+        encoding = chardet.detect(body)['encoding'] or 'utf-8'
+    text = str(body, encoding, errors='replace')
+
+    crawler = _crawler_for(start_url, parser)
+    soup = parse_html(text, crawler.parser)
+    metrics = crawler.analyze_page(url, soup)
+    links = list(dict.fromkeys(crawler.extract_links(soup)))
+    return metrics, links
+
+
+def _mp_context():
+    # Forking a process that is running fetcher and server threads can copy
+    # locks held by those threads into the child. forkserver starts workers
+    # from a clean single-threaded server that has already imported this
+    # module; spawn is the fallback where forkserver is unavailable.
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+class AnalysisPool:
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_mp_context(),
+                                             initializer=_init_worker)
+
+    def submit(self, url, start_url, body, encoding=None, parser='html.parser'):
+        return self._executor.submit(analyze_document, url, start_url, body, encoding, parser)
+
+    def analyze(self, url, start_url, body, encoding=None, parser='html.parser'):
+        return self.submit(url, start_url, body, encoding, parser).result()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def get_analysis_pool(workers=None):
+    workers = workers or os.cpu_count() or 1
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = AnalysisPool(workers)
+            _pools[workers] = pool
+        return pool
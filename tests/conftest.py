@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Keep test runs off the network and out of the user's cache directory.
+os.environ.setdefault('SEO_NLTK_DOWNLOAD', '0')
+os.environ.setdefault('SEO_CACHE_DIR', tempfile.mkdtemp(prefix='seoanalyzer-tests-'))
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+class Site:
+    # Pages served by the site fixture: path -> (body, headers). Requests
+    # are logged as (path, If-None-Match) and answered 304 when the ETag
+    # still matches. Clearing open holds every request until it is set.
+    def __init__(self, url):
+        self.url = url
+        self.pages = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        self.open = threading.Event()
+        self.open.set()
+
+    def page(self, path, body, etag=None, content_type='text/html; charset=utf-8'):
+        headers = {'Content-Type': content_type}
+        if etag:
+            headers['ETag'] = etag
+        self.pages[path] = (body.encode('utf-8'), headers)
+
+    def fetched(self):
+        with self.lock:
+            return [path for path, _ in self.requests]
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        site = self.server.site
+        if_none_match = self.headers.get('If-None-Match')
+        with site.lock:
+            site.requests.append((self.path, if_none_match))
+        site.open.wait(10)
+        if self.path not in site.pages:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body, headers = site.pages[self.path]
+        if if_none_match and if_none_match == headers.get('ETag'):
+            self.send_response(304)
+            self.send_header('ETag', headers['ETag'])
+            self.end_headers()
+            return
+        self.send_response(200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), SiteHandler)
+    httpd.site = Site(f'http://127.0.0.1:{httpd.server_address[1]}')
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.site
+    httpd.site.open.set()
+    httpd.shutdown()
+    httpd.server_close()
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+import app as app_module
+from crawler.registry import MemoryCrawlRegistry
+
+
+def record(crawl_id, domain, age):
+    return {'crawl_id': crawl_id, 'url': f'http://{domain}/', 'domain': domain,
+            'sitemap_urls': [f'http://{domain}/{crawl_id}'], 'page_count': 1,
+            'created_at': time.time() - age}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app_module, 'crawl_registry', MemoryCrawlRegistry())
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def page_url(site):
+    site.page('/page', '<html><head><title>Page</title></head><body><h1>Page</h1>'
+                       '<p>Some text about crawling.</p></body></html>')
+    return site.url + '/page'
+
+
+def analyze(client, **data):
+    response = client.post('/api/analyze-url', json=data)
+    return response.status_code, response.get_json()
+
+
+def test_analyze_url_needs_a_crawl(client, page_url):
+    assert analyze(client)[0] == 400
+    status, body = analyze(client, url=page_url)
+    assert status == 400
+    assert 'Analyze a website first' in body['error']
+
+
+def test_analyze_url_uses_the_crawl_of_its_domain(client, page_url):
+    domain = page_url.split('/')[2]
+    app_module.crawl_registry.put(record('own', domain, 20))
+    app_module.crawl_registry.put(record('newer', 'other.com', 10))
+
+    status, body = analyze(client, url=page_url)
+    assert status == 200
+    assert body['crawl_id'] == 'own'
+    assert body['sitemap_urls'] == [f'http://{domain}/own']
+    assert body['crawl_domain'] == domain
+    assert [page['url'] for page in body['pages']] == [page_url]
+
+
+def test_analyze_url_falls_back_to_the_newest_crawl(client, page_url):
+    app_module.crawl_registry.put(record('older', 'one.com', 20))
+    app_module.crawl_registry.put(record('newer', 'two.com', 10))
+    status, body = analyze(client, url=page_url)
+    assert status == 200
+    assert body['crawl_id'] == 'newer'
+
+
+def test_analyze_url_with_explicit_crawl(client, page_url):
+    domain = page_url.split('/')[2]
+    app_module.crawl_registry.put(record('chosen', 'one.com', 20))
+    app_module.crawl_registry.put(record('own', domain, 10))
+
+    assert analyze(client, url=page_url, crawl_id='chosen')[1]['crawl_id'] == 'chosen'
+    assert analyze(client, url=page_url, domain='one.com')[1]['crawl_id'] == 'chosen'
+    assert analyze(client, url=page_url, crawl_id='missing')[0] == 400
+    assert analyze(client, url=page_url, domain='missing.com')[0] == 400
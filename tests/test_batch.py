@@ -0,0 +1,39 @@
+import threading
+
+from crawler.batch import BatchAnalysis, interleave_by_domain
+
+
+def test_interleave_by_domain():
+    urls = ['http://a.com/1', 'http://a.com/2', 'http://b.com/1', 'http://a.com/1', 'http://c.com/1']
+    assert interleave_by_domain(urls) == ['http://a.com/1', 'http://b.com/1', 'http://c.com/1',
+                                          'http://a.com/2']
+
+
+class LateSubmitBatch(BatchAnalysis):
+    # A site task that is still running when the consumer stops and then
+    # submits one more fetch.
+    def __init__(self, urls, release):
+        super().__init__(urls, max_sites=len(urls))
+        self.release = release
+        self.submitted = threading.Event()
+
+    def _crawl_site(self, url, events):
+        if url.endswith('/first'):
+            events.put(('site', url, {}))
+            return
+        self.release.wait(5)
+        self.fetcher.submit(url, handler=lambda url, response: None).cancel()
+        self.submitted.set()
+        events.put(('site', url, {}))
+
+
+def test_fetcher_stays_shut_down_after_early_stop():
+    release = threading.Event()
+    batch = LateSubmitBatch(['http://a.invalid/first', 'http://b.invalid/slow'], release)
+    events = batch.run()
+    next(events)
+    # Let the slow site go on while the consumer stops.
+    threading.Timer(0.2, release.set).start()
+    events.close()
+    assert batch.submitted.wait(5)
+    assert batch.fetcher._executor is None
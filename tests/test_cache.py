@@ -0,0 +1,53 @@
+import os
+import time
+
+from crawler.cache import DiskCache
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+               if name.endswith('.entry'))
+
+
+def test_budget_is_shared_between_processes(tmp_path):
+    # Two caches over one directory stand in for two worker processes,
+    # rescanning on every put.
+    first = DiskCache(str(tmp_path), max_bytes=20000, rescan_interval=0)
+    second = DiskCache(str(tmp_path), max_bytes=20000, rescan_interval=0)
+    for i in range(30):
+        (first if i % 2 else second).put(f'key{i}', b'x' * 1000)
+        time.sleep(0.002)
+    assert directory_size(str(tmp_path)) <= 20000
+    # The oldest entries went first, whichever process wrote them.
+    assert first.get('key0') is None and second.get('key1') is None
+    assert first.get('key29') == b'x' * 1000 and first.get('key28') == b'x' * 1000
+
+
+def test_hits_in_another_process_count_as_recent(tmp_path):
+    first = DiskCache(str(tmp_path), max_bytes=12000, rescan_interval=0)
+    second = DiskCache(str(tmp_path), max_bytes=12000, rescan_interval=0)
+    for i in range(10):
+        first.put(f'key{i}', b'x' * 1000)
+        time.sleep(0.002)
+    assert second.get('key0') == b'x' * 1000
+    time.sleep(0.002)
+    for i in range(10, 13):
+        second.put(f'key{i}', b'x' * 1000)
+        time.sleep(0.002)
+    assert first.get('key0') == b'x' * 1000
+    assert first.get('key1') is None
+
+
+def test_over_budget_put_rescans(tmp_path):
+    first = DiskCache(str(tmp_path), max_bytes=10000)
+    second = DiskCache(str(tmp_path), max_bytes=10000)
+    for i in range(8):
+        second.put(f'other{i}', b'y' * 1000)
+    for i in range(3):
+        first.put(f'own{i}', b'x' * 1000)
+    # first only counted its own entries until a put took it over budget.
+    assert directory_size(str(tmp_path)) > 10000
+    for i in range(3, 10):
+        first.put(f'own{i}', b'x' * 1000)
+    assert directory_size(str(tmp_path)) <= 9000
+    assert first.stats()['entries'] == len(os.listdir(str(tmp_path)))
@@ -0,0 +1,67 @@
+from crawler.checkpoint import CheckpointStore
+from crawler.crawler import WebsiteCrawler
+
+PAGES = 12
+
+
+def build_site(site):
+    # A home page linking to every page; each page links on to the next.
+    links = ''.join(f'<a href="/page-{i}">Page {i}</a>' for i in range(PAGES))
+    site.page('/', f'<html><head><title>Home</title></head><body><h1>Home</h1>{links}</body></html>')
+    for i in range(PAGES):
+        site.page(f'/page-{i}', f'<html><head><title>Page {i}</title></head><body><h1>Page {i}</h1>'
+                                f'<p>Text of page {i}.</p><a href="/page-{(i + 1) % PAGES}">Next</a>'
+                                '</body></html>')
+
+
+def crawler_options():
+    # No caches, so every page visited is a request to the site.
+    return dict(max_workers=2, requests_per_second=0, http_cache=False, result_cache=False,
+                sitemap_cache=False, blob_store=False)
+
+
+def test_resume_skips_visited_pages(site, tmp_path):
+    build_site(site)
+    store = CheckpointStore(str(tmp_path / 'checkpoints.sqlite3'))
+    start_url = site.url + '/'
+
+    full = WebsiteCrawler(start_url, max_pages=50, checkpoint=store, **crawler_options())
+    expected = {page['url'] for page in full.crawl().records()}
+    assert len(expected) == PAGES + 1
+
+    crawler = WebsiteCrawler(start_url, max_pages=50, checkpoint=store, checkpoint_every=2,
+                             **crawler_options())
+    pages = crawler.iter_crawl()
+    for _ in range(5):
+        next(pages)
+    # Stopping the generator stands in for a crash: the crawl is left
+    # running in the store with the pages checkpointed so far.
+    pages.close()
+    saved = store.load(crawler.crawl_id)
+    assert saved['status'] == 'running'
+    visited = store.page_urls(crawler.crawl_id)
+    assert len(visited) == 5
+
+    del site.requests[:]
+    resumed = WebsiteCrawler.resume(crawler.crawl_id, store, **crawler_options())
+    assert resumed.resumed
+    data = resumed.crawl()
+
+    fetched = {site.url + path for path in site.fetched()}
+    assert fetched and not fetched & set(visited)
+    assert {page['url'] for page in data.records()} == expected
+    assert store.page_count(crawler.crawl_id) == PAGES + 1
+
+    # Once complete, the resume state is dropped and the earlier completed
+    # crawl of the same start URL is superseded.
+    saved = store.load(crawler.crawl_id)
+    assert saved['status'] == 'completed'
+    assert saved['state'] is None
+    assert store.load(full.crawl_id) is None
+    assert store.page_count(full.crawl_id) == 0
+    assert store.latest(start_url) == crawler.crawl_id
+
+
+def test_resume_unknown_crawl(tmp_path):
+    store = CheckpointStore(str(tmp_path / 'checkpoints.sqlite3'))
+    assert WebsiteCrawler.resume('missing', store) is None
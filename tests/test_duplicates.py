@@ -0,0 +1,50 @@
+import random
+
+from crawler.duplicates import duplicate_clusters, fingerprint
+
+
+def article(seed, words=2000):
+    rng = random.Random(seed)
+    vocabulary = [f'word{i}' for i in range(500)]
+    return [rng.choice(vocabulary) for _ in range(words)]
+
+
+def clusters_of(pages):
+    hashes = [fingerprint(words) for words in pages]
+    content_hashes = [int(content_hash, 16) if content_hash else 0 for content_hash, _ in hashes]
+    simhashes = [int(simhash, 16) if simhash else 0 for _, simhash in hashes]
+    return sorted(duplicate_clusters(content_hashes, simhashes), key=lambda cluster: cluster[1])
+
+
+def test_exact_and_near_duplicates():
+    base = article(1)
+    near = list(base)
+    near[1000] = 'changed'
+    pages = [
+        base,
+        [word.upper() for word in base],  # same words, different case
+        article(2),
+        near,
+        article(3),
+        [],
+    ]
+    assert clusters_of(pages) == [('near', [0, 1, 3])]
+
+
+def test_distinct_pages_are_not_clustered():
+    assert clusters_of([article(seed) for seed in range(20)]) == []
+
+
+def test_exact_duplicates_only():
+    base = article(1)
+    assert clusters_of([article(2), base, list(base), article(3), list(base)]) == [('exact', [1, 2, 4])]
+
+
+def test_near_duplicate_threshold():
+    # Three differing bits, in three different bands, are near; four are
+    # not, unless max_distance allows it.
+    base = 0x0123456789abcdef
+    near = base ^ (1 << 0) ^ (1 << 20) ^ (1 << 40)
+    far = base ^ (1 << 5) ^ (1 << 25) ^ (1 << 45) ^ (1 << 61)
+    assert duplicate_clusters([1, 2, 3], [base, near, far]) == [('near', [0, 1])]
+    assert duplicate_clusters([1, 2], [base, far], max_distance=4) == [('near', [0, 1])]
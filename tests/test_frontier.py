@@ -0,0 +1,59 @@
+import pickle
+
+import pytest
+
+from crawler.frontier import BloomFilter, Frontier, normalize_url
+
+
+@pytest.mark.parametrize('url, equivalent', [
+    ('HTTP://Example.COM/a', 'http://example.com/a'),
+    ('http://example.com:80/a', 'http://example.com/a'),
+    ('https://example.com:443/a', 'https://example.com/a'),
+    ('http://example.com/a/', 'http://example.com/a'),
+    ('http://example.com', 'http://example.com/'),
+    ('http://example.com/a#section', 'http://example.com/a'),
+    ('http://example.com/a?b=2&a=1', 'http://example.com/a?a=1&b=2'),
+    ('http://example.com/a?a=1&&b=2', 'http://example.com/a?a=1&b=2'),
+    (' http://example.com/a ', 'http://example.com/a'),
+])
+def test_normalize_url_equivalences(url, equivalent):
+    assert normalize_url(url) == normalize_url(equivalent)
+
+
+@pytest.mark.parametrize('url, other', [
+    ('http://example.com/a', 'https://example.com/a'),
+    ('http://example.com:8080/a', 'http://example.com/a'),
+    ('http://example.com/A', 'http://example.com/a'),
+    ('http://example.com/a?a=1', 'http://example.com/a?a=2'),
+])
+def test_normalize_url_distinct(url, other):
+    assert normalize_url(url) != normalize_url(other)
+
+
+def test_frontier_keeps_first_spelling():
+    frontier = Frontier()
+    assert frontier.add('http://example.com/a/#top')
+    assert not frontier.add('HTTP://EXAMPLE.COM/a')
+    assert frontier.duplicates == 1
+    assert frontier.pop() == 'http://example.com/a/'
+
+
+def test_bloom_filter_snapshot_round_trip():
+    frontier = Frontier(prioritized=True, bloom_capacity=1000)
+    for i in range(50):
+        frontier.add(f'http://example.com/page-{i}', (1, -i))
+    handed_out = [frontier.pop() for _ in range(5)]
+    in_flight = frontier.pop()
+
+    state = pickle.loads(pickle.dumps(frontier.snapshot([in_flight])))
+    restored = Frontier.from_snapshot(state, handed_out)
+
+    assert isinstance(state['seen'], BloomFilter)
+    assert len(restored) == 45
+    assert restored.stats() == dict(frontier.stats(), queued=45)
+    for i in range(50):
+        assert restored.seen(f'http://example.com/page-{i}/')
+    assert not restored.add('http://example.com/page-3')
+    assert restored.add('http://example.com/page-50', (1, 0))
+    assert restored.pop() == in_flight
+    assert [restored.pop() for _ in range(3)] == [f'http://example.com/page-{i}' for i in (43, 42, 41)]
@@ -0,0 +1,89 @@
+import pytest
+
+from crawler.analyzer import DataAnalyzer
+from crawler.history import HistoryStore
+
+
+def page(url, word_count, keywords, phrases=()):
+    return {
+        'url': url,
+        'title': url.rsplit('/', 1)[-1].title(),
+        'word_count': word_count,
+        'keywords': keywords,
+        'keyword_phrases': [{'phrase': phrase, 'count': count, 'relevance': relevance, 'words': 2}
+                            for phrase, count, relevance in phrases],
+    }
+
+
+@pytest.fixture
+def history(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    crawls = [
+        ('a1', 'http://a.com/', 100.0, [
+            page('http://a.com/seo', 200, [('seo', 5, 6.0), ('audit', 2, 2.0)], [('seo audit', 2, 2.4)]),
+            page('http://a.com/blog', 400, [('blog', 3, 3.0)]),
+        ]),
+        ('b1', 'http://b.com/', 150.0, [
+            page('http://b.com/seo', 1000, [('seo', 1, 1.0)]),
+        ]),
+        ('a2', 'http://a.com/', 200.0, [
+            page('http://a.com/seo', 300, [('seo', 7, 8.0)]),
+            page('http://a.com/blog', 500, [('audit', 4, 4.0)]),
+        ]),
+    ]
+    for crawl_id, url, crawled_at, pages in crawls:
+        domain = url.split('/')[2]
+        assert store.record(crawl_id, url, domain, DataAnalyzer(pages), stats={'pages': len(pages)},
+                            crawled_at=crawled_at)
+    return store
+
+
+def test_crawls_and_get(history):
+    assert [crawl['crawl_id'] for crawl in history.crawls()] == ['a2', 'b1', 'a1']
+    assert [crawl['crawl_id'] for crawl in history.crawls(domain='a.com')] == ['a2', 'a1']
+    assert [crawl['crawl_id'] for crawl in history.crawls(since=120, until=180)] == ['b1']
+    crawl = history.get('a1')
+    assert crawl['page_count'] == 2
+    assert crawl['averages']['word_count'] == 300
+    assert crawl['stats'] == {'pages': 2}
+    assert history.get('missing') is None
+    assert [page['url'] for page in history.pages('a2')] == ['http://a.com/seo', 'http://a.com/blog']
+
+
+def test_domain_and_url_trends(history):
+    assert [(point['crawl_id'], point['value']) for point in history.trend('word_count', domain='a.com')] == \
+        [('a1', 300), ('a2', 400)]
+    assert [(point['crawl_id'], point['value']) for point in history.trend('word_count')] == \
+        [('a1', 300), ('b1', 1000), ('a2', 400)]
+    assert [(point['crawl_id'], point['value'])
+            for point in history.trend('word_count', url='http://a.com/blog')] == [('a1', 400), ('a2', 500)]
+    assert [point['crawl_id'] for point in history.trend('word_count', since=150)] == ['b1', 'a2']
+    assert [point['crawl_id'] for point in history.trend('word_count', limit=1)] == ['a2']
+    with pytest.raises(ValueError):
+        history.trend('not_a_metric')
+
+
+def test_keyword_trend_and_totals(history):
+    points = history.keyword_trend('seo')
+    assert [(p['crawl_id'], p['domain'], p['count'], p['page_count']) for p in points] == \
+        [('a1', 'a.com', 5, 1), ('b1', 'b.com', 1, 1), ('a2', 'a.com', 7, 1)]
+    assert [p['crawl_id'] for p in history.keyword_trend('seo', domain='a.com')] == ['a1', 'a2']
+    assert [(p['crawl_id'], p['count']) for p in history.keyword_trend('audit')] == [('a1', 2), ('a2', 4)]
+    assert [(p['crawl_id'], p['count']) for p in history.keyword_trend('seo audit')] == [('a1', 2)]
+    assert history.keyword_trend('missing') == []
+
+    totals = history.keyword_totals('a1')
+    assert [(t['name'], t['value'], t['is_phrase']) for t in totals] == \
+        [('seo', 5, False), ('blog', 3, False), ('seo audit', 2, True), ('audit', 2, False)]
+
+
+def test_record_replaces_and_delete(history):
+    analyzer = DataAnalyzer([page('http://a.com/seo', 50, [('seo', 1, 1.0)])])
+    assert history.record('a2', 'http://a.com/', 'a.com', analyzer, crawled_at=200.0)
+    assert history.get('a2')['page_count'] == 1
+    assert [(p['crawl_id'], p['count']) for p in history.keyword_trend('seo', domain='a.com')] == \
+        [('a1', 5), ('a2', 1)]
+    history.delete('a2')
+    assert history.get('a2') is None
+    assert history.pages('a2') == []
+    assert [p['crawl_id'] for p in history.keyword_trend('audit')] == ['a1']
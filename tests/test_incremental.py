@@ -0,0 +1,73 @@
+from crawler.checkpoint import CheckpointStore
+from crawler.crawler import WebsiteCrawler
+
+
+def page(title, text):
+    return f'<html><head><title>{title}</title></head><body><h1>{title}</h1><p>{text}</p></body></html>'
+
+
+def build_site(site):
+    # /etag answers 304 to a matching If-None-Match, /same has no
+    # validators and an unchanged body, /lastmod keeps its sitemap lastmod
+    # and /changed gets a new body before the recrawl.
+    site.page('/', page('Home', 'The home page.'))
+    site.page('/etag', page('Etag', 'A page with an ETag.'), etag='"etag-1"')
+    site.page('/same', page('Same', 'A page that does not change.'))
+    site.page('/lastmod', page('Lastmod', 'A page listed with a lastmod.'))
+    site.page('/changed', page('Changed', 'The first version.'))
+    entries = ''.join(
+        f'<url><loc>{site.url}{path}</loc>{lastmod}</url>'
+        for path, lastmod in [('/etag', ''), ('/same', ''), ('/changed', ''),
+                              ('/lastmod', '<lastmod>2026-01-01</lastmod>')]
+    )
+    site.page('/sitemap.xml', '<?xml version="1.0" encoding="UTF-8"?>'
+                              f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>',
+              content_type='application/xml')
+
+
+def crawl(site, store):
+    crawler = WebsiteCrawler(site.url + '/', max_pages=10, checkpoint=store, incremental=True,
+                             max_workers=2, requests_per_second=0, http_cache=False,
+                             result_cache=False, sitemap_cache=False, blob_store=False)
+    data = crawler.crawl()
+    return crawler, {record['url'][len(site.url):]: record for record in data.records()}
+
+
+def test_recrawl_reuses_unchanged_pages(site, tmp_path):
+    build_site(site)
+    store = CheckpointStore(str(tmp_path / 'checkpoints.sqlite3'))
+    first, pages = crawl(site, store)
+    assert first.baseline is None
+    assert first.pages_skipped == 0
+    assert set(pages) == {'/', '/etag', '/same', '/lastmod', '/changed'}
+
+    site.page('/changed', page('Changed again', 'The second version.'))
+    del site.requests[:]
+    second, pages = crawl(site, store)
+
+    assert second.baseline == first.crawl_id
+    # Home, /same (body hash), /etag (304) and /lastmod (sitemap) are reused.
+    assert second.pages_skipped == 4
+    assert set(pages) == {'/', '/etag', '/same', '/lastmod', '/changed'}
+    assert ('/etag', '"etag-1"') in site.requests
+    assert '/lastmod' not in site.fetched()
+    assert pages['/etag']['title'] == 'Etag'
+    assert pages['/lastmod']['title'] == 'Lastmod'
+    assert pages['/changed']['title'] == 'Changed again'
+    assert store.load(first.crawl_id) is None
+
+
+def test_changed_lastmod_is_fetched(site, tmp_path):
+    build_site(site)
+    store = CheckpointStore(str(tmp_path / 'checkpoints.sqlite3'))
+    crawl(site, store)
+
+    site.page('/lastmod', page('Lastmod updated', 'A newer version.'))
+    sitemap, headers = site.pages['/sitemap.xml']
+    site.pages['/sitemap.xml'] = (sitemap.replace(b'2026-01-01', b'2026-02-01'), headers)
+    del site.requests[:]
+    second, pages = crawl(site, store)
+
+    assert '/lastmod' in site.fetched()
+    assert pages['/lastmod']['title'] == 'Lastmod updated'
+    assert second.pages_skipped == 4
@@ -0,0 +1,109 @@
+import time
+
+import pytest
+
+from crawler.checkpoint import CheckpointStore
+from crawler.crawler import WebsiteCrawler
+from crawler.jobs import JobConflict, JobManager, JobQueueFull
+
+PAGES = 8
+CRAWLER_OPTIONS = dict(max_workers=2, requests_per_second=0, http_cache=False, result_cache=False,
+                       sitemap_cache=False, blob_store=False)
+
+
+def build_site(site):
+    links = ''.join(f'<a href="/page-{i}">Page {i}</a>' for i in range(PAGES))
+    site.page('/', f'<html><head><title>Home</title></head><body><h1>Home</h1>{links}</body></html>')
+    for i in range(PAGES):
+        site.page(f'/page-{i}', f'<html><head><title>Page {i}</title></head><body><h1>Page {i}</h1>'
+                                f'<p>Text of page {i} about crawling.</p></body></html>')
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_queue_limit_and_cancel(site):
+    build_site(site)
+    site.open.clear()
+    manager = JobManager(max_workers=1, max_queue=2)
+    running = manager.submit(site.url + '/', max_pages=5, crawler_options=CRAWLER_OPTIONS)
+    queued = manager.submit(site.url + '/', max_pages=5, crawler_options=CRAWLER_OPTIONS)
+    wait_for(lambda: running.status == 'running')
+    with pytest.raises(JobQueueFull):
+        manager.submit(site.url + '/', max_pages=5, crawler_options=CRAWLER_OPTIONS)
+
+    # A queued job is cancelled at once and never runs.
+    assert manager.cancel(queued.id) is queued
+    assert queued.status == 'cancelled'
+    assert queued.finished_at is not None
+    extra = manager.submit(site.url + '/', max_pages=5, crawler_options=CRAWLER_OPTIONS)
+
+    # A running job stops at the next page.
+    manager.cancel(running.id)
+    manager.cancel(extra.id)
+    site.open.set()
+    wait_for(lambda: running.finished and extra.finished)
+    assert running.status == 'cancelled'
+    assert extra.status == 'cancelled'
+    assert running.crawler.pages_analyzed <= 1
+    assert manager.cancel('missing') is None
+
+
+def test_finished_jobs_are_pruned(site):
+    build_site(site)
+    manager = JobManager(max_workers=1, max_finished=1)
+    first = manager.submit(site.url + '/', max_pages=2, crawler_options=CRAWLER_OPTIONS)
+    wait_for(lambda: first.finished)
+    second = manager.submit(site.url + '/', max_pages=2, crawler_options=CRAWLER_OPTIONS)
+    wait_for(lambda: second.finished)
+    assert first.status == second.status == 'completed'
+    assert second.result['stats']
+    assert manager.get(first.id) is first
+
+    third = manager.submit(site.url + '/', max_pages=2, crawler_options=CRAWLER_OPTIONS)
+    assert manager.get(first.id) is None
+    assert manager.get(second.id) is second
+    wait_for(lambda: third.finished)
+
+    manager.finished_ttl = 0
+    fourth = manager.submit(site.url + '/', single_page=True, crawler_options=CRAWLER_OPTIONS)
+    assert manager.get(second.id) is None
+    assert manager.get(third.id) is None
+    wait_for(lambda: fourth.finished)
+    assert fourth.status == 'completed'
+
+
+def test_resume_interrupted_crawl(site, tmp_path):
+    build_site(site)
+    store = CheckpointStore(str(tmp_path / 'checkpoints.sqlite3'))
+    crawler = WebsiteCrawler(site.url + '/', max_pages=20, checkpoint=store, checkpoint_every=1,
+                             **CRAWLER_OPTIONS)
+    pages = crawler.iter_crawl()
+    for _ in range(3):
+        next(pages)
+    pages.close()
+    visited = set(store.page_urls(crawler.crawl_id))
+
+    assert JobManager().resume(crawler.crawl_id) is None
+    manager = JobManager(max_workers=1, checkpoint=store)
+    assert manager.resume('missing') is None
+
+    site.open.clear()
+    del site.requests[:]
+    job = manager.resume(crawler.crawl_id)
+    assert job.id == crawler.crawl_id
+    wait_for(lambda: job.status == 'running')
+    with pytest.raises(JobConflict):
+        manager.resume(crawler.crawl_id)
+    site.open.set()
+    wait_for(lambda: job.finished)
+
+    assert job.status == 'completed'
+    assert job.result['stats']
+    urls = {page['url'] for page in job.pages().records()}
+    assert urls == {site.url + '/'} | {f'{site.url}/page-{i}' for i in range(PAGES)}
+    assert not {site.url + path for path in site.fetched()} & visited
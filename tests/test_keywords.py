@@ -0,0 +1,76 @@
+import random
+import re
+
+import pytest
+
+from crawler.keywords import KeywordEngine
+
+WORDS = ('search engine ranking content analysis keyword crawler page optimization sitemap '
+         'link title heading meta description audit site traffic').split()
+
+
+def documents(count, seed=0):
+    rng = random.Random(seed)
+    docs = []
+    for i in range(count):
+        # Repeated runs of words so pages have bigrams and trigrams that
+        # occur more than once.
+        run = ' '.join(rng.choice(WORDS) for _ in range(3))
+        text = ' '.join([run] * rng.randint(0, 4) + [rng.choice(WORDS) for _ in range(rng.randint(0, 80))])
+        docs.append((text, f'{rng.choice(WORDS)} {rng.choice(WORDS)} page {i}', rng.choice(['', run])))
+    docs.append(('', '', ''))
+    return docs
+
+
+@pytest.fixture(scope='module')
+def basic_engine():
+    return KeywordEngine(allow_download=False)
+
+
+@pytest.fixture(scope='module')
+def phrase_engine():
+    # The NLTK path without NLTK data: a regex tokenizer and no lemmatizing,
+    # so bigrams and trigrams are counted as they are with NLTK.
+    engine = KeywordEngine(allow_download=False)
+    engine._tokenize = re.compile(r'\w+').findall
+    engine.lemmatize = lambda word: word
+    engine.stop_words = set(engine.basic_stop_words)
+    engine.available = True
+    return engine
+
+
+@pytest.mark.parametrize('engine_name', ['basic_engine', 'phrase_engine'])
+@pytest.mark.parametrize('num_keywords', [1, 10, 15])
+def test_extract_batch_matches_extract(request, engine_name, num_keywords):
+    engine = request.getfixturevalue(engine_name)
+    docs = documents(60)
+    keywords, tfidf = engine.extract_batch(docs, num_keywords=num_keywords)
+    assert keywords == [engine.extract(*doc, num_keywords=num_keywords) for doc in docs]
+    assert len(tfidf) == len(docs)
+
+
+def test_phrases_are_counted(phrase_engine):
+    keywords, _ = phrase_engine.extract_batch(documents(60), num_keywords=15)
+    assert any(' ' in keyword for page in keywords for keyword, _, _ in page)
+
+
+def test_chunked_tfidf_matches_whole_batch(basic_engine):
+    docs = documents(90, seed=3)
+    _, whole = basic_engine.extract_batch(docs, num_keywords=0, tfidf_terms=5)
+    corpus = (basic_engine.document_frequencies(docs), len(docs))
+    chunked = []
+    for start in range(0, len(docs), 25):
+        chunked += basic_engine.extract_batch(docs[start:start + 25], num_keywords=0, tfidf_terms=5,
+                                              corpus=corpus)[1]
+    assert chunked == whole
+
+
+def test_tfidf_prefers_terms_rare_in_the_corpus(basic_engine):
+    docs = [('crawler crawler sitemap', '', ''), ('crawler ranking', '', ''), ('crawler audit', '', '')]
+    _, tfidf = basic_engine.extract_batch(docs, num_keywords=0, tfidf_terms=2)
+    assert [[term for term, _ in terms] for terms in tfidf] == [
+        ['crawler', 'sitemap'], ['ranking', 'crawler'], ['audit', 'crawler']]
+
+
+def test_empty_batch(basic_engine):
+    assert basic_engine.extract_batch([]) == ([], [])
@@ -0,0 +1,106 @@
+import importlib
+
+import pytest
+
+from crawler import parsers
+from crawler.crawler import WebsiteCrawler
+from crawler.parsers import PARSER_BACKENDS, parse_html, resolve_parser
+
+ARTICLE = """<!DOCTYPE html>
+<html lang="en"><head>
+<meta charset="utf-8">
+<title>Keyword research for small sites</title>
+<meta name="description" content="How to pick keywords and structure content for search.">
+</head><body>
+<nav><ul><li><a href="/">Home</a></li><li><a href="/blog">Blog</a></li></ul></nav>
+<main>
+<article>
+<h1>Keyword research for small sites</h1>
+<p>Keyword research starts with the questions your readers already ask. Search
+engines reward pages that answer those questions clearly and completely.</p>
+<h2>Finding keywords</h2>
+<p>List the topics you cover, then look at the phrases people search for around
+each topic. Group related keywords so that one page targets one intent.</p>
+<ul><li>Seed keywords from your product pages</li><li>Questions from support tickets</li></ul>
+<h3>Long tail phrases</h3>
+<p>Long tail keywords have less competition and convert well for small sites.
+<a href="/blog/long-tail">Read more about long tail keywords</a>.</p>
+<img src="/images/chart.png" alt="Search volume chart">
+<table><tr><th>Keyword</th><th>Volume</th></tr><tr><td>seo audit</td><td>900</td></tr></table>
+<h2>Structuring content</h2>
+<p>Use descriptive headings, short paragraphs and internal links. Link out to
+<a href="https://example.org/guide">authoritative sources</a> where it helps.</p>
+<ol><li>One topic per page</li><li>Clear headings</li></ol>
+</article>
+</main>
+<footer><p>Copyright Example</p></footer>
+</body></html>
+"""
+
+INLINE = """<html><head><title>Entities &amp; inline markup</title>
+<style>body { color: #333; }</style><script>var crawler = "ignored";</script></head>
+<body><div id="content">
+<!-- a comment about search ranking -->
+<h1>Caf&eacute; reviews &amp; <em>ranking</em></h1>
+<p>Our <strong>crawler</strong> reads <a href="/menu">the <b>menu</b></a> and scores
+content analysis &mdash; quickly&nbsp;and&nbsp;quietly.</p>
+<div class="card"><h2>Opening hours</h2><p>Open daily, search for us by name.</p></div>
+<p><img src="/logo.png"><img src="/map.png" alt="Map"><a href="http://example.org/out">external</a></p>
+</div></body></html>
+"""
+
+PAGES = {'article': ARTICLE, 'inline': INLINE}
+
+OTHER_BACKENDS = [name for name in PARSER_BACKENDS if name != 'html.parser']
+
+
+# Each backend serializes the tree slightly differently, so the page size
+# and the html_ref offsets into the serialized page may differ. Everything
+# else must match. Well-formed pages only: backends repair broken markup
+# into different trees by design.
+SERIALIZATION_FIELDS = {'page_size_kb', 'html_ref'}
+
+
+def without_serialization(value):
+    if isinstance(value, dict):
+        return {key: without_serialization(item) for key, item in value.items()
+                if key not in SERIALIZATION_FIELDS}
+    if isinstance(value, list):
+        return [without_serialization(item) for item in value]
+    return value
+
+
+def analyze(parser, html):
+    crawler = WebsiteCrawler('http://example.com/', http_cache=False, result_cache=False,
+                             sitemap_cache=False, blob_store=False, parser=parser)
+    return without_serialization(crawler.analyze_page('http://example.com/', parse_html(html, parser)))
+
+
+@pytest.mark.parametrize('backend', OTHER_BACKENDS)
+@pytest.mark.parametrize('page', sorted(PAGES))
+def test_backend_matches_html_parser(backend, page):
+    pytest.importorskip(PARSER_BACKENDS[backend])
+    expected = analyze('html.parser', PAGES[page])
+    metrics = analyze(backend, PAGES[page])
+    differing = [key for key in expected if metrics.get(key) != expected[key]]
+    assert not differing, f"{backend} differs from html.parser in {', '.join(differing)}"
+
+
+def test_fastest_prefers_lxml_then_html_parser(monkeypatch):
+    real_import = importlib.import_module
+
+    def without_lxml(name, *args, **kwargs):
+        if name == 'lxml':
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(parsers, '_available', None)
+    monkeypatch.setattr(importlib, 'import_module', without_lxml)
+    assert resolve_parser('fastest') == 'html.parser'
+    monkeypatch.setattr(parsers, '_available', ['lxml', 'html.parser', 'html5lib'])
+    assert resolve_parser('fastest') == 'lxml'
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        resolve_parser('nope')
@@ -0,0 +1,54 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from crawler.session import CappedRetry, HTTPClient
+
+
+class RetryAfterHandler(BaseHTTPRequestHandler):
+    # 503 with a long Retry-After on the first request, 200 afterwards.
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        if type(self).requests == 1:
+            self.send_response(503)
+            self.send_header('Retry-After', '3600')
+            body = b''
+        else:
+            self.send_response(200)
+            body = b'ok'
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    RetryAfterHandler.requests = 0
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), RetryAfterHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}/'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_retry_after_is_capped(server):
+    client = HTTPClient(retries=1, max_retry_after=0.2)
+    started = time.perf_counter()
+    response = client.get(server)
+    client.close()
+    assert response.status_code == 200
+    assert RetryAfterHandler.requests == 2
+    assert time.perf_counter() - started < 5
+
+
+def test_cap_survives_increment():
+    retry = CappedRetry(total=3, max_retry_after=1.5)
+    assert retry.new(total=2).max_retry_after == 1.5
@@ -0,0 +1,62 @@
+import io
+
+from crawler.sitemap import parse_sitemap
+
+
+def parse(xml):
+    return parse_sitemap(io.BytesIO(xml.encode('utf-8')))
+
+
+def test_urlset():
+    entries, children = parse(
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        '<url><loc> https://example.com/ </loc><lastmod>2024-01-02</lastmod></url>'
+        '<url><loc>https://example.com/about</loc></url>'
+        '</urlset>'
+    )
+    assert entries == [('https://example.com/', '2024-01-02'), ('https://example.com/about', None)]
+    assert children == []
+
+
+def test_sitemap_index():
+    entries, children = parse(
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        '<sitemap><loc>https://example.com/a.xml</loc><lastmod>2024-01-02</lastmod></sitemap>'
+        '</sitemapindex>'
+    )
+    assert entries == []
+    assert children == [('https://example.com/a.xml', '2024-01-02')]
+
+
+def test_image_sitemap_keeps_page_urls():
+    entries, _ = parse(
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+        'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">'
+        '<url><loc>https://example.com/page</loc>'
+        '<image:image><image:loc>https://example.com/a.png</image:loc></image:image>'
+        '<image:image><image:loc>https://example.com/b.png</image:loc></image:image>'
+        '</url>'
+        '</urlset>'
+    )
+    assert entries == [('https://example.com/page', None)]
+
+
+def test_hreflang_and_video_extensions_are_ignored():
+    entries, _ = parse(
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+        'xmlns:xhtml="http://www.w3.org/1999/xhtml" '
+        'xmlns:video="http://www.google.com/schemas/sitemap-video/1.1">'
+        '<url><loc>https://example.com/en</loc><lastmod>2024-03-01</lastmod>'
+        '<xhtml:link rel="alternate" hreflang="de" href="https://example.com/de"/>'
+        '<video:video><video:loc>https://example.com/v.mp4</video:loc>'
+        '<video:lastmod>2020-01-01</video:lastmod></video:video>'
+        '</url>'
+        '</urlset>'
+    )
+    assert entries == [('https://example.com/en', '2024-03-01')]
+
+
+def test_sitemap_without_namespace():
+    entries, _ = parse('<urlset><url><loc>https://example.com/</loc></url></urlset>')
+    assert entries == [('https://example.com/', None)]
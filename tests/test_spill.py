@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+from crawler.analyzer import DataAnalyzer, SpillAnalyzer
+from crawler.serialize import dumps
+from crawler.spill import SpillFile
+
+
+def records(pages, seed=1):
+    rng = random.Random(seed)
+    words = [''.join(rng.choice('abcdefghij') for _ in range(6)) for _ in range(300)]
+    records = []
+    for n in range(pages):
+        url = f'http://example.com/catalog/{n % 7}/item-{n}'
+        content = ' '.join(rng.choice(words) for _ in range(rng.randrange(0, 120)))
+        records.append({
+            'url': url,
+            'title': f'Item {n % 40} | Example Store',
+            'word_count': rng.randrange(50, 3000),
+            'image_count': rng.randrange(0, 30),
+            'heading_count': rng.randrange(0, 20),
+            'internal_links': rng.randrange(0, 200),
+            'external_links': rng.randrange(0, 30),
+            'keywords': [(rng.choice(words), rng.randrange(1, 40), round(rng.uniform(0, 10), 2))
+                         for _ in range(rng.randrange(0, 8))],
+            'keyword_phrases': [{'phrase': f'{rng.choice(words)} {rng.choice(words)}',
+                                 'count': rng.randrange(1, 10), 'relevance': round(rng.uniform(0, 10), 2),
+                                 'words': 2}
+                                for _ in range(rng.randrange(0, 3))],
+            'meta_description': f'Buy item {n % 40} at Example Store.' if n % 3 else '',
+            'meta_description_length': 30 if n % 3 else 0,
+            'h1_count': rng.randrange(0, 3),
+            'h2_count': rng.randrange(0, 10),
+            'h3_count': rng.randrange(0, 10),
+            'paragraph_count': rng.randrange(0, 60),
+            'avg_paragraph_length': rng.uniform(0, 80),
+            'contains_schema': rng.random() < 0.5,
+            'page_size_kb': rng.uniform(10, 400),
+            'content': content,
+            'structured_content': {},
+            'page_link': url,
+            'html_blob': None,
+            # Every fifth page has the same text as the one before it.
+            'content_hash': f'{(n - (n % 5 == 4)) + 1:016x}',
+            'simhash': f'{(n - (n % 5 == 4)) * 7919 + 1:016x}',
+        })
+    return records
+
+
+@pytest.mark.parametrize('pages, chunk_pages', [(1, 10), (23, 5), (60, 1000)])
+def test_spill_analyzer_matches_data_analyzer(pages, chunk_pages):
+    # Repeated URLs are crawled twice; both analyzers keep the first.
+    pages = records(pages)
+    pages += pages[:3]
+    spill = SpillFile()
+    try:
+        spill.extend(pages)
+        expected = DataAnalyzer(pages)
+        spilled = SpillAnalyzer(spill, chunk_pages=chunk_pages)
+        assert dumps(spilled.get_descriptive_stats()) == dumps(expected.get_descriptive_stats())
+        assert dumps(spilled.create_recommendations()) == dumps(expected.create_recommendations())
+    finally:
+        spill.delete()
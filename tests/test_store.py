@@ -0,0 +1,51 @@
+import pytest
+
+from crawler.crawler import WebsiteCrawler
+from crawler.parsers import parse_html
+from crawler.store import PageStore
+
+PAGES = {
+    'http://example.com/guide': (
+        '<html><head><title>Crawling guide</title>'
+        '<meta name="description" content="A guide to crawling sites."></head>'
+        '<body><main><h1>Crawling guide</h1><h2>Sitemaps</h2>'
+        '<p>Crawling sites with sitemaps and crawling links. Crawling well takes care.</p>'
+        '<p>A second paragraph about sitemaps.</p><img src="a.png">'
+        '<a href="/other">Other</a><a href="http://elsewhere.org/">Elsewhere</a>'
+        '<script type="application/ld+json">{}</script></main></body></html>'
+    ),
+    'http://example.com/empty': '<html><body></body></html>',
+}
+
+
+@pytest.fixture
+def pages():
+    crawler = WebsiteCrawler('http://example.com/', blob_store=False, result_cache=False,
+                             http_cache=False, sitemap_cache=False)
+    pages = [crawler.analyze_page(url, parse_html(html)) for url, html in PAGES.items()]
+    pages[0]['keyword_phrases'] = [{'phrase': 'crawling guide', 'count': 2, 'relevance': 3.6, 'words': 2}]
+    return pages
+
+
+def test_records_round_trip(pages):
+    store = PageStore.from_records(pages)
+    assert len(store) == 2
+    assert store.records() == pages
+    # Keys come back in analyze_page's order too.
+    assert [list(record) for record in store.records()] == [list(page) for page in pages]
+
+
+def test_records_without_structured_content(pages):
+    store = PageStore.from_records(pages, keep_structured=False, omit=('content',))
+    for record, page in zip(store.records(), pages):
+        assert record['structured_content'] == {}
+        assert record['content'] == ''
+        assert record['keywords'] == page['keywords']
+
+
+def test_frame_matches_records(pages):
+    store = PageStore.from_records(pages)
+    frame = store.to_frame()
+    assert frame['url'].tolist() == [page['url'] for page in pages]
+    assert frame['word_count'].tolist() == [page['word_count'] for page in pages]
+    assert not (frame.dtypes == object).any()